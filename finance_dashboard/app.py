@@ -1,30 +1,133 @@
-from flask import Flask, request, jsonify, send_from_directory, send_file
-import io # For in-memory file handling
+from flask import Flask, Response, g, request, jsonify, send_from_directory, stream_with_context
+import re
 from database import (
     add_transaction,
-    get_transactions,
-    update_transaction, # Import if you need to update individual transactions
-    get_transaction_by_id, # Import if you need to fetch a specific transaction
+    add_transactions_bulk,
+    iter_transactions,
+    encode_transactions_cursor,
+    PAGINATION_SORT_FIELDS,
+    build_transaction_query,
+    ensure_indexes,
+    get_transactions_version,
+    has_transactions,
+    get_monthly_rollups,
+    rebuild_monthly_rollups,
+    get_period_summary,
+    get_expense_breakdown,
+    get_transactions_pending_fraud_scan,
+    get_fraud_history_profile,
+    bulk_update_transactions,
+    get_transaction_by_id,
     add_ai_forecast,
-    get_latest_ai_forecast
+    get_latest_ai_forecast,
+    get_latest_credit_report,
+    get_risk_aggregates,
+    get_pool_stats,
+    ping as ping_database,
+    add_risk_report,
+    get_latest_risk_report
 )
-from datetime import datetime
+from jobs import JobManager, current_job
+import metrics
+from metrics import HTTP_REQUEST_SECONDS, HTTP_REQUESTS, UPLOAD_ROWS, copy_timing_context, finish_timing, stage, start_timing
+from events import EventBroker
+from serialization import MongoJSONProvider, dumps as dumps_json, dumps_bytes as dumps_json_bytes
+from compression import init_compression
+from llm_cache import ResponseCache
+from llm_client import LLMClient, create_provider
+from response_parsing import CASHFLOW_TIPS_SCHEMA, CREDIT_RESPONSE_SCHEMA, FRAUD_ITEM_SCHEMA, FRAUD_RESPONSE_SCHEMA, is_valid
+from fraud_scan import build_fraud_summary, scan_in_chunks
+from fraud_screen import prescreen_transactions
+from forecasting import forecast_cashflow
+from snapshot import get_snapshot
+from risk_engine import UPCOMING_HORIZON_DAYS, build_risk_report, risk_data_hash
+from prompts import build_cashflow_prompt, build_credit_prompt, build_fraud_prompt, format_fraud_history_profile
+from importer import VALID_STATUSES, VALID_TIPOS, iter_upload_frames, normalize_columns, validate_transactions_frame
+from datetime import datetime, timedelta
 import os
-import json # For parsing Gemini's potential string response
-import google.generativeai as genai
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 import pandas as pd
-import numpy as np # For numerical operations like standard deviation
-from datetime import timedelta # Already used, ensure it's available
 
 load_dotenv() # Load environment variables from .env
 
 app = Flask(__name__)
+# jsonify encodes ObjectId, datetime and Decimal128 itself (see serialization.py)
+app.json = MongoJSONProvider(app)
+init_compression(app)
 
-# Configure Gemini API
+# Configure the LLM provider (Gemini, or the offline fake provider with LLM_PROVIDER=fake)
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
+
+# Identical prompts (same model, same data) are answered from this cache instead of calling Gemini again
+llm_response_cache = ResponseCache(logger=app.logger)
+llm_client = LLMClient(create_provider(GEMINI_API_KEY), cache=llm_response_cache, logger=app.logger)
+
+def generate_ai_json(prompt: str, schema=None):
+    """
+    Sends a prompt through the shared LLM client and returns the parsed JSON
+    answer, validated against schema when given.
+    """
+    return llm_client.generate_json(prompt, schema=schema)
+
+# --- Request metrics and timing logs ---
+# Only registered when enabled, so disabled instrumentation adds nothing to a request
+if metrics.METRICS_ENABLED or metrics.TIMING_LOGS_ENABLED:
+    @app.before_request
+    def _start_request_timing():
+        g.request_started = time.perf_counter()
+        g.timing_token = start_timing()
+
+    def _finish_request_timing(status: int):
+        started = g.pop('request_started', None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        # The route pattern, not the path, keeps label values bounded
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        HTTP_REQUESTS.inc(method=request.method, endpoint=endpoint, status=str(status))
+        HTTP_REQUEST_SECONDS.observe(elapsed, method=request.method, endpoint=endpoint)
+        finish_timing(
+            g.pop('timing_token', None), method=request.method, path=request.path, endpoint=endpoint,
+            status=status, duration_ms=round(elapsed * 1000, 2)
+        )
+
+    @app.after_request
+    def _record_request_timing(response):
+        _finish_request_timing(response.status_code)
+        return response
+
+    @app.teardown_request
+    def _record_failed_request_timing(error):
+        # after_request is skipped when the view raised
+        _finish_request_timing(500)
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """
+    Counters and latency histograms in the Prometheus text format.
+    """
+    if not metrics.METRICS_ENABLED:
+        return jsonify({"error": "Metrics are disabled (METRICS_ENABLED=false)"}), 404
+    return Response(metrics.render(), content_type=metrics.PROMETHEUS_CONTENT_TYPE), 200
+
+metrics.registry.gauge(
+    "mongo_pool_connections", "Connections of this process's MongoDB pool.",
+    lambda: {(state,): get_pool_stats()[f"connections_{state}"] for state in ("open", "in_use")}, ("state",)
+)
+metrics.registry.gauge(
+    "llm_circuit_open", "1 while the LLM circuit breaker rejects calls.",
+    lambda: int(llm_client.breaker.state == "open")
+)
+
+# Create the indexes the queries below rely on; the app still starts if MongoDB is unreachable
+try:
+    ensure_indexes()
+except Exception as e:
+    app.logger.error(f"Could not ensure MongoDB indexes: {e}")
 
 # --- API Endpoints ---
 
@@ -53,12 +156,7 @@ def api_add_transaction():
         transaction_id = add_transaction(data)
         if transaction_id:
             new_transaction = get_transaction_by_id(str(transaction_id)) # Fetch to get all fields including defaults
-            if new_transaction.get("data_pagamento") and isinstance(new_transaction["data_pagamento"], datetime):
-                 new_transaction["data_pagamento"] = new_transaction["data_pagamento"].isoformat()
-            if new_transaction.get("created_at") and isinstance(new_transaction["created_at"], datetime):
-                 new_transaction["created_at"] = new_transaction["created_at"].isoformat()
-            if "_id" in new_transaction:
-                new_transaction["_id"] = str(new_transaction["_id"])
+            event_broker.publish("transaction_inserted", new_transaction)
             return jsonify({"message": "Transaction added successfully", "transaction": new_transaction}), 201
         else:
             return jsonify({"error": "Failed to add transaction"}), 500
@@ -67,171 +165,350 @@ def api_add_transaction():
         app.logger.error(f"Error adding transaction: {e}")
         return jsonify({"error": "An unexpected error occurred"}), 500
 
+# Query parameters of GET /api/transactions that are not field filters
+TRANSACTION_LIST_PARAMS = {'limit', 'after', 'sort', 'order', 'fields', 'format'}
+TRANSACTION_FILTER_PARAMS = {'tipo', 'status', 'date_from', 'date_to', 'min_valor', 'max_valor', 'suspicious'}
+MAX_TRANSACTIONS_PAGE_SIZE = 1000
+FIELD_NAME_PATTERN = re.compile(r'^[A-Za-z_][A-Za-z0-9_.]*$')
+
+def _parse_transaction_filters(args):
+    """
+    Parses the filter query parameters of GET /api/transactions into a typed
+    MongoDB query. Raises ValueError with a client-facing message.
+
+    tipo / status: comma-separated sets; date_from / date_to: YYYY-MM-DD,
+    both inclusive; min_valor / max_valor: numbers; suspicious: true/false.
+    """
+    unknown = [key for key in args if key not in TRANSACTION_FILTER_PARAMS | TRANSACTION_LIST_PARAMS]
+    if unknown:
+        raise ValueError(f"Unknown query parameters: {', '.join(unknown)}")
+
+    def parse_set(name, allowed):
+        if not args.get(name):
+            return None
+        values = [value.strip().lower() for value in args[name].split(',') if value.strip()]
+        invalid = [value for value in values if value not in allowed]
+        if invalid:
+            raise ValueError(f"Invalid '{name}': {', '.join(invalid)}. Must be among: {', '.join(allowed)}")
+        return values
+
+    def parse_date(name):
+        if not args.get(name):
+            return None
+        try:
+            return datetime.fromisoformat(args[name].split('T')[0])
+        except ValueError:
+            raise ValueError(f"Invalid '{name}' format, expected YYYY-MM-DD")
+
+    def parse_number(name):
+        if not args.get(name):
+            return None
+        try:
+            return float(args[name])
+        except ValueError:
+            raise ValueError(f"Invalid '{name}', must be a number")
+
+    date_to = parse_date('date_to')
+    suspicious = args.get('suspicious', '').lower()
+    if suspicious not in ('', 'true', 'false', '1', '0'):
+        raise ValueError("Invalid 'suspicious', expected true or false")
+
+    return build_transaction_query(
+        tipos=parse_set('tipo', VALID_TIPOS),
+        statuses=parse_set('status', VALID_STATUSES),
+        date_from=parse_date('date_from'),
+        date_to=date_to + timedelta(days=1) if date_to else None, # Inclusive end date
+        min_valor=parse_number('min_valor'),
+        max_valor=parse_number('max_valor'),
+        suspicious_only=suspicious in ('true', '1')
+    )
+
+def _stream_transactions(documents, output_format: str):
+    """
+    Yields the serialized documents as a JSON array or as NDJSON lines,
+    one document at a time. Documents are encoded as read from MongoDB
+    (see serialization.json_default).
+    """
+    if output_format == 'ndjson':
+        for document in documents:
+            yield dumps_json_bytes(document) + b"\n"
+        return
+    yield b"["
+    for position, document in enumerate(documents):
+        yield (b"," if position else b"") + dumps_json_bytes(document)
+    yield b"]"
+
 @app.route('/api/transactions', methods=['GET'])
 def api_get_transactions():
+    """
+    Lists transactions matching the filters (see _parse_transaction_filters).
+    Without 'limit' every matching transaction is
+    streamed from the cursor. With 'limit' one keyset page is returned and
+    the cursor of the next page is sent in the X-Next-Cursor header (pass
+    it back as 'after'). 'sort' is _id or data_pagamento, 'order' asc or
+    desc, 'fields' a comma-separated projection and 'format' json or ndjson.
+    """
     try:
-        filters = request.args.to_dict()
-        transactions = get_transactions(filters)
-        for transaction in transactions:
-            if "_id" in transaction:
-                transaction["_id"] = str(transaction["_id"])
-            if "data_pagamento" in transaction and isinstance(transaction["data_pagamento"], datetime):
-                transaction["data_pagamento"] = transaction["data_pagamento"].isoformat()
-            if "created_at" in transaction and isinstance(transaction["created_at"], datetime):
-                transaction["created_at"] = transaction["created_at"].isoformat()
-        return jsonify(transactions), 200
+        args = request.args
+        try:
+            filters = _parse_transaction_filters(args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        sort_field = args.get('sort', '_id')
+        if sort_field not in PAGINATION_SORT_FIELDS:
+            return jsonify({"error": f"Invalid 'sort', expected one of: {', '.join(PAGINATION_SORT_FIELDS)}"}), 400
+        order = args.get('order', 'asc')
+        if order not in ('asc', 'desc'):
+            return jsonify({"error": "Invalid 'order', expected 'asc' or 'desc'"}), 400
+        output_format = args.get('format', 'json')
+        if output_format not in ('json', 'ndjson'):
+            return jsonify({"error": "Invalid 'format', expected 'json' or 'ndjson'"}), 400
+
+        projection = None
+        if args.get('fields'):
+            projection = [field.strip() for field in args['fields'].split(',') if field.strip()]
+            invalid_fields = [field for field in projection if not FIELD_NAME_PATTERN.match(field)]
+            if invalid_fields:
+                return jsonify({"error": f"Invalid field names: {', '.join(invalid_fields)}"}), 400
+
+        limit = 0
+        if args.get('limit'):
+            try:
+                limit = int(args['limit'])
+            except ValueError:
+                return jsonify({"error": "Invalid 'limit', must be an integer"}), 400
+            if not 1 <= limit <= MAX_TRANSACTIONS_PAGE_SIZE:
+                return jsonify({"error": f"Invalid 'limit', must be between 1 and {MAX_TRANSACTIONS_PAGE_SIZE}"}), 400
+
+        try:
+            cursor = iter_transactions(filters, projection, sort_field, order == 'desc', args.get('after'), limit)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        mimetype = 'application/x-ndjson' if output_format == 'ndjson' else 'application/json'
+        if not limit:
+            return Response(stream_with_context(_stream_transactions(cursor, output_format)), mimetype=mimetype), 200
+
+        # A page is bounded by MAX_TRANSACTIONS_PAGE_SIZE, so it is read before responding to know the next cursor
+        page = list(cursor)
+        headers = {}
+        if len(page) == limit:
+            headers['X-Next-Cursor'] = encode_transactions_cursor(page[-1], sort_field)
+        return Response(_stream_transactions(page, output_format), mimetype=mimetype, headers=headers), 200
     except Exception as e:
         app.logger.error(f"Error fetching transactions: {e}")
         return jsonify({"error": "An unexpected error occurred"}), 500
 
+# --- Live Updates (Server-Sent Events) ---
+# Transactions whose import chunk is at most this size are pushed as deltas;
+# for larger chunks clients are told to reload instead
+EVENTS_MAX_DELTA_ROWS = int(os.getenv("EVENTS_MAX_DELTA_ROWS", "500"))
+
+event_broker = EventBroker(dumps=dumps_json)
+
+@app.route('/api/events', methods=['GET'])
+def api_events():
+    """
+    Server-Sent Events stream of transaction inserts, import progress,
+    fraud verdicts and finished analyses. Reconnecting clients resume from
+    the Last-Event-ID header.
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_seen_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_seen_id = None
+    response = Response(stream_with_context(event_broker.subscribe(last_seen_id)), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no' # Disable proxy buffering (nginx)
+    return response
+
+def _publish_fraud_verdicts(fraud_updates: list):
+    """
+    Pushes written fraud verdicts ((transaction_id, fields) pairs) to the dashboards.
+    """
+    if len(fraud_updates) > EVENTS_MAX_DELTA_ROWS:
+        event_broker.publish("fraud_verdicts", {"reload": True, "count": len(fraud_updates)})
+        return
+    event_broker.publish("fraud_verdicts", {"verdicts": [
+        {"transaction_id": transaction_id, "fraud_guard": fields["ai_analysis_results.fraud_guard"]}
+        for transaction_id, fields in fraud_updates
+    ]})
+
+# --- Background Analysis Jobs ---
+# The Gemini-backed analyses run on a thread pool; endpoints return a job id to poll.
+def _publish_analysis_completed(job):
+    # Results can be large (e.g. a full fraud report), so clients fetch them from /api/jobs/<id>
+    event_broker.publish("analysis_completed", {
+        "job_id": job.id, "kind": job.kind, "status": job.status, "http_status": job.http_status
+    })
+
+# Every finished analysis job is announced to the dashboards as well
+analysis_jobs = JobManager(logger=app.logger, on_finished=_publish_analysis_completed)
+
+def _submit_analysis_job(kind: str, fn, *args):
+    """
+    Queues fn(*args) as a background job, or joins the job already running
+    for the same analysis over the same dataset, and returns a 202 response.
+    """
+    try:
+        dedup_key = f"{kind}:{args}:{get_transactions_version()}"
+        job, created = analysis_jobs.submit(kind, dedup_key, fn, *args)
+    except Exception as e:
+        app.logger.error(f"Error submitting {kind} analysis job: {e}")
+        return jsonify({"error": "Could not start the analysis"}), 500
+    response = job.to_dict()
+    response["status_url"] = f"/api/jobs/{job.id}"
+    response["deduplicated"] = not created
+    return jsonify(response), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def api_get_job(job_id):
+    job = analysis_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict()), 200
+
+@app.route('/api/llm_cache/stats', methods=['GET'])
+def api_llm_cache_stats():
+    return jsonify(llm_response_cache.stats()), 200
+
+@app.route('/api/llm/status', methods=['GET'])
+def api_llm_status():
+    return jsonify(llm_client.stats()), 200
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    """
+    Liveness/readiness probe: pings MongoDB within MONGO_HEALTHCHECK_TIMEOUT_MS.
+    """
+    try:
+        latency_ms = ping_database()
+    except Exception as e:
+        app.logger.error(f"Health check failed: {e}")
+        return jsonify({"status": "unavailable", "database": {"ok": False, "error": str(e)}, "pool": get_pool_stats()}), 503
+    return jsonify({"status": "ok", "database": {"ok": True, "latency_ms": latency_ms}, "pool": get_pool_stats()}), 200
+
+# --- Monthly Rollups ---
+def _monthly_totals(since_month: str = None):
+    """
+    Returns one entry per month with income, expenses and transaction count,
+    read from the 'monthly_rollups' collection.
+    """
+    months = {}
+    for rollup in get_monthly_rollups(since_month):
+        month = months.setdefault(rollup["month"], {"month": rollup["month"], "income_AOA": 0, "expenses_AOA": 0, "transactions": 0})
+        if rollup["tipo"] == 'receita':
+            month["income_AOA"] = round(rollup["total"], 2)
+        elif rollup["tipo"] == 'despesa':
+            month["expenses_AOA"] = round(rollup["total"], 2)
+        month["transactions"] += rollup["count"]
+    return list(months.values())
+
+@app.route('/api/monthly_rollups', methods=['GET'])
+def api_get_monthly_rollups():
+    since_month = request.args.get('since')
+    if since_month and not re.match(r'^\d{4}-\d{2}$', since_month):
+        return jsonify({"error": "Invalid 'since', expected YYYY-MM"}), 400
+    try:
+        return jsonify(_monthly_totals(since_month)), 200
+    except Exception as e:
+        app.logger.error(f"Error fetching monthly rollups: {e}")
+        return jsonify({"error": "An unexpected error occurred"}), 500
+
+@app.cli.command('rebuild-rollups')
+def rebuild_rollups_command():
+    """Rebuild the monthly_rollups collection from all transactions."""
+    rollups_written = rebuild_monthly_rollups()
+    print(f"Rebuilt {rollups_written} monthly rollups.")
+
+def _latest_report_response(report: dict):
+    """
+    Returns the stored report with its _id as ETag. Clients revalidate with
+    If-None-Match and get a 304 until a newer report is stored.
+    """
+    if not report:
+        return jsonify({"error": "No report found"}), 404
+    etag = str(report["_id"])
+    # Weak comparison: compressed responses carry the ETag as weak (see compression.py)
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = Response(dumps_json_bytes(report), mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/api/latest_forecast', methods=['GET'])
+def api_latest_forecast():
+    return _latest_report_response(get_latest_ai_forecast())
+
 @app.route('/api/analyze_cashflow', methods=['POST'])
 def analyze_cashflow():
-    if not GEMINI_API_KEY or GEMINI_API_KEY == "YOUR_API_KEY_HERE":
-        app.logger.warn("Gemini API key not configured. Returning sample analysis.")
-        # Simulate Gemini response structure
-        sample_gemini_response = {
-            "cash_flow_forecast": {
-                "next_month_prediction_AOA": 1200000.75,
-                "three_month_total_AOA": 3500000.00,
-                "trend_description": "Slightly positive cash flow trend expected if current income and expense patterns continue.",
-                "confidence_score": 0.70
-            },
-            "improvement_tips": [
-                "Consider reducing discretionary spending on entertainment by 15%.",
-                "Look for opportunities to increase freelance income by seeking 1-2 new small projects.",
-                "Review monthly subscriptions and cancel any that are unused."
-            ],
-            "evaluation_percentages": {
-                "income_vs_expense_ratio": "120%", # Income is 120% of expenses
-                "savings_rate_forecast": "15%", # Projecting a 15% savings rate
-                "key_expense_categories": {
-                    "Aluguel": "40%",
-                    "Alimentação": "25%",
-                    "Transporte": "15%"
-                }
-            },
-            "currency": "AOA",
-            # Adding a sample structure for the chart, as Gemini might not provide it directly in this format
-            "chart_data": {
-                 "labels": ["Mês Anterior", "Mês Atual", "Próximo Mês (Previsto)"],
-                 "datasets": [
-                    {
-                        "label": "Receitas (AOA)",
-                        "data": [1000000, 1100000, 1200000.75], # Sample data
-                        "borderColor": 'rgba(75, 192, 192, 1)',
-                        "backgroundColor": 'rgba(75, 192, 192, 0.2)',
-                    },
-                    {
-                        "label": "Despesas (AOA)",
-                        "data": [800000, 850000, 900000], # Sample data
-                        "borderColor": 'rgba(255, 99, 132, 1)',
-                        "backgroundColor": 'rgba(255, 99, 132, 0.2)',
-                    }
-                ]
-            }
-        }
-        add_ai_forecast(sample_gemini_response) # Store the sample forecast
-        return jsonify(sample_gemini_response), 200
-
+    return _submit_analysis_job("cashflow", _run_cashflow_analysis)
+
+CASHFLOW_TIPS_FALLBACK = [
+    "Review recurring expenses and cancel the ones that are no longer needed.",
+    "Keep a cash reserve of at least one month of expenses.",
+    "Schedule large payments for the months where income is forecast to be higher."
+]
+
+def _key_expense_categories(breakdown: dict):
+    """
+    Returns the share of the largest expense descriptions of a
+    get_expense_breakdown() result, as percentages.
+    """
+    if not breakdown["total"]:
+        return {}
+    return {
+        category["descricao"]: f"{category['total'] / breakdown['total'] * 100:.0f}%"
+        for category in breakdown["categories"]
+    }
+
+def _run_cashflow_analysis(inputs: dict = None):
+    """
+    Runs the cash-flow forecast analysis. Returns a tuple (result, http_status).
+
+    The forecast numbers and chart_data are computed locally from the monthly
+    rollups (see forecasting.py); Gemini is only asked for improvement_tips.
+    inputs is a _load_analysis_inputs() result; without it the data is read here.
+    """
     try:
-        transactions_data = get_transactions() # Fetch all for now
-        if not transactions_data:
-            return jsonify({"error": "No transactions available for analysis"}), 400
-
-        formatted_transactions = []
-        for t in transactions_data:
-            formatted_transactions.append({
-                "date": t["data_pagamento"].split("T")[0] if isinstance(t.get("data_pagamento"), str) else t.get("data_pagamento").isoformat().split("T")[0],
-                "type": t["tipo"],
-                "description": t["descricao"],
-                "amount": t["valor"]
-            })
-
-        prompt = f"""
-Analyze the following financial transactions from Angola and provide a cash flow forecast for the next 3 months.
-The current date is {datetime.now().strftime('%Y-%m-%d')}.
-Data:
-{json.dumps(formatted_transactions, indent=2)}
-
-Please return the analysis in JSON format with the following structure:
-{{
-    "cash_flow_forecast": {{
-        "next_month_prediction_AOA": <value>,
-        "three_month_total_AOA": <value>,
-        "trend_description": "<textual description of the trend>",
-        "confidence_score": <0.0 to 1.0>
-    }},
-    "improvement_tips": [
-        "<actionable tip 1>",
-        "<actionable tip 2>"
-    ],
-    "evaluation_percentages": {{
-        "income_vs_expense_ratio": "<percentage>%",
-        "savings_rate_forecast": "<percentage>%",
-        "key_expense_categories": {{
-            "<category1>": "<percentage>%",
-            "<category2>": "<percentage>%"
-        }}
-    }},
-    "currency": "AOA",
-    "chart_data": {{
-        "labels": ["<Previous Month Name>", "<Current Month Name>", "<Next Month Name (Forecast)>"],
-        "datasets": [
-            {{
-                "label": "Receitas (AOA)",
-                "data": [<previous_month_income_value>, <current_month_income_value>, <next_month_forecasted_income_value>],
-                "borderColor": "rgba(75, 192, 192, 1)",
-                "backgroundColor": "rgba(75, 192, 192, 0.2)"
-            }},
-            {{
-                "label": "Despesas (AOA)",
-                "data": [<previous_month_expense_value>, <current_month_expense_value>, <next_month_forecasted_expense_value>],
-                "borderColor": "rgba(255, 99, 132, 1)",
-                "backgroundColor": "rgba(255, 99, 132, 0.2)"
-            }}
-        ]
-    }}
-}}
-Ensure all monetary values are in AOA. Provide realistic example values for the chart_data section based on the overall forecast.
-The chart_data labels should reflect past, current, and future months relative to the analysis date.
-"""
-        model = genai.GenerativeModel('gemini-pro')
-        response = model.generate_content(prompt)
-        
-        # Clean the response: Gemini might wrap JSON in ```json ... ```
-        cleaned_response_text = response.text.strip()
-        if cleaned_response_text.startswith("```json"):
-            cleaned_response_text = cleaned_response_text[7:]
-        if cleaned_response_text.endswith("```"):
-            cleaned_response_text = cleaned_response_text[:-3]
-        
-        ai_analysis_result = json.loads(cleaned_response_text)
+        if inputs:
+            monthly_totals, expense_breakdown = inputs["monthly_totals"], inputs["expense_breakdown"]
+        else:
+            monthly_totals = _monthly_totals()
+            expense_breakdown = get_expense_breakdown(datetime.utcnow() - timedelta(days=180))
+        if not monthly_totals:
+            return {"error": "No transactions available for analysis"}, 400
+
+        with stage("forecast_compute"):
+            analysis = forecast_cashflow(monthly_totals)
+            analysis["evaluation_percentages"]["key_expense_categories"] = _key_expense_categories(expense_breakdown)
+    except Exception as e:
+        app.logger.error(f"Error computing cash-flow forecast: {e}")
+        return {"error": "Failed to compute the cash-flow forecast", "details": str(e)}, 500
 
-        # Store the AI analysis
-        forecast_id = add_ai_forecast(ai_analysis_result)
-        if not forecast_id:
-            app.logger.error("Failed to store AI forecast.")
-            # Decide if you want to return an error or the result anyway
-            # return jsonify({"error": "Failed to store AI analysis"}), 500
+    if not llm_client.available:
+        app.logger.warn("LLM not configured or unavailable. Returning the local forecast with generic tips.")
+        analysis["improvement_tips"] = CASHFLOW_TIPS_FALLBACK
+    else:
+        prompt = build_cashflow_prompt(monthly_totals, analysis)
+        try:
+            tips = generate_ai_json(prompt, schema=CASHFLOW_TIPS_SCHEMA)["improvement_tips"]
+            analysis["improvement_tips"] = tips or CASHFLOW_TIPS_FALLBACK
+        except Exception as e:
+            app.logger.error(f"Error calling Gemini API or processing its response: {e}")
+            # The forecast itself does not depend on the model
+            analysis["improvement_tips"] = CASHFLOW_TIPS_FALLBACK
+            analysis["ai_error"] = str(e)
 
-        return jsonify(ai_analysis_result), 200
+    forecast_id = add_ai_forecast(analysis)
+    if not forecast_id:
+        app.logger.error("Failed to store AI forecast.")
 
-    except Exception as e:
-        app.logger.error(f"Error calling Gemini API or processing its response: {e}")
-        # Fallback to sample if actual API call fails for unexpected reasons
-        return jsonify({
-            "error": "Failed to get analysis from AI. Using sample data.",
-            "details": str(e),
-            "sample_data": { # Providing sample data on error
-                "cash_flow_forecast": {
-                    "next_month_prediction_AOA": 50000.0, "three_month_total_AOA": 150000.0,
-                    "trend_description": "Error fetching real data.", "confidence_score": 0.1
-                },
-                "improvement_tips": ["Check API key and network."],
-                "evaluation_percentages": {"income_vs_expense_ratio": "N/A"}, "currency": "AOA",
-                "chart_data": { "labels": ["M1", "M2", "M3"], "datasets": []}
-            }
-        }), 500
+    return analysis, 200
 
 
 # --- Routes to Serve Tab HTML and Static Files ---
@@ -248,9 +525,6 @@ def previsao_fluxo_ai_index():
 def previsao_fluxo_ai_static(filename):
     return send_from_directory('previsao_fluxo_ai', filename)
 
-if __name__ == '__main__':
-    app.run(debug=True, port=5000)
-
 
 # --- Routes for Tab 2: FraudGuard AI ---
 @app.route('/fraudguard_ai/')
@@ -261,122 +535,190 @@ def fraudguard_ai_index():
 def fraudguard_ai_static(filename):
     return send_from_directory('fraudguard_ai', filename)
 
+def _fraud_guard_update(report_item: dict, scanned_at: datetime):
+    """
+    Returns the (transaction_id, fields) update that stores a fraud verdict on its transaction.
+    """
+    return (report_item["transaction_id"], {
+        "ai_analysis_results.fraud_guard": {
+            "is_suspicious": report_item.get("is_suspicious"),
+            "reason": report_item.get("reason"),
+            "risk_score": report_item.get("risk_score"),
+            "recommended_action": report_item.get("recommended_action"),
+            "last_scanned_at": scanned_at.isoformat(),
+            "scanned_at": scanned_at # Compared with 'updated_at' by incremental scans
+        }
+    })
+
+FRAUD_STREAM_WRITE_BATCH = 50
+
+class _StreamedFraudWriteBack:
+    """
+    Writes model verdicts onto their transactions while the response is still
+    streaming, in batches of FRAUD_STREAM_WRITE_BATCH, and reports the count
+    as progress of the running job. Called from the fraud scan worker threads.
+    """
+
+    def __init__(self, scanned_at: datetime, job=None):
+        self.scanned_at = scanned_at
+        self.job = job
+        self.written_ids = set()
+        self.modified = 0
+        self._pending = []
+        self._suspicious = 0
+        self._lock = threading.Lock()
+
+    def add(self, report_item: dict):
+        report_item["screened_by"] = "gemini"
+        with self._lock:
+            if report_item["transaction_id"] in self.written_ids:
+                return
+            self.written_ids.add(report_item["transaction_id"])
+            self._pending.append(_fraud_guard_update(report_item, self.scanned_at))
+            self._suspicious += bool(report_item.get("is_suspicious"))
+            if self.job is not None:
+                self.job.progress = {"fraud_items_received": len(self.written_ids), "suspicious_found": self._suspicious}
+            if len(self._pending) < FRAUD_STREAM_WRITE_BATCH:
+                return
+            batch, self._pending = self._pending, []
+        self._write(batch)
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if batch:
+            self._write(batch)
+
+    def _write(self, batch: list):
+        modified = bulk_update_transactions(batch, mark_modified=False)["modified"]
+        _publish_fraud_verdicts(batch)
+        with self._lock:
+            self.modified += modified
+
+def _generate_fraud_json(prompt: str, on_item=None):
+    """
+    Streams a fraud prompt through the LLM client; report items that do not
+    match FRAUD_ITEM_SCHEMA are dropped.
+    """
+    result = llm_client.generate_json(
+        prompt, schema=FRAUD_RESPONSE_SCHEMA,
+        item_key="fraud_report", item_schema=FRAUD_ITEM_SCHEMA, on_item=on_item
+    )
+    result["fraud_report"] = [item for item in result["fraud_report"] if is_valid(item, FRAUD_ITEM_SCHEMA)]
+    return result
+
 # --- API Endpoint for Fraud Detection ---
 @app.route('/api/detect_fraud', methods=['POST'])
 def api_detect_fraud():
-    if not GEMINI_API_KEY or GEMINI_API_KEY == "YOUR_API_KEY_HERE":
-        app.logger.warn("Gemini API key not configured. Returning sample fraud detection report.")
-        # Simulate Gemini response structure for fraud detection
-        sample_fraud_response = {
-            "fraud_report": [
-                {
-                    "transaction_id": "sample_txn_1", # Replace with actual ID if testing with real data
-                    "is_suspicious": True,
-                    "reason": "Unusually large transaction amount compared to typical spending patterns.",
-                    "risk_score": 0.85,
-                    "recommended_action": "Review manually"
-                },
-                {
-                    "transaction_id": "sample_txn_2",
-                    "is_suspicious": True,
-                    "reason": "Transaction with a new payee in a high-risk category.",
-                    "risk_score": 0.65,
-                    "recommended_action": "Monitor payee activity"
-                }
-            ],
-            "summary": {
-                "total_transactions_scanned": 20, # Example count
-                "suspicious_transactions_found": 2,
-                "overall_risk_level": "Medium"
-            },
+    # 'incremental' (default) only scans new or modified transactions; 'full' rescans everything
+    mode = request.args.get('mode', 'incremental')
+    if mode not in ('incremental', 'full'):
+        return jsonify({"error": "Invalid 'mode', expected 'incremental' or 'full'"}), 400
+    return _submit_analysis_job("fraud", _run_fraud_detection, mode)
+
+def _run_fraud_detection(mode: str = 'full', inputs: dict = None):
+    """
+    Runs the fraud detection analysis and writes its verdicts back onto the
+    transactions. Returns a tuple (result, http_status).
+
+    A local rule engine (fraud_screen) decides clear-cut transactions; only
+    ambiguous ones are sent to Gemini. Without an API key the local rules
+    decide everything. inputs is a _load_analysis_inputs() result, whose
+    snapshot is used instead of get_snapshot().
+    """
+    offline = not llm_client.available
+    if offline:
+        app.logger.warn("LLM not configured or unavailable. Fraud detection uses local rules only.")
+
+    try:
+        if mode == 'incremental':
+            # Only transactions never scanned or modified since their last scan
+            transactions_to_analyze = get_transactions_pending_fraud_scan()
+            if not transactions_to_analyze:
+                return {
+                    "message": "No new or modified transactions to analyze.",
+                    "fraud_report": [],
+                    "summary": {"total_transactions_scanned": 0, "suspicious_transactions_found": 0, "overall_risk_level": "Low"},
+                    "currency": "AOA"
+                }, 200
+            target_ids = [str(t["_id"]) for t in transactions_to_analyze]
+        else:
+            target_ids = None
+        # The whole history is needed for the local statistics, whatever the scan mode.
+        # Taken after the pending ids, so it includes all of them. A pending transaction
+        # missing from a given older snapshot (e.g. the one of inputs) gets no verdict and stays pending.
+        snapshot = inputs["snapshot"] if inputs else get_snapshot()
+        scanned_count = len(target_ids) if target_ids is not None else len(snapshot)
+
+        if not scanned_count:
+            return {"message": "No transactions found to analyze."}, 200
+
+        with stage("fraud_prescreen"):
+            local_verdicts, ambiguous_ids = prescreen_transactions(snapshot.frame, target_ids, offline=offline)
+        fraud_report = list(local_verdicts)
+        chunk_errors = []
+        scanned_at = datetime.utcnow()
+        # Model verdicts are written back as they stream in
+        streamed_write_back = _StreamedFraudWriteBack(scanned_at, current_job())
+
+        if ambiguous_ids:
+            formatted_transactions_for_prompt = snapshot.prompt_rows(ambiguous_ids)
+
+            history_profile = None
+            if mode == 'incremental':
+                # The rest of the history is summarized into a compact profile for context
+                history_profile = format_fraud_history_profile(get_fraud_history_profile(exclude_ids=target_ids))
+
+            # Large batches are split into token-budgeted chunks scanned concurrently
+            try:
+                model_result = scan_in_chunks(
+                    formatted_transactions_for_prompt,
+                    lambda chunk: build_fraud_prompt(chunk, history_profile),
+                    _generate_fraud_json,
+                    logger=app.logger,
+                    on_item=streamed_write_back.add
+                )
+            finally:
+                streamed_write_back.flush()
+            for report_item in model_result["fraud_report"]:
+                report_item["screened_by"] = "gemini"
+            fraud_report.extend(model_result["fraud_report"])
+            chunk_errors = model_result.get("chunk_errors", [])
+
+        fraud_analysis_result = {
+            "fraud_report": fraud_report,
+            "summary": build_fraud_summary(
+                fraud_report, scanned_count - sum(e["transactions"] for e in chunk_errors)
+            ),
             "currency": "AOA"
         }
-        # In a real scenario, you would update the transactions based on this report.
-        # For sample, we're just returning it.
-        return jsonify(sample_fraud_response), 200
+        fraud_analysis_result["summary"].update({
+            "scan_mode": mode,
+            "decided_locally": len(local_verdicts),
+            "sent_to_model": len(ambiguous_ids)
+        })
+        if chunk_errors:
+            fraud_analysis_result["chunk_errors"] = chunk_errors
+
+        # Write the remaining verdicts (local ones, and any the stream did not deliver) in unordered bulk batches
+        fraud_updates = [
+            _fraud_guard_update(report_item, scanned_at)
+            for report_item in fraud_analysis_result.get("fraud_report") or []
+            if report_item.get("transaction_id") and report_item["transaction_id"] not in streamed_write_back.written_ids
+        ]
+        transactions_updated = streamed_write_back.modified
+        if fraud_updates:
+            transactions_updated += bulk_update_transactions(fraud_updates, mark_modified=False)["modified"]
+            _publish_fraud_verdicts(fraud_updates)
+        if fraud_updates or streamed_write_back.written_ids:
+            fraud_analysis_result["summary"]["transactions_updated"] = transactions_updated
 
-    try:
-        # Fetch recent transactions (e.g., last 30 days, or those not yet scanned for fraud)
-        # For this example, let's fetch all transactions.
-        # In a real app, you'd have more specific filtering.
-        transactions_to_analyze = get_transactions() 
-
-        if not transactions_to_analyze:
-            return jsonify({"message": "No transactions found to analyze."}), 200
-
-        formatted_transactions_for_prompt = []
-        for t in transactions_to_analyze:
-            formatted_transactions_for_prompt.append({
-                "id": str(t["_id"]), # Ensure ID is a string
-                "date": t["data_pagamento"].split("T")[0] if isinstance(t.get("data_pagamento"), str) else t.get("data_pagamento").isoformat().split("T")[0],
-                "description": t["descricao"],
-                "amount": t["valor"],
-                "type": t["tipo"]
-            })
-
-        prompt = f"""
-Analyze the following financial transactions from Angola for potential fraudulent activity. 
-For each transaction identified as suspicious, provide a reason, a risk score (0-1), and a recommended action.
-Data:
-{json.dumps(formatted_transactions_for_prompt, indent=2)}
-
-Please return the analysis in JSON format:
-{{
-    "fraud_report": [
-        {{
-            "transaction_id": "<original_transaction_id>",
-            "is_suspicious": <true_or_false>,
-            "reason": "<explanation_if_suspicious>",
-            "risk_score": <0.0_to_1.0_if_suspicious_else_0.0>,
-            "recommended_action": "<e.g., Review manually, Block account, No action needed>"
-        }}
-        // Include entries for ALL transactions scanned, marking non-suspicious ones appropriately.
-    ],
-    "summary": {{
-        "total_transactions_scanned": <count>,
-        "suspicious_transactions_found": <count>,
-        "overall_risk_level": "<Low/Medium/High based on findings>"
-    }},
-    "currency": "AOA"
-}}
-Ensure all monetary values are in AOA.
-The transaction_id in the report must match the original _id from the input.
-"""
-        model = genai.GenerativeModel('gemini-pro')
-        response = model.generate_content(prompt)
-        
-        cleaned_response_text = response.text.strip()
-        if cleaned_response_text.startswith("```json"):
-            cleaned_response_text = cleaned_response_text[7:]
-        if cleaned_response_text.endswith("```"):
-            cleaned_response_text = cleaned_response_text[:-3]
-        
-        fraud_analysis_result = json.loads(cleaned_response_text)
-
-        # Update transactions in DB with fraud analysis
-        if fraud_analysis_result.get("fraud_report"):
-            for report_item in fraud_analysis_result["fraud_report"]:
-                txn_id = report_item.get("transaction_id")
-                if txn_id:
-                    # Prepare the update for the ai_analysis_results field
-                    update_data = {
-                        "ai_analysis_results.fraud_guard": {
-                            "is_suspicious": report_item.get("is_suspicious"),
-                            "reason": report_item.get("reason"),
-                            "risk_score": report_item.get("risk_score"),
-                            "recommended_action": report_item.get("recommended_action"),
-                            "last_scanned_at": datetime.utcnow().isoformat()
-                        }
-                    }
-                    # The update_transaction function needs to handle dot notation for subdocuments
-                    update_transaction(txn_id, update_data) 
-        
-        return jsonify(fraud_analysis_result), 200
+        return fraud_analysis_result, 200
 
     except Exception as e:
         app.logger.error(f"Error in fraud detection API: {e}")
         # Fallback to sample if actual API call fails
-        return jsonify({
+        return {
             "error": "Failed to get fraud analysis from AI. Using sample data.",
             "details": str(e),
             "sample_data": { # Providing sample data on error
@@ -384,7 +726,7 @@ The transaction_id in the report must match the original _id from the input.
                  "summary": {"total_transactions_scanned": 0, "suspicious_transactions_found": 0, "overall_risk_level": "Error"},
                  "currency": "AOA"
             }
-        }), 500
+        }, 500
 
 # --- File Upload Endpoint ---
 ALLOWED_EXTENSIONS = {'csv', 'xlsx'}
@@ -399,76 +741,55 @@ def smartcredit_ai_index():
 def smartcredit_ai_static(filename):
     return send_from_directory('smartcredit_ai', filename)
 
+@app.route('/api/latest_credit_report', methods=['GET'])
+def api_latest_credit_report():
+    return _latest_report_response(get_latest_credit_report())
+
 # --- API Endpoint for Credit Analysis ---
 @app.route('/api/analyze_credit', methods=['POST'])
 def api_analyze_credit():
+    return _submit_analysis_job("credit", _run_credit_analysis)
+
+def _run_credit_analysis(inputs: dict = None):
+    """
+    Runs the credit analysis. Returns a tuple (result, http_status).
+    inputs is a _load_analysis_inputs() result; without it the data is read here.
+    """
     # Ensure add_credit_report is imported from database
     from database import add_credit_report
-    if not GEMINI_API_KEY or GEMINI_API_KEY == "YOUR_API_KEY_HERE":
-        app.logger.warn("Gemini API key not configured. Returning sample credit analysis.")
-        sample_credit_response = {
-            "credit_analysis_report": {
-                "credit_score": "Good (7/10)",
-                "recommended_credit_limit_AOA": 750000.00,
-                "key_positive_factors": [
-                    "Consistent income stream noted over the past 6 months.",
-                    "Positive net cash flow on average."
-                ],
-                "key_negative_factors": [
-                    "Occasional high-value expense spikes.",
-                    "Limited history of managing large debts (if applicable based on data)."
-                ],
-                "assessment_summary": "The entity shows a generally positive financial health with good repayment capacity. Credit limit recommended with standard caution.",
-                "confidence_level": "Medium"
-            },
-            "currency": "AOA"
-        }
-        # Store this sample report
-        add_credit_report(sample_credit_response["credit_analysis_report"])
-        return jsonify(sample_credit_response), 200
+    if not llm_client.available:
+        # Unlike the other analyses there is no local fallback, so nothing is stored
+        app.logger.warning("LLM not configured or unavailable. Credit analysis is not possible.")
+        return {"error": "Credit analysis needs the AI model, which is not configured or is temporarily unavailable."}, 503
 
     try:
-        transactions = get_transactions() # Fetch all transactions for the entity
-        if not transactions:
-            return jsonify({"error": "No transactions available for credit analysis"}), 400
-
-        # Calculate financial summary (simplified example)
-        total_income_last_6m = 0
-        total_expenses_last_6m = 0
-        # Assuming transactions have 'data_pagamento' as string ISO dates, convert to datetime for comparison
-        six_months_ago = datetime.utcnow() - timedelta(days=180)
-        
-        # Filter transactions for the last 6 months and calculate income/expenses
-        # This requires 'data_pagamento' to be datetime objects or comparable strings
-        # For simplicity, if 'data_pagamento' is already a string from DB, we might need to parse it.
-        # The current get_transactions returns them as ISO strings.
-
-        recent_transactions_for_summary = []
+        if not (len(inputs["snapshot"]) if inputs else has_transactions()):
+            return {"error": "No transactions available for credit analysis"}, 400
+
+        # Totals and highlights for the last 6 months are computed by MongoDB aggregations,
+        # so only a handful of documents are transferred whatever the history size
+        six_months_ago = (inputs["today"] if inputs else datetime.utcnow()) - timedelta(days=180)
+        since_month = six_months_ago.strftime('%Y-%m')
+        if inputs:
+            period_summary = inputs["period_summary"]
+            monthly_totals = [month for month in inputs["monthly_totals"] if month["month"] >= since_month]
+        else:
+            period_summary = get_period_summary(six_months_ago, highlights_limit=5)
+            monthly_totals = _monthly_totals(since_month=since_month)
+        income = period_summary["totals"].get("receita", {"total": 0, "count": 0})
+        expenses = period_summary["totals"].get("despesa", {"total": 0, "count": 0})
+        total_income_last_6m = income["total"]
+        total_expenses_last_6m = expenses["total"]
+        number_of_transactions_last_6m = sum(group["count"] for group in period_summary["totals"].values())
+
+        # Highlights: the 5 most recent transactions of the period
         transaction_highlights = []
-
-        for t in transactions:
-            try:
-                transaction_date = datetime.fromisoformat(t['data_pagamento'].split('T')[0])
-                if transaction_date > six_months_ago:
-                    recent_transactions_for_summary.append(t)
-                    if t['tipo'] == 'receita':
-                        total_income_last_6m += t['valor']
-                    elif t['tipo'] == 'despesa':
-                        total_expenses_last_6m += t['valor']
-            except ValueError:
-                app.logger.warn(f"Could not parse date for transaction {t['_id']}")
-                continue # Skip transactions with unparseable dates
-
-        # Select a few transaction highlights (e.g., last 5 significant ones)
-        # Sorting by date and then by amount could be one way.
-        # For simplicity, just taking last 5 processed if available
-        transactions_sorted_by_date = sorted(recent_transactions_for_summary, key=lambda x: x['data_pagamento'], reverse=True)
-        for t_highlight in transactions_sorted_by_date[:5]:
+        for t_highlight in period_summary["highlights"]:
              transaction_highlights.append({
-                 "date": t_highlight['data_pagamento'].split("T")[0],
+                 "date": t_highlight['data_pagamento'].isoformat().split("T")[0],
                  "type": t_highlight['tipo'],
                  "description": t_highlight['descricao'],
-                 "amount": f"{t_highlight['valor']} AOA"
+                 "amount": t_highlight['valor']
              })
 
 
@@ -491,45 +812,12 @@ def api_analyze_credit():
             "net_cash_flow_last_6m_AOA": total_income_last_6m - total_expenses_last_6m,
             "calculated_expense_to_income_ratio": dti_ratio_percentage,
             "average_monthly_net_flow_AOA": average_monthly_balance_AOA, # Placeholder name
-            "number_of_transactions_last_6m": len(recent_transactions_for_summary)
+            "number_of_transactions_last_6m": number_of_transactions_last_6m,
+            "monthly_totals_AOA": monthly_totals
         }
 
-        prompt = f"""
-Perform an automatic credit analysis based on the following financial data for an entity in Angola.
-Provide a credit score (e.g., a category like Poor, Fair, Good, Excellent, and a 1-10 rating), a recommended credit limit in AOA, and key factors influencing the decision.
-
-Financial Summary (last 6 months):
-{json.dumps(financial_summary, indent=2)}
-
-Transaction History Highlights (last 6 months, up to 5 transactions):
-{json.dumps(transaction_highlights, indent=2)}
-
-Please return the analysis in JSON format:
-{{
-    "credit_analysis_report": {{
-        "credit_score": "<e.g., Good (7/10)>",
-        "recommended_credit_limit_AOA": <value_float_or_int>,
-        "key_positive_factors": ["<factor 1>", "<factor 2>"],
-        "key_negative_factors": ["<factor 1>"],
-        "assessment_summary": "<textual summary of the creditworthiness and financial stability>",
-        "confidence_level": "<High/Medium/Low>"
-    }},
-    "currency": "AOA"
-}}
-Ensure all monetary values are in AOA. Base your assessment on typical Angolan business context if possible.
-Focus on financial stability, income consistency, expense management, and cash flow patterns.
-The recommended_credit_limit_AOA should be a numerical value.
-"""
-        model = genai.GenerativeModel('gemini-pro')
-        response = model.generate_content(prompt)
-        
-        cleaned_response_text = response.text.strip()
-        if cleaned_response_text.startswith("```json"):
-            cleaned_response_text = cleaned_response_text[7:]
-        if cleaned_response_text.endswith("```"):
-            cleaned_response_text = cleaned_response_text[:-3]
-        
-        credit_analysis_result_full = json.loads(cleaned_response_text)
+        prompt = build_credit_prompt(financial_summary, transaction_highlights)
+        credit_analysis_result_full = generate_ai_json(prompt, schema=CREDIT_RESPONSE_SCHEMA)
         credit_analysis_report_data = credit_analysis_result_full.get("credit_analysis_report")
 
         if credit_analysis_report_data:
@@ -541,14 +829,14 @@ The recommended_credit_limit_AOA should be a numerical value.
         else:
             app.logger.error("Gemini response did not contain 'credit_analysis_report' field.")
             # Fallback or error
-            return jsonify({"error": "AI response missing 'credit_analysis_report' field."}), 500
+            return {"error": "AI response missing 'credit_analysis_report' field."}, 500
         
-        return jsonify(credit_analysis_result_full), 200 # Return the full original response
+        return credit_analysis_result_full, 200 # Return the full original response
 
     except Exception as e:
         app.logger.error(f"Error in credit analysis API: {e}")
         # Fallback to sample if actual API call fails
-        return jsonify({
+        return {
             "error": "Failed to get credit analysis from AI. Using sample data.",
             "details": str(e),
             "sample_data": { # Providing sample data on error
@@ -562,7 +850,7 @@ The recommended_credit_limit_AOA should be a numerical value.
                 },
                 "currency": "AOA"
             }
-        }), 500
+        }, 500
 
 def allowed_file(filename):
     return '.' in filename and \
@@ -581,109 +869,80 @@ def upload_transactions_file():
         filename = file.filename # Secure filename can be used here if needed
         
         try:
-            if filename.endswith('.csv'):
-                # For CSV, try to infer encoding, common ones are utf-8 and latin1
-                try:
-                    df = pd.read_csv(file.stream, encoding='utf-8')
-                except UnicodeDecodeError:
-                    file.stream.seek(0) # Reset stream position
-                    df = pd.read_csv(file.stream, encoding='latin1')
-            elif filename.endswith('.xlsx'):
-                df = pd.read_excel(file.stream, engine='openpyxl')
-            else:
-                return jsonify({"error": "Unsupported file type"}), 400
-
-            # Normalize column names (example: 'Data de Pagamento' to 'data_de_pagamento')
-            original_columns = df.columns.tolist()
-            df.columns = df.columns.str.lower().str.replace(' ', '_').str.replace('-', '_')
-            
-            # Define expected columns based on the normalized names
-            # The issue mentions 'data-de-pagamento', which normalizes to 'data_de_pagamento'
-            required_columns_normalized = ['tipo', 'descricao', 'valor', 'data_de_pagamento', 'status']
-            
-            missing_cols = [col for col in required_columns_normalized if col not in df.columns]
-            if missing_cols:
-                return jsonify({
-                    "error": f"Missing required columns in file after normalization: {', '.join(missing_cols)}. Original columns found: {original_columns}"
-                }), 400
-
+            started_at = time.perf_counter()
+            upload_id = uuid.uuid4().hex
+            rows_processed = 0
             imported_count = 0
             errors = []
 
-            for index, row in df.iterrows():
-                try:
-                    # Use .get(column_name, default_value) for robustness if a column might sometimes be missing
-                    # despite the check above, or handle NaN values explicitly.
-                    tipo = str(row.get('tipo', '')).strip().lower()
-                    descricao = str(row.get('descricao', '')).strip()
-                    valor_raw = row.get('valor')
-                    data_pagamento_raw = row.get('data_de_pagamento')
-                    status = str(row.get('status', '')).strip().lower()
-
-                    if pd.isna(valor_raw) or valor_raw == '':
-                        errors.append(f"Row {index + 2}: 'valor' is missing.")
-                        continue
-                    try:
-                        valor = float(valor_raw)
-                    except ValueError:
-                        errors.append(f"Row {index + 2}: 'valor' ({valor_raw}) is not a valid number.")
-                        continue
-                    
-                    if pd.isna(data_pagamento_raw) or data_pagamento_raw == '':
-                        errors.append(f"Row {index + 2}: 'data_de_pagamento' is missing.")
-                        continue
-                    try:
-                        # Pandas to_datetime can infer various formats; specify if a particular format is expected
-                        data_pagamento = pd.to_datetime(data_pagamento_raw).to_pydatetime()
-                    except Exception as e_date:
-                        errors.append(f"Row {index + 2}: 'data_de_pagamento' ({data_pagamento_raw}) is not a valid date or format. Error: {e_date}")
-                        continue
-
-                    if not tipo: errors.append(f"Row {index + 2}: 'tipo' is missing."); continue
-                    if not descricao: errors.append(f"Row {index + 2}: 'descricao' is missing."); continue
-                    if not status: errors.append(f"Row {index + 2}: 'status' is missing."); continue
-
-
-                    transaction_data = {
-                        "tipo": tipo,
-                        "descricao": descricao,
-                        "valor": valor,
-                        "data_pagamento": data_pagamento,
-                        "status": status
-                        # ai_analysis_results is initialized by add_transaction
-                    }
-                    
-                    if transaction_data['tipo'] not in ['receita', 'despesa']:
-                        errors.append(f"Row {index + 2}: Invalid 'tipo': {transaction_data['tipo']}. Must be 'receita' or 'despesa'.")
-                        continue
-                    if transaction_data['status'] not in ['pago', 'pendente', 'agendado']:
-                        errors.append(f"Row {index + 2}: Invalid 'status': {transaction_data['status']}. Must be 'pago', 'pendente', or 'agendado'.")
-                        continue
-                    
-                    add_transaction(transaction_data) # This function already initializes "ai_analysis_results"
-                    imported_count += 1
-                except Exception as e_row:
-                    errors.append(f"Row {index + 2}: Error processing row - {str(e_row)}")
-            
+            # Rows are read, validated and written chunk by chunk so memory stays bounded
+            for df in iter_upload_frames(file.stream, filename):
+                # Normalize column names (example: 'Data de Pagamento' to 'data_de_pagamento')
+                original_columns = df.columns.tolist()
+                missing_cols = normalize_columns(df)
+                if missing_cols:
+                    return jsonify({
+                        "error": f"Missing required columns in file after normalization: {', '.join(missing_cols)}. Original columns found: {original_columns}"
+                    }), 400
+
+                with stage("upload_validate"):
+                    documents, row_numbers, chunk_errors = validate_transactions_frame(df)
+                errors.extend(chunk_errors)
+                chunk_imported, failures = add_transactions_bulk(documents)
+                imported_count += chunk_imported
+                UPLOAD_ROWS.inc(chunk_imported, outcome="imported")
+                UPLOAD_ROWS.inc(len(df) - chunk_imported, outcome="rejected")
+                for index, error_message in failures:
+                    errors.append(f"Row {row_numbers[index]}: Error processing row - {error_message}")
+                rows_processed += len(df)
+
+                progress_event = {"upload_id": upload_id, "filename": filename, "rows_processed": rows_processed, "rows_imported": imported_count}
+                if chunk_imported and len(documents) <= EVENTS_MAX_DELTA_ROWS:
+                    failed_indexes = {index for index, _ in failures}
+                    progress_event["transactions"] = [doc for index, doc in enumerate(documents) if index not in failed_indexes]
+                else:
+                    progress_event["reload"] = chunk_imported > 0
+                event_broker.publish("import_progress", progress_event)
+
+            elapsed_seconds = time.perf_counter() - started_at
+            import_stats = {
+                "rows_processed": rows_processed,
+                "rows_imported": imported_count,
+                "elapsed_seconds": round(elapsed_seconds, 3),
+                "rows_per_second": round(rows_processed / elapsed_seconds, 1) if elapsed_seconds > 0 else None
+            }
+
+            event_broker.publish("import_completed", {"upload_id": upload_id, "filename": filename, "stats": import_stats, "errors": len(errors)})
+
             response_message = ""
             if imported_count > 0:
                 response_message = f"{imported_count} transactions imported successfully."
             
             if errors:
                 if imported_count > 0:
-                    return jsonify({"message": response_message, "errors": errors}), 207 # Multi-Status
+                    return jsonify({"message": response_message, "errors": errors, "stats": import_stats}), 207 # Multi-Status
                 else:
-                    return jsonify({"error": "Failed to import any transactions. See errors.", "errors": errors}), 400
+                    return jsonify({"error": "Failed to import any transactions. See errors.", "errors": errors, "stats": import_stats}), 400
             elif imported_count == 0:
-                 return jsonify({"message": "No transactions found or processed in the file."}), 200
+                 return jsonify({"message": "No transactions found or processed in the file.", "stats": import_stats}), 200
             
-            return jsonify({"message": response_message}), 200
+            return jsonify({"message": response_message, "stats": import_stats}), 200
 
         except pd.errors.EmptyDataError:
             return jsonify({"error": "The uploaded file is empty."}), 400
         except Exception as e_file:
             app.logger.error(f"Error processing uploaded file: {e_file}")
-            return jsonify({"error": f"An error occurred while processing the file: {str(e_file)}"}), 500
+            # Chunks written before the failure stay in the database, so the client is told how far the import got
+            if imported_count:
+                event_broker.publish("import_completed", {
+                    "upload_id": upload_id, "filename": filename, "errors": len(errors) + 1,
+                    "stats": {"rows_processed": rows_processed, "rows_imported": imported_count}
+                })
+            return jsonify({
+                "error": f"An error occurred while processing the file: {str(e_file)}",
+                "errors": errors,
+                "stats": {"rows_processed": rows_processed, "rows_imported": imported_count}
+            }), 500
     else:
         return jsonify({"error": "File type not allowed. Please upload CSV or XLSX."}), 400
 
@@ -696,3 +955,151 @@ def risksense_analytics_index():
 @app.route('/risksense_analytics/<path:filename>')
 def risksense_analytics_static(filename):
     return send_from_directory('risksense_analytics', filename)
+
+@app.route('/api/latest_risk_report', methods=['GET'])
+def api_latest_risk_report():
+    return _latest_report_response(get_latest_risk_report())
+
+# --- API Endpoint for Risk Analysis ---
+@app.route('/api/analyze_risk', methods=['POST'])
+def api_analyze_risk():
+    result, status = _run_risk_analysis()
+    return jsonify(result), status
+
+def _run_risk_analysis(inputs: dict = None):
+    """
+    Computes the risk report locally (see risk_engine.py). The latest stored
+    report is returned as is while the data it was computed from is unchanged.
+    inputs is a _load_analysis_inputs() result; without it the data is read here.
+    Returns a tuple (result, http_status).
+    """
+    try:
+        if inputs:
+            today, monthly_totals, aggregates = inputs["today"], inputs["monthly_totals"], inputs["risk_aggregates"]
+        else:
+            today = datetime.utcnow()
+            monthly_totals = _monthly_totals()
+            aggregates = None
+        if not monthly_totals:
+            return {"error": "No transactions available for analysis"}, 400
+
+        if aggregates is None:
+            aggregates = get_risk_aggregates(today, today - timedelta(days=180), UPCOMING_HORIZON_DAYS)
+        data_hash = risk_data_hash(monthly_totals, aggregates, today)
+        latest_report = get_latest_risk_report()
+        if latest_report and latest_report.get("risk_analysis_report", {}).get("data_hash") == data_hash:
+            latest_report.pop("_id", None)
+            latest_report.pop("created_at", None)
+            return {**latest_report, "cached": True}, 200 # get_latest_risk_report returns a copy
+
+        with stage("risk_compute"):
+            risk_report = build_risk_report(monthly_totals, aggregates, today)
+        result = {
+            "risk_analysis_report": risk_report,
+            "analysis_timestamp": risk_report["analysis_timestamp"],
+            "currency": "AOA"
+        }
+        report_id = add_risk_report(result)
+        if not report_id:
+            app.logger.error("Failed to store risk report.")
+        return {**result, "cached": False}, 200
+
+    except Exception as e:
+        app.logger.error(f"Error in risk analysis API: {e}")
+        return {
+            "error": "Failed to compute the risk analysis. Using sample data.",
+            "details": str(e),
+            "sample_data": {
+                "risk_analysis_report": {
+                    "overall_risk_assessment": "Error",
+                    "key_risk_indicators_summary": {},
+                    "identified_risks": [{
+                        "risk_name": "Error Processing",
+                        "description": str(e),
+                        "potential_impact": "Low",
+                        "likelihood": "Low",
+                        "suggested_mitigation": "Try again later."
+                    }]
+                },
+                "analysis_timestamp": datetime.utcnow().isoformat()
+            }
+        }, 500
+
+# --- API Endpoint running every analysis ---
+@app.route('/api/analyze_all', methods=['POST'])
+def api_analyze_all():
+    return _submit_analysis_job("all", _run_all_analyses)
+
+ALL_ANALYSES = {
+    "cashflow": _run_cashflow_analysis,
+    "fraud": lambda inputs: _run_fraud_detection('incremental', inputs),
+    "credit": _run_credit_analysis,
+    "risk": _run_risk_analysis,
+}
+
+def _load_analysis_inputs():
+    """
+    Reads the data the analyses share: the monthly totals, the aggregations
+    of the last 6 months and the transaction snapshot.
+    """
+    today = datetime.utcnow()
+    six_months_ago = today - timedelta(days=180)
+    risk_aggregates = get_risk_aggregates(today, six_months_ago, UPCOMING_HORIZON_DAYS)
+    # Same shape as get_expense_breakdown(six_months_ago), from the per-description totals
+    expenses = [source for source in risk_aggregates["sources"] if source["tipo"] == 'despesa']
+    return {
+        "today": today,
+        "monthly_totals": _monthly_totals(),
+        "risk_aggregates": risk_aggregates,
+        "expense_breakdown": {
+            "total": sum(source["total"] for source in expenses),
+            "categories": [{"descricao": source["descricao"], "total": source["total"]} for source in expenses[:5]]
+        },
+        "period_summary": get_period_summary(six_months_ago, highlights_limit=5),
+        "snapshot": get_snapshot()
+    }
+
+def _run_all_analyses():
+    """
+    Runs the cash-flow, fraud, credit and risk analyses concurrently, so the
+    job takes as long as the slowest of them. The data they share is read
+    once (see _load_analysis_inputs) and each analysis stores its own report
+    as usual. Returns a tuple (result, http_status) with
+    {name: {"http_status", "result", "elapsed_ms"}}.
+    """
+    transactions_version = get_transactions_version()
+    try:
+        with stage("analysis_inputs_load"):
+            inputs = _load_analysis_inputs()
+    except Exception as e:
+        app.logger.error(f"Error loading the analysis data: {e}")
+        return {"error": "Failed to load the transaction data", "details": str(e)}, 500
+    job = current_job()
+    progress_lock = threading.Lock()
+
+    def run(name):
+        started = time.perf_counter()
+        try:
+            result, status = ALL_ANALYSES[name](inputs)
+        except Exception as e:
+            app.logger.error(f"Error in '{name}' analysis: {e}")
+            result, status = {"error": str(e)}, 500
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        if job is not None:
+            with progress_lock:
+                job.progress = {**(job.progress or {}), name: status}
+        return name, {"http_status": status, "result": result, "elapsed_ms": elapsed_ms}
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(ALL_ANALYSES), thread_name_prefix="analyze-all") as executor:
+        futures = [executor.submit(copy_timing_context().run, run, name) for name in ALL_ANALYSES]
+        analyses = dict(future.result() for future in futures)
+    succeeded = any(200 <= analysis["http_status"] < 300 for analysis in analyses.values())
+    return {
+        "analyses": analyses,
+        "transactions_version": transactions_version,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+    }, 200 if succeeded else 500
+
+if __name__ == '__main__':
+    app.run(debug=True, port=5000)
@@ -0,0 +1,330 @@
+"""
+End-to-end benchmark of the dashboard API on synthetic data.
+
+Drives /api/upload_transactions, /api/transactions and the analysis
+endpoints through the Flask test client, with the fake LLM provider
+(configurable latency) and either mongomock or a real MongoDB, and reports
+p50/p95 latency, throughput and peak RSS per scenario.
+
+    python benchmark_app.py --rows 20000 --llm-latency 0.5
+    python benchmark_app.py --mongo mongodb://localhost:27017 --json results.json
+    python benchmark_app.py --baseline results.json --tolerance 0.25
+
+With --baseline the run fails (exit code 1) when a scenario's p95 latency
+grew, or its throughput dropped, by more than the tolerance.
+"""
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import numpy as np
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from synthetic_data import generate_transactions, to_upload_file
+
+ANALYSIS_ENDPOINTS = [
+    ("analyze_cashflow", "/api/analyze_cashflow"),
+    ("detect_fraud", "/api/detect_fraud?mode=full"),
+    ("analyze_credit", "/api/analyze_credit"),
+    ("analyze_risk", "/api/analyze_risk"),
+    ("analyze_all", "/api/analyze_all"),
+]
+JOB_POLL_SECONDS = 0.01
+PAGE_SIZE = 100
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000, help="Synthetic transactions to upload")
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--income-share", type=float, default=0.35)
+    parser.add_argument("--anomaly-rate", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--file-format", choices=["csv", "xlsx"], default="csv")
+    parser.add_argument("--upload-batches", type=int, default=4, help="Number of files the data is uploaded in")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per read/insert scenario")
+    parser.add_argument("--concurrency", type=int, default=4, help="Client threads for the read/insert scenarios")
+    parser.add_argument("--analysis-iterations", type=int, default=3)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Seconds per fake LLM call")
+    parser.add_argument("--llm-cache", action="store_true", help="Keep the LLM response cache enabled")
+    parser.add_argument("--mongo", default="mongomock", help="'mongomock' or a MongoDB URI (its database is dropped)")
+    parser.add_argument("--db-name", default="finance_dashboard_benchmark")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--baseline", help="Results file of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression against the baseline")
+    return parser.parse_args()
+
+
+def _patch_mongomock_bulk_updates(mongomock):
+    # pymongo >= 4.9 passes 'sort' to bulk update operations, which mongomock 4.x does not accept
+    builder = mongomock.collection.BulkOperationBuilder
+    add_update = builder.add_update
+
+    def add_update_without_sort(self, *args, sort=None, **kwargs):
+        return add_update(self, *args, **kwargs)
+    builder.add_update = add_update_without_sort
+
+
+def load_app(args):
+    """
+    Configures the fake LLM provider and the database, then imports the app.
+    """
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["FAKE_LLM_LATENCY_SECONDS"] = str(args.llm_latency)
+    if args.mongo != "mongomock":
+        os.environ["MONGO_URI"] = args.mongo
+    os.environ["MONGO_DB_NAME"] = args.db_name
+
+    import database
+    if args.mongo == "mongomock":
+        try:
+            import mongomock
+        except ImportError:
+            sys.exit("mongomock is not installed: pip install mongomock, or pass --mongo <uri>")
+        _patch_mongomock_bulk_updates(mongomock)
+        database.client = mongomock.MongoClient()
+        database.db = database.client[args.db_name]
+    else:
+        database.get_db().client.drop_database(args.db_name)
+
+    import app as app_module
+    app_module.app.logger.setLevel("WARNING")
+    if not args.llm_cache:
+        app_module.llm_client.cache = None
+    return app_module
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError: # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class Scenario:
+    """
+    Latencies and errors of one benchmark scenario.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies_ms = []
+        self.errors = 0
+        self.extra = {}
+        self._lock = threading.Lock()
+        self._started = None
+        self._elapsed = 0.0
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._elapsed = time.perf_counter() - self._started
+
+    def record(self, latency_ms: float, ok: bool):
+        with self._lock:
+            self.latencies_ms.append(latency_ms)
+            self.errors += not ok
+
+    def summary(self):
+        latencies = np.array(self.latencies_ms) if self.latencies_ms else np.zeros(1)
+        return {
+            "requests": len(self.latencies_ms),
+            "errors": self.errors,
+            "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+            "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+            "max_ms": round(float(latencies.max()), 2),
+            "throughput_rps": round(len(self.latencies_ms) / self._elapsed, 2) if self._elapsed else 0.0,
+            "peak_rss_mb": peak_rss_mb(),
+            **self.extra
+        }
+
+
+def _timed(scenario: Scenario, send):
+    started = time.perf_counter()
+    response = send()
+    scenario.record((time.perf_counter() - started) * 1000, response.status_code < 400)
+    return response
+
+
+def _wait_for_job(client, response):
+    job = response.get_json()
+    while job.get("status") in ("queued", "running"):
+        time.sleep(JOB_POLL_SECONDS)
+        job = client.get(f"/api/jobs/{job['job_id']}").get_json()
+    return job
+
+
+def run_concurrently(app_module, scenario: Scenario, count: int, concurrency: int, request_fn):
+    """
+    Calls request_fn(client, index) count times from 'concurrency' threads,
+    each with its own test client.
+    """
+    local = threading.local()
+
+    def run(index):
+        if not hasattr(local, "client"):
+            local.client = app_module.app.test_client()
+        request_fn(local.client, index)
+
+    with scenario, ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(run, range(count)))
+
+
+def bench_upload(app_module, frame, args):
+    client = app_module.app.test_client()
+    scenario = Scenario("upload_transactions")
+    batches = np.array_split(np.arange(len(frame)), max(args.upload_batches, 1))
+    with scenario:
+        for rows in batches:
+            data, filename = to_upload_file(frame.iloc[rows], args.file_format)
+            _timed(scenario, lambda: client.post(
+                "/api/upload_transactions", data={"transaction_file": (io.BytesIO(data), filename)},
+                content_type="multipart/form-data"
+            ))
+    scenario.extra["rows_per_second"] = round(len(frame) / scenario._elapsed, 1) if scenario._elapsed else 0.0
+    return scenario
+
+
+def _new_transaction(index: int):
+    return {
+        "tipo": "despesa" if index % 3 else "receita",
+        "descricao": "Combustível",
+        "valor": 25000 + index,
+        "data_pagamento": datetime.utcnow().strftime("%Y-%m-%d"),
+        "status": "pago"
+    }
+
+
+def bench_insert(app_module, args):
+    scenario = Scenario("insert_transaction")
+    run_concurrently(app_module, scenario, args.requests, args.concurrency, lambda client, index: _timed(
+        scenario, lambda: client.post("/api/transactions", json=_new_transaction(index))
+    ))
+    return scenario
+
+
+def bench_list(app_module, args):
+    scenario = Scenario("list_transactions_page")
+
+    def read_pages(client, index):
+        # Every client walks a few pages with the keyset cursor
+        query = {"limit": PAGE_SIZE, "sort": "data_pagamento", "order": "desc"}
+        response = _timed(scenario, lambda: client.get("/api/transactions", query_string=query))
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor and index % 2:
+            _timed(scenario, lambda: client.get("/api/transactions", query_string={**query, "after": cursor}))
+
+    run_concurrently(app_module, scenario, args.requests, args.concurrency, read_pages)
+    return scenario
+
+
+def bench_analyses(app_module, args):
+    client = app_module.app.test_client()
+    scenarios = []
+    for name, url in ANALYSIS_ENDPOINTS:
+        scenario = Scenario(name)
+        with scenario:
+            for iteration in range(args.analysis_iterations):
+                # New data every iteration, so no analysis is answered from a cache keyed on the data
+                client.post("/api/transactions", json=_new_transaction(iteration))
+                started = time.perf_counter()
+                response = client.post(url)
+                status = response.status_code
+                if status == 202:
+                    status = _wait_for_job(client, response).get("http_status") or 500
+                scenario.record((time.perf_counter() - started) * 1000, status < 400)
+        scenarios.append(scenario)
+    return scenarios
+
+
+def fraud_detection_quality(app_module, frame, anomalies):
+    """
+    Share of the injected anomalies that the last fraud scan flagged,
+    matching transactions on (tipo, descricao, valor, date).
+    """
+    client = app_module.app.test_client()
+    response = client.get("/api/transactions?suspicious=true&fields=tipo,descricao,valor,data_pagamento&format=ndjson")
+    flagged = set()
+    for line in response.get_data(as_text=True).splitlines():
+        transaction = json.loads(line)
+        flagged.add((transaction["tipo"], transaction["descricao"], round(float(transaction["valor"]), 2), transaction["data_pagamento"][:10]))
+    anomalous = frame.iloc[anomalies["row"].to_numpy()]
+    keys = zip(anomalous["tipo"], anomalous["descricao"], anomalous["valor"].round(2), anomalous["data_pagamento"].dt.strftime("%Y-%m-%d"))
+    detected = np.array([key in flagged for key in keys], dtype=bool)
+    by_kind = {
+        kind: round(float(detected[(anomalies["kind"] == kind).to_numpy()].mean()), 3)
+        for kind in sorted(anomalies["kind"].unique())
+    }
+    return {"flagged_transactions": len(flagged), "injected_anomalies": len(anomalies), "detected_share_by_kind": by_kind}
+
+
+def compare_with_baseline(results: dict, baseline: dict, tolerance: float):
+    """
+    Returns the regressions of results against baseline as readable lines.
+    """
+    regressions = []
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        if previous["p95_ms"] and current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['p95_ms']} ms -> {current['p95_ms']} ms")
+        if previous["throughput_rps"] and current["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {previous['throughput_rps']} -> {current['throughput_rps']} req/s")
+    return regressions
+
+
+def print_report(results: dict):
+    print(f"{'scenario':<24}{'requests':>9}{'errors':>8}{'p50 ms':>11}{'p95 ms':>11}{'max ms':>11}{'req/s':>10}{'peak RSS MB':>13}")
+    for name, summary in results["scenarios"].items():
+        print(f"{name:<24}{summary['requests']:>9}{summary['errors']:>8}{summary['p50_ms']:>11.1f}{summary['p95_ms']:>11.1f}"
+              f"{summary['max_ms']:>11.1f}{summary['throughput_rps']:>10.1f}{summary['peak_rss_mb'] or 0:>13.1f}")
+    upload = results["scenarios"].get("upload_transactions")
+    if upload:
+        print(f"upload: {upload['rows_per_second']} rows/s")
+    print(f"fraud detection: {json.dumps(results['fraud_detection'])}")
+
+
+def main():
+    args = parse_args()
+    frame, anomalies = generate_transactions(args.rows, args.months, args.income_share, args.anomaly_rate, args.seed)
+    app_module = load_app(args)
+
+    scenarios = [bench_upload(app_module, frame, args), bench_list(app_module, args)]
+    scenarios.extend(bench_analyses(app_module, args))
+    quality = fraud_detection_quality(app_module, frame, anomalies)
+    # Inserts last, so the analyses above run on exactly the generated data plus one row per iteration
+    scenarios.append(bench_insert(app_module, args))
+
+    results = {
+        "config": {key: value for key, value in vars(args).items() if key not in ("json", "baseline")},
+        "transactions": len(frame),
+        "scenarios": {scenario.name: scenario.summary() for scenario in scenarios},
+        "fraud_detection": quality,
+        "peak_rss_mb": peak_rss_mb()
+    }
+    print_report(results)
+
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump(results, output, indent=2)
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare_with_baseline(results, json.load(baseline_file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Measures the prompts of the LLM-backed analyses on synthetic data: the
+size of the production cash-flow, fraud and credit prompts (see prompts.py)
+and, for the transaction table, the old encoding (indented JSON) against
+the compact CSV encoding of prompt_encoding.
+
+    python benchmark_prompts.py [--transactions 500] [--live]
+
+With --live and GEMINI_API_KEY set, the production prompts are also sent to
+Gemini to measure real token counts and end-to-end latency.
+"""
+import os
+import json
+import time
+import argparse
+from datetime import datetime, timedelta
+
+from forecasting import forecast_cashflow
+from fraud_scan import chunk_transactions
+from llm_client import LLM_MODEL_NAME
+from prompt_encoding import encode_transactions, estimate_tokens
+from prompts import build_cashflow_prompt, build_credit_prompt, build_fraud_prompt, format_fraud_history_profile
+from synthetic_data import generate_transactions
+
+
+def monthly_totals(frame):
+    """
+    The frame as app._monthly_totals returns the monthly rollups.
+    """
+    months = frame["data_pagamento"].dt.strftime("%Y-%m")
+    sums = frame.groupby([months, "tipo"])["valor"].sum()
+    counts = frame.groupby(months).size()
+    return [
+        {
+            "month": month,
+            "income_AOA": round(float(sums.get((month, "receita"), 0)), 2),
+            "expenses_AOA": round(float(sums.get((month, "despesa"), 0)), 2),
+            "transactions": int(count)
+        }
+        for month, count in counts.items()
+    ]
+
+
+def fraud_rows(frame):
+    """
+    The frame as snapshot.prompt_rows returns transactions.
+    """
+    return [
+        {"id": "%024x" % position, "date": day.strftime("%Y-%m-%d"), "type": tipo, "description": descricao, "amount": valor}
+        for position, (tipo, descricao, valor, day) in enumerate(
+            zip(frame["tipo"], frame["descricao"], frame["valor"].tolist(), frame["data_pagamento"])
+        )
+    ]
+
+
+def history_profile(frame):
+    """
+    The frame as database.get_fraud_history_profile groups scanned history.
+    """
+    groups = frame.groupby(["tipo", "descricao"])["valor"]
+    stats = groups.agg(["count", "mean", "min", "max"]).join(groups.std(ddof=0).rename("std"))
+    return format_fraud_history_profile([
+        {"_id": {"tipo": tipo, "descricao": descricao}, "suspicious": 0, **row}
+        for (tipo, descricao), row in stats.sort_values("count", ascending=False).to_dict("index").items()
+    ])
+
+
+def credit_inputs(frame, today: datetime):
+    """
+    The financial summary and highlights _run_credit_analysis builds for the last 6 months.
+    """
+    six_months_ago = today - timedelta(days=180)
+    period = frame[frame["data_pagamento"] > six_months_ago]
+    income = float(period.loc[period["tipo"] == "receita", "valor"].sum())
+    expenses = float(period.loc[period["tipo"] == "despesa", "valor"].sum())
+    financial_summary = {
+        "total_income_last_6m_AOA": income,
+        "total_expenses_last_6m_AOA": expenses,
+        "net_cash_flow_last_6m_AOA": income - expenses,
+        "calculated_expense_to_income_ratio": f"{expenses / income * 100:.2f}% (Expense Ratio)" if income else "N/A",
+        "average_monthly_net_flow_AOA": (income - expenses) / 6 if income else 0,
+        "number_of_transactions_last_6m": len(period),
+        "monthly_totals_AOA": monthly_totals(period)
+    }
+    highlights = [
+        {"date": row["data_pagamento"].strftime("%Y-%m-%d"), "type": row["tipo"], "description": row["descricao"], "amount": row["valor"]}
+        for row in period.sort_values("data_pagamento", ascending=False).head(5).to_dict("records")
+    ]
+    return financial_summary, highlights
+
+
+def measure(build, repeat: int = 20):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = build()
+    elapsed_ms = (time.perf_counter() - started) / repeat * 1000
+    return result, elapsed_ms
+
+
+def report(name: str, texts: list, build_ms: float, transactions: int):
+    chars = sum(len(text) for text in texts)
+    tokens = sum(estimate_tokens(text) for text in texts)
+    print(f"{name:>14}: {chars:>9,} chars  ~{tokens:>8,} tokens  {len(texts):>3} prompt(s)  "
+          f"{chars / transactions:7.1f} chars/transaction  build {build_ms:.2f} ms")
+
+
+def live_latency(model, prompt: str):
+    tokens = model.count_tokens(prompt).total_tokens
+    started = time.perf_counter()
+    model.generate_content(prompt)
+    return tokens, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--transactions", type=int, default=500)
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--live", action="store_true", help="also call Gemini (needs GEMINI_API_KEY)")
+    args = parser.parse_args()
+
+    today = datetime.utcnow()
+    frame, _ = generate_transactions(rows=args.transactions, months=args.months, seed=args.seed, end=today)
+    frame = frame[frame["data_pagamento"] <= today]
+    count = len(frame)
+    rows = fraud_rows(frame)
+
+    tables = {
+        "json_indent_2": lambda: json.dumps(rows, indent=2),
+        "compact_csv": lambda: encode_transactions(rows),
+    }
+    sizes = {}
+    print("Transaction table:")
+    for name, encoder in tables.items():
+        text, encode_ms = measure(encoder)
+        sizes[name] = len(text)
+        report(name, [text], encode_ms, count)
+    print(f"compact_csv is {sizes['compact_csv'] / sizes['json_indent_2']:.0%} of the json_indent_2 size")
+
+    totals = monthly_totals(frame)
+    analysis = forecast_cashflow(totals, today)
+    profile = history_profile(frame)
+    financial_summary, highlights = credit_inputs(frame, today)
+    builders = {
+        "cashflow": lambda: [build_cashflow_prompt(totals, analysis)],
+        # One prompt per chunk, as fraud_scan.scan_in_chunks sends them
+        "fraud": lambda: [build_fraud_prompt(chunk, profile) for chunk in chunk_transactions(rows)],
+        "credit": lambda: [build_credit_prompt(financial_summary, highlights)],
+    }
+    prompts = {}
+    print("Production prompts:")
+    for name, build in builders.items():
+        prompts[name], build_ms = measure(build)
+        report(name, prompts[name], build_ms, count)
+
+    if args.live:
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            parser.error("--live needs GEMINI_API_KEY")
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        model = genai.GenerativeModel(LLM_MODEL_NAME)
+        for name, texts in prompts.items():
+            tokens, seconds = live_latency(model, texts[0])
+            print(f"{name:>14}: {tokens:>8,} tokens (Gemini count, first prompt)  end-to-end {seconds:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import os
+import gzip
+import zlib
+from flask import request
+
+try:
+    import brotli
+except ImportError: # only gzip is offered
+    brotli = None
+
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() in ("1", "true", "yes")
+# Smaller bodies are sent as they are; streamed bodies are always compressed
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+# Low brotli qualities compress about as well as gzip -6, much faster than the default 11
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+COMPRESSIBLE_MIMETYPES = {"application/json", "application/x-ndjson", "application/javascript", "text/html", "text/css", "text/csv", "text/plain"}
+# Preference order when the client accepts several with the same quality
+SUPPORTED_ENCODINGS = ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def _compressor(encoding: str):
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+        return compressor.process, compressor.finish
+    # wbits=31: gzip container
+    compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress, compressor.flush
+
+
+def _compress(data: bytes, encoding: str):
+    if encoding == "br":
+        return brotli.compress(data, quality=COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=COMPRESSION_GZIP_LEVEL)
+
+
+def _compress_stream(chunks, encoding: str):
+    compress, finish = _compressor(encoding)
+    try:
+        for chunk in chunks:
+            compressed = compress(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+            if compressed:
+                yield compressed
+        yield finish()
+    finally:
+        # Releases the database cursor when the client disconnects mid-stream
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+
+def compress_response(response):
+    """
+    after_request hook: compresses JSON/NDJSON/text responses with the best
+    encoding of the request's Accept-Encoding (br when the brotli module
+    is installed, else gzip). File downloads (direct passthrough),
+    Server-Sent Events and already encoded responses are left alone.
+    """
+    if (response.mimetype not in COMPRESSIBLE_MIMETYPES or response.direct_passthrough
+            or "Content-Encoding" in response.headers or not 200 <= response.status_code < 300
+            or response.status_code == 204):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = request.accept_encodings.best_match(SUPPORTED_ENCODINGS)
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, encoding)
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < COMPRESSION_MIN_BYTES:
+            return response
+        response.set_data(_compress(data, encoding))
+    response.headers["Content-Encoding"] = encoding
+    # The compressed body is a different representation of the same resource
+    if response.get_etag()[0]:
+        response.set_etag(response.get_etag()[0], weak=True)
+    return response
+
+
+def init_compression(app):
+    if COMPRESSION_ENABLED:
+        app.after_request(compress_response)
@@ -1,13 +1,38 @@
 import os
-from pymongo import MongoClient
+import json
+import threading
+import base64
+import time
+import pymongo
+from pymongo import MongoClient, UpdateOne, ReturnDocument, ASCENDING, DESCENDING
+from pymongo.monitoring import CommandListener, ConnectionPoolListener
+from pymongo.errors import BulkWriteError, PyMongoError
 from dotenv import load_dotenv
 from bson import ObjectId
-from datetime import datetime
+from bson.errors import InvalidId
+from datetime import datetime, timedelta
+
+from metrics import METRICS_ENABLED, MONGO_COMMAND_SECONDS, MONGO_COMMANDS, TRANSACTIONS_INSERTED, stage
 
 load_dotenv()
 
 MONGO_URI = os.getenv("MONGO_URI")
 MONGO_DB_NAME = os.getenv("MONGO_DB_NAME")
+# Connection pool and timeouts (milliseconds); an empty value keeps the driver default
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000")
+MONGO_WAIT_QUEUE_TIMEOUT_MS = os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "10000")
+MONGO_SERVER_SELECTION_TIMEOUT_MS = os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")
+MONGO_CONNECT_TIMEOUT_MS = os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000")
+MONGO_SOCKET_TIMEOUT_MS = os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000")
+# Read/write concern, e.g. MONGO_READ_CONCERN=majority, MONGO_WRITE_CONCERN=majority or 1
+MONGO_READ_CONCERN = os.getenv("MONGO_READ_CONCERN", "")
+MONGO_READ_PREFERENCE = os.getenv("MONGO_READ_PREFERENCE", "")
+MONGO_WRITE_CONCERN = os.getenv("MONGO_WRITE_CONCERN", "")
+MONGO_WRITE_CONCERN_TIMEOUT_MS = os.getenv("MONGO_WRITE_CONCERN_TIMEOUT_MS", "")
+# Deadline of the /healthz ping
+MONGO_HEALTHCHECK_TIMEOUT_MS = int(os.getenv("MONGO_HEALTHCHECK_TIMEOUT_MS", "1000"))
 # MONGO_COLLECTION_NAME = os.getenv("MONGO_COLLECTION_NAME") # Not used directly here, but good to have loaded
 
 # Expected document structure:
@@ -27,18 +52,319 @@ MONGO_DB_NAME = os.getenv("MONGO_DB_NAME")
 
 client = None
 db = None
+_client_lock = threading.Lock()
+
+class PoolStatsListener(ConnectionPoolListener):
+    """
+    Counts connection pool events of this process's MongoClient.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stats = {
+                "connections_open": 0, "connections_in_use": 0, "connections_created": 0,
+                "checkouts": 0, "checkout_failures": 0, "pool_clears": 0
+            }
+
+    def _count(self, **deltas):
+        with self._lock:
+            for key, delta in deltas.items():
+                self.stats[key] += delta
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats)
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_check_out_started(self, event): pass
+
+    def pool_cleared(self, event):
+        self._count(pool_clears=1)
+
+    def connection_created(self, event):
+        self._count(connections_open=1, connections_created=1)
+
+    def connection_closed(self, event):
+        self._count(connections_open=-1)
+
+    def connection_checked_out(self, event):
+        self._count(connections_in_use=1, checkouts=1)
+
+    def connection_check_out_failed(self, event):
+        self._count(checkout_failures=1)
+
+    def connection_checked_in(self, event):
+        self._count(connections_in_use=-1)
+
+pool_stats = PoolStatsListener()
+
+class CommandMetricsListener(CommandListener):
+    """
+    Counts and times the commands of this process's MongoClient for /metrics.
+    """
+
+    def started(self, event): pass
+
+    def succeeded(self, event):
+        MONGO_COMMANDS.inc(command=event.command_name, outcome="success")
+        MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, command=event.command_name)
+
+    def failed(self, event):
+        MONGO_COMMANDS.inc(command=event.command_name, outcome="failure")
+        MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, command=event.command_name)
+
+def _optional_ms(value: str):
+    return int(value) if value else None
+
+def client_options():
+    """
+    MongoClient keyword arguments built from the MONGO_* settings.
+    """
+    options = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": _optional_ms(MONGO_MAX_IDLE_TIME_MS),
+        "waitQueueTimeoutMS": _optional_ms(MONGO_WAIT_QUEUE_TIMEOUT_MS),
+        "serverSelectionTimeoutMS": _optional_ms(MONGO_SERVER_SELECTION_TIMEOUT_MS),
+        "connectTimeoutMS": _optional_ms(MONGO_CONNECT_TIMEOUT_MS),
+        "socketTimeoutMS": _optional_ms(MONGO_SOCKET_TIMEOUT_MS),
+        # Without metrics the driver skips command monitoring altogether
+        "event_listeners": [pool_stats, CommandMetricsListener()] if METRICS_ENABLED else [pool_stats]
+    }
+    if MONGO_READ_CONCERN:
+        options["readConcernLevel"] = MONGO_READ_CONCERN
+    if MONGO_READ_PREFERENCE:
+        options["readPreference"] = MONGO_READ_PREFERENCE
+    if MONGO_WRITE_CONCERN:
+        options["w"] = int(MONGO_WRITE_CONCERN) if MONGO_WRITE_CONCERN.isdigit() else MONGO_WRITE_CONCERN
+    if MONGO_WRITE_CONCERN_TIMEOUT_MS:
+        options["wTimeoutMS"] = int(MONGO_WRITE_CONCERN_TIMEOUT_MS)
+    return {key: value for key, value in options.items() if value is not None}
 
 def get_db():
     global client, db
     if client is None:
-        client = MongoClient(MONGO_URI)
-        db = client[MONGO_DB_NAME]
+        with _client_lock:
+            if client is None:
+                new_client = MongoClient(MONGO_URI, connect=False, **client_options())
+                db = new_client[MONGO_DB_NAME]
+                client = new_client
     return db
 
+def _reset_client_after_fork():
+    # A MongoClient must not be used across fork() (e.g. gunicorn --preload workers):
+    # the child drops the inherited one, without closing the parent's sockets, and
+    # connects again on first use.
+    global client, db, _client_lock
+    client = None
+    db = None
+    _client_lock = threading.Lock()
+    pool_stats.reset()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_client_after_fork)
+
+def get_pool_stats():
+    """
+    Connection pool counters of this process, plus the configured limits.
+    """
+    return {**pool_stats.snapshot(), "max_pool_size": MONGO_MAX_POOL_SIZE, "pid": os.getpid()}
+
+def ping(timeout_ms: int = MONGO_HEALTHCHECK_TIMEOUT_MS):
+    """
+    Runs the 'ping' command within timeout_ms. Returns the round trip in
+    milliseconds; raises on failure or when the deadline passes.
+    """
+    started = time.perf_counter()
+    with pymongo.timeout(timeout_ms / 1000):
+        get_db().command("ping")
+    return round((time.perf_counter() - started) * 1000, 2)
+
 def get_collection(collection_name: str):
     db_instance = get_db()
     return db_instance[collection_name]
 
+# Indexes backing the transaction filters, keyset pagination and "latest report" lookups
+TRANSACTION_INDEXES = [
+    ([("tipo", ASCENDING), ("data_pagamento", ASCENDING)], "tipo_data_pagamento"),
+    ([("status", ASCENDING)], "status"),
+    ([("data_pagamento", ASCENDING), ("_id", ASCENDING)], "data_pagamento_id"),
+    ([("valor", ASCENDING)], "valor"),
+    ([("ai_analysis_results.fraud_guard.is_suspicious", ASCENDING)], "fraud_guard_is_suspicious"),
+]
+REPORT_COLLECTIONS = ["ai_forecasts", "ai_credit_reports", "ai_risk_reports"]
+
+def ensure_indexes():
+    """
+    Creates the indexes the API queries rely on. create_index is a no-op
+    for indexes that already exist, so this is safe to call at every startup.
+    """
+    transactions = get_collection("transactions")
+    for keys, name in TRANSACTION_INDEXES:
+        transactions.create_index(keys, name=name)
+    for collection_name in REPORT_COLLECTIONS:
+        get_collection(collection_name).create_index([("created_at", DESCENDING)], name="created_at_desc")
+
+def build_transaction_query(tipos: list = None, statuses: list = None, date_from: datetime = None,
+                            date_to: datetime = None, min_valor: float = None, max_valor: float = None,
+                            suspicious_only: bool = False):
+    """
+    Translates typed filter values into a MongoDB query on 'transactions'.
+    date_from is inclusive and date_to exclusive; empty arguments are ignored.
+    """
+    query = {}
+    if tipos:
+        query["tipo"] = {"$in": list(tipos)}
+    if statuses:
+        query["status"] = {"$in": list(statuses)}
+    if date_from is not None or date_to is not None:
+        query["data_pagamento"] = {}
+        if date_from is not None:
+            query["data_pagamento"]["$gte"] = date_from
+        if date_to is not None:
+            query["data_pagamento"]["$lt"] = date_to
+    if min_valor is not None or max_valor is not None:
+        query["valor"] = {}
+        if min_valor is not None:
+            query["valor"]["$gte"] = min_valor
+        if max_valor is not None:
+            query["valor"]["$lte"] = max_valor
+    if suspicious_only:
+        query["ai_analysis_results.fraud_guard.is_suspicious"] = True
+    return query
+
+def explain_transactions_query(query: dict, sort: list = None):
+    """
+    Returns the winning plan of a query on 'transactions', the names of
+    the indexes it uses (an empty list means a collection scan) and its
+    stage names (e.g. SORT for an in-memory sort), so query plans can be checked.
+    """
+    collection = get_collection("transactions")
+    cursor = collection.find(query)
+    if sort:
+        cursor = cursor.sort(sort)
+    winning_plan = cursor.explain().get("queryPlanner", {}).get("winningPlan", {})
+
+    index_names = []
+    stage_names = []
+    stages = [winning_plan]
+    while stages:
+        stage = stages.pop()
+        if stage.get("stage"):
+            stage_names.append(stage["stage"])
+        if stage.get("indexName"):
+            index_names.append(stage["indexName"])
+        if "inputStage" in stage:
+            stages.append(stage["inputStage"])
+        stages.extend(stage.get("inputStages", []))
+        if "queryPlan" in stage: # Slot-based execution engine wraps the classic plan
+            stages.append(stage["queryPlan"])
+    return {"winning_plan": winning_plan, "indexes_used": index_names, "stages": stage_names}
+
+# --- Monthly rollups ---
+# 'monthly_rollups' holds one document per (month, tipo) with the total 'valor'
+# and the number of transactions. The transaction writers below keep it up to
+# date with $inc upserts; rebuild_monthly_rollups() recomputes it from scratch.
+# Document: {"_id": "2024-07:receita", "month": "2024-07", "tipo": "receita", "total": float, "count": int}
+ROLLUP_FIELDS = ("valor", "tipo", "data_pagamento")
+
+def _rollup_month(data_pagamento):
+    if isinstance(data_pagamento, datetime):
+        return data_pagamento.strftime("%Y-%m")
+    if isinstance(data_pagamento, str) and len(data_pagamento) >= 7:
+        return data_pagamento[:7]
+    return None
+
+def _rollup_key(document: dict):
+    month = _rollup_month(document.get("data_pagamento"))
+    if month is None or not document.get("tipo") or not isinstance(document.get("valor"), (int, float)):
+        return None
+    return month, document["tipo"]
+
+def _add_rollup_delta(deltas: dict, document: dict, sign: int):
+    key = _rollup_key(document)
+    if key is None:
+        return
+    total, count = deltas.get(key, (0.0, 0))
+    deltas[key] = (total + sign * document["valor"], count + sign)
+
+def _apply_rollup_deltas(deltas: dict):
+    """
+    Applies {(month, tipo): (total_delta, count_delta)} to 'monthly_rollups' with $inc upserts.
+    """
+    operations = [
+        UpdateOne(
+            {"_id": f"{month}:{tipo}"},
+            {"$inc": {"total": total, "count": count}, "$set": {"month": month, "tipo": tipo}},
+            upsert=True
+        )
+        for (month, tipo), (total, count) in deltas.items()
+        if total or count
+    ]
+    if not operations:
+        return
+    collection = get_collection("monthly_rollups")
+    with stage("rollup_update"):
+        collection.bulk_write(operations, ordered=False)
+    # Drop rollups emptied by updates that moved a transaction to another month or tipo
+    emptied = [f"{month}:{tipo}" for (month, tipo), (total, count) in deltas.items() if count < 0]
+    if emptied:
+        collection.delete_many({"_id": {"$in": emptied}, "count": {"$lte": 0}})
+
+def get_monthly_rollups(since_month: str = None):
+    """
+    Retrieves the monthly rollups ordered by month, optionally from
+    since_month ('YYYY-MM') onwards.
+    """
+    collection = get_collection("monthly_rollups")
+    query = {"month": {"$gte": since_month}} if since_month else {}
+    return list(collection.find(query, {"_id": 0, "month": 1, "tipo": 1, "total": 1, "count": 1}, sort=[("month", ASCENDING), ("tipo", ASCENDING)]))
+
+def rebuild_monthly_rollups():
+    """
+    Recomputes 'monthly_rollups' from all transactions. Returns the number
+    of rollup documents written. Rollups are overwritten in place and stale
+    ones deleted afterwards, so readers never see an empty collection.
+    """
+    deltas = {}
+    for document in get_collection("transactions").find({}, {"valor": 1, "tipo": 1, "data_pagamento": 1}):
+        _add_rollup_delta(deltas, document, 1)
+    collection = get_collection("monthly_rollups")
+    ids = [f"{month}:{tipo}" for month, tipo in deltas]
+    operations = [
+        UpdateOne(
+            {"_id": rollup_id},
+            {"$set": {"month": month, "tipo": tipo, "total": total, "count": count}},
+            upsert=True
+        )
+        for rollup_id, ((month, tipo), (total, count)) in zip(ids, deltas.items())
+    ]
+    if operations:
+        with stage("rollup_update"):
+            collection.bulk_write(operations, ordered=False)
+    collection.delete_many({"_id": {"$nin": ids}})
+    return len(deltas)
+
+def get_transactions_version():
+    """
+    Returns the change counter of the 'transactions' collection. It is
+    incremented by every insert, import and user update made through this
+    module (fraud write-backs excluded), so in-memory copies of the data
+    can tell whether they are stale.
+    """
+    counter = get_collection("counters").find_one({"_id": "transactions"})
+    return counter["version"] if counter else 0
+
+def _bump_transactions_version():
+    get_collection("counters").update_one({"_id": "transactions"}, {"$inc": {"version": 1}}, upsert=True)
+
 def add_transaction(data: dict):
     """
     Adds a transaction to the 'transactions' collection.
@@ -47,8 +373,74 @@ def add_transaction(data: dict):
     data["created_at"] = datetime.utcnow()
     data["ai_analysis_results"] = {} # Initialize ai_analysis_results
     result = collection.insert_one(data)
+    TRANSACTIONS_INSERTED.inc(source="single")
+    deltas = {}
+    _add_rollup_delta(deltas, data, 1)
+    _apply_rollup_deltas(deltas)
+    _bump_transactions_version()
     return result.inserted_id
 
+def _record_inserted(documents: list, positions):
+    """
+    Accounts for the documents at positions that reached the collection:
+    monthly rollups, the inserted counter and the transactions version.
+    """
+    deltas = {}
+    count = 0
+    for position in positions:
+        _add_rollup_delta(deltas, documents[position], 1)
+        count += 1
+    if not count:
+        return
+    _apply_rollup_deltas(deltas)
+    TRANSACTIONS_INSERTED.inc(count, source="bulk")
+    _bump_transactions_version()
+
+def _written_positions(collection, documents: list):
+    # insert_many assigns _id client-side, so the written documents can be looked up after an unknown outcome
+    ids = [doc["_id"] for doc in documents if "_id" in doc]
+    try:
+        written = {doc["_id"] for doc in collection.find({"_id": {"$in": ids}}, {"_id": 1})}
+    except PyMongoError:
+        return []
+    return [position for position, doc in enumerate(documents) if doc.get("_id") in written]
+
+def add_transactions_bulk(documents: list, chunk_size: int = 1000):
+    """
+    Inserts many transactions into the 'transactions' collection using
+    chunked, unordered insert_many calls.
+    Returns a tuple (inserted_count, failures) where failures is a list of
+    (index, error_message) pairs, index being the position in documents.
+    Rollups and the transactions version are updated after every chunk, so
+    they stay consistent with what was written if a later chunk raises.
+    """
+    collection = get_collection("transactions")
+    created_at = datetime.utcnow()
+    inserted_count = 0
+    failures = []
+    for start in range(0, len(documents), chunk_size):
+        chunk = documents[start:start + chunk_size]
+        for doc in chunk:
+            doc["created_at"] = created_at
+            doc["ai_analysis_results"] = {} # Initialize ai_analysis_results
+        failed_positions = set()
+        try:
+            with stage("mongo_insert"):
+                result = collection.insert_many(chunk, ordered=False)
+            inserted_count += len(result.inserted_ids)
+        except BulkWriteError as e:
+            # With ordered=False every document without a write error was inserted
+            inserted_count += e.details.get("nInserted", 0)
+            for write_error in e.details.get("writeErrors", []):
+                failed_positions.add(write_error["index"])
+                failures.append((start + write_error["index"], write_error.get("errmsg", "Write error")))
+        except Exception:
+            # Unknown outcome (e.g. a network error): account for whatever was written, then give up
+            _record_inserted(chunk, _written_positions(collection, chunk))
+            raise
+        _record_inserted(chunk, (position for position in range(len(chunk)) if position not in failed_positions))
+    return inserted_count, failures
+
 def get_transactions(filters: dict = None):
     """
     Retrieves transactions from the 'transactions' collection.
@@ -59,6 +451,156 @@ def get_transactions(filters: dict = None):
     collection = get_collection("transactions")
     return list(collection.find(filters))
 
+# Fields that GET /api/transactions can page through with a keyset cursor
+PAGINATION_SORT_FIELDS = ("_id", "data_pagamento")
+
+def encode_transactions_cursor(document: dict, sort_field: str = "_id"):
+    """
+    Encodes the keyset position of a document as an opaque URL-safe cursor.
+    The document must include _id and sort_field.
+    """
+    position = {"id": str(document["_id"])}
+    if sort_field != "_id":
+        value = document.get(sort_field)
+        position["value"] = value.isoformat() if isinstance(value, datetime) else value
+    return base64.urlsafe_b64encode(json.dumps(position).encode("utf-8")).decode("ascii")
+
+def decode_transactions_cursor(cursor: str, sort_field: str = "_id"):
+    """
+    Decodes a cursor made by encode_transactions_cursor into (sort_value, ObjectId).
+    Raises ValueError for a malformed cursor.
+    """
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        object_id = ObjectId(position["id"])
+        value = position.get("value")
+        if sort_field == "data_pagamento" and isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        return value, object_id
+    except (ValueError, KeyError, TypeError, InvalidId) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+def iter_transactions(filters: dict = None, projection: list = None, sort_field: str = "_id",
+                      descending: bool = False, after: str = None, limit: int = 0, batch_size: int = 500):
+    """
+    Returns a cursor over transactions, sorted by (sort_field, _id) for
+    keyset pagination. after is a cursor from encode_transactions_cursor;
+    projection is a list of field names (_id and sort_field are always included).
+    """
+    if sort_field not in PAGINATION_SORT_FIELDS:
+        raise ValueError(f"Unsupported sort field: {sort_field}")
+    query = dict(filters or {})
+    comparison = "$lt" if descending else "$gt"
+
+    if after:
+        sort_value, last_id = decode_transactions_cursor(after, sort_field)
+        if sort_field == "_id":
+            keyset = {"_id": {comparison: last_id}}
+        else:
+            keyset = {"$or": [
+                {sort_field: {comparison: sort_value}},
+                {sort_field: sort_value, "_id": {comparison: last_id}}
+            ]}
+        query = {"$and": [query, keyset]} if query else keyset
+
+    direction = DESCENDING if descending else ASCENDING
+    sort = [("_id", direction)] if sort_field == "_id" else [(sort_field, direction), ("_id", direction)]
+    fields = None
+    if projection:
+        fields = {field: 1 for field in projection}
+        fields[sort_field] = 1
+
+    collection = get_collection("transactions")
+    return collection.find(query, fields, sort=sort, limit=limit, batch_size=batch_size)
+
+def has_transactions():
+    """
+    Returns True if the 'transactions' collection holds at least one document.
+    """
+    collection = get_collection("transactions")
+    return collection.find_one({}, projection={"_id": 1}) is not None
+
+def get_period_summary(since: datetime, highlights_limit: int = 5):
+    """
+    Computes income/expense totals for transactions paid after 'since' and
+    the most recent ones as highlights, server-side with aggregation
+    pipelines. Returns {"totals": {tipo: {"total": x, "count": n}}, "highlights": [...]}.
+    """
+    collection = get_collection("transactions")
+    match = {"$match": {"data_pagamento": {"$gt": since}}}
+    totals = collection.aggregate([
+        match,
+        {"$group": {"_id": "$tipo", "total": {"$sum": "$valor"}, "count": {"$sum": 1}}}
+    ])
+    highlights = collection.aggregate([
+        match,
+        {"$sort": {"data_pagamento": -1, "_id": -1}},
+        {"$limit": highlights_limit},
+        {"$project": {"_id": 0, "data_pagamento": 1, "tipo": 1, "descricao": 1, "valor": 1}}
+    ])
+    return {
+        "totals": {group["_id"]: {"total": group["total"], "count": group["count"]} for group in totals},
+        "highlights": list(highlights)
+    }
+
+def get_expense_breakdown(since: datetime = None, limit: int = 5):
+    """
+    Returns the largest expense descriptions (tipo 'despesa') paid after
+    'since' as {"total": x, "categories": [{"descricao": d, "total": t}, ...]}.
+    """
+    collection = get_collection("transactions")
+    match = {"tipo": "despesa"}
+    if since:
+        match["data_pagamento"] = {"$gt": since}
+    groups = list(collection.aggregate([
+        {"$match": match},
+        {"$group": {"_id": "$descricao", "total": {"$sum": "$valor"}}},
+        {"$sort": {"total": -1}}
+    ]))
+    return {
+        "total": sum(group["total"] for group in groups),
+        "categories": [{"descricao": group["_id"], "total": group["total"]} for group in groups[:limit]]
+    }
+
+def get_risk_aggregates(today: datetime, since: datetime, horizon_days: int = 30):
+    """
+    Computes the inputs of the risk engine with two aggregations:
+    - 'sources': totals per (tipo, descricao) paid after 'since'
+    - 'open_items': totals of 'pendente'/'agendado' transactions per tipo,
+      split into overdue (before today), due within horizon_days, and later
+    """
+    collection = get_collection("transactions")
+    sources = collection.aggregate([
+        {"$match": {"data_pagamento": {"$gt": since}}},
+        {"$group": {"_id": {"tipo": "$tipo", "descricao": "$descricao"}, "total": {"$sum": "$valor"}, "count": {"$sum": 1}}},
+        {"$sort": {"total": -1}}
+    ])
+    horizon_end = today + timedelta(days=horizon_days)
+    open_items = collection.aggregate([
+        {"$match": {"status": {"$in": ["pendente", "agendado"]}}},
+        {"$group": {
+            "_id": {
+                "tipo": "$tipo",
+                "bucket": {"$cond": [
+                    {"$lt": ["$data_pagamento", today]}, "overdue",
+                    {"$cond": [{"$lt": ["$data_pagamento", horizon_end]}, "upcoming", "later"]}
+                ]}
+            },
+            "total": {"$sum": "$valor"},
+            "count": {"$sum": 1}
+        }}
+    ])
+    return {
+        "sources": [
+            {"tipo": group["_id"].get("tipo"), "descricao": group["_id"].get("descricao"), "total": group["total"], "count": group["count"]}
+            for group in sources
+        ],
+        "open_items": [
+            {"tipo": group["_id"].get("tipo"), "bucket": group["_id"].get("bucket"), "total": group["total"], "count": group["count"]}
+            for group in open_items
+        ]
+    }
+
 def get_transaction_by_id(transaction_id: str):
     """
     Retrieves a single transaction by its ID.
@@ -69,31 +611,205 @@ def get_transaction_by_id(transaction_id: str):
     except Exception:
         return None
 
-def update_transaction(transaction_id: str, updates: dict):
+def get_transactions_pending_fraud_scan():
+    """
+    Retrieves the ids of the transactions that have no FraudGuard result
+    yet, or that were modified ('updated_at') after their last scan.
+    """
+    collection = get_collection("transactions")
+    return list(collection.find({"$or": [
+        {"ai_analysis_results.fraud_guard": {"$exists": False}},
+        {
+            "updated_at": {"$exists": True},
+            "ai_analysis_results.fraud_guard.scanned_at": {"$exists": True},
+            "$expr": {"$gt": ["$updated_at", "$ai_analysis_results.fraud_guard.scanned_at"]}
+        }
+    ]}, {"_id": 1}))
+
+def get_fraud_history_profile(exclude_ids: list = None, limit: int = 20):
+    """
+    Summarizes already scanned transactions per (tipo, descricao): count and
+    valor statistics, most frequent groups first. Used as compact context
+    for incremental fraud scans.
+    """
+    collection = get_collection("transactions")
+    match = {"ai_analysis_results.fraud_guard": {"$exists": True}}
+    if exclude_ids:
+        match["_id"] = {"$nin": [ObjectId(i) for i in exclude_ids]}
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": {"tipo": "$tipo", "descricao": "$descricao"},
+            "count": {"$sum": 1},
+            "mean": {"$avg": "$valor"},
+            "sum_of_squares": {"$sum": {"$multiply": ["$valor", "$valor"]}},
+            "min": {"$min": "$valor"},
+            "max": {"$max": "$valor"},
+            "suspicious": {"$sum": {"$cond": ["$ai_analysis_results.fraud_guard.is_suspicious", 1, 0]}}
+        }},
+        {"$sort": {"count": -1}},
+        {"$limit": limit}
+    ]
+    groups = list(collection.aggregate(pipeline))
+    for group in groups:
+        # Population standard deviation from the sum of squares
+        mean = group["mean"] or 0
+        variance = group.pop("sum_of_squares") / group["count"] - mean * mean
+        group["std"] = max(variance, 0) ** 0.5
+    return groups
+
+def update_transaction(transaction_id: str, updates: dict, mark_modified: bool = True):
     """
     Updates a specific transaction identified by transaction_id.
+    mark_modified sets 'updated_at', which makes the transaction eligible for
+    the next incremental fraud scan; AI write-backs pass False.
     """
     collection = get_collection("transactions")
-    result = collection.update_one({"_id": ObjectId(transaction_id)}, {"$set": updates})
-    return result.modified_count > 0
+    if mark_modified:
+        updates = {**updates, "updated_at": datetime.utcnow()}
+    if not any(field in updates for field in ROLLUP_FIELDS):
+        result = collection.update_one({"_id": ObjectId(transaction_id)}, {"$set": updates})
+        if mark_modified and result.modified_count:
+            _bump_transactions_version()
+        return result.modified_count > 0
+
+    # The previous values are needed to move the amount between monthly rollups
+    previous = collection.find_one_and_update(
+        {"_id": ObjectId(transaction_id)}, {"$set": updates}, return_document=ReturnDocument.BEFORE
+    )
+    if previous is None:
+        return False
+    deltas = {}
+    _add_rollup_delta(deltas, previous, -1)
+    _add_rollup_delta(deltas, {**previous, **updates}, 1)
+    _apply_rollup_deltas(deltas)
+    if mark_modified:
+        _bump_transactions_version()
+    return True
+
+def bulk_update_transactions(updates: list, batch_size: int = 1000, mark_modified: bool = True):
+    """
+    Applies many $set updates with unordered bulk_write batches.
+    updates is a list of (transaction_id, update_fields) pairs; pairs with an
+    invalid transaction_id are skipped. mark_modified works as in
+    update_transaction. Returns {"matched": n, "modified": n, "skipped": n}.
+    """
+    collection = get_collection("transactions")
+    updated_at = datetime.utcnow()
+    pending = []
+    skipped = 0
+    for transaction_id, fields in updates:
+        try:
+            object_id = ObjectId(transaction_id)
+        except (InvalidId, TypeError):
+            skipped += 1
+            continue
+        if mark_modified:
+            fields = {**fields, "updated_at": updated_at}
+        pending.append((object_id, fields))
+
+    matched = 0
+    modified = 0
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        # Only updates of valor/tipo/data_pagamento affect the monthly rollups
+        rollup_ids = [object_id for object_id, fields in batch if any(field in fields for field in ROLLUP_FIELDS)]
+        previous = {}
+        if rollup_ids:
+            previous = {
+                doc["_id"]: doc
+                for doc in collection.find({"_id": {"$in": rollup_ids}}, {"valor": 1, "tipo": 1, "data_pagamento": 1})
+            }
+
+        with stage("mongo_bulk_update"):
+            result = collection.bulk_write(
+                [UpdateOne({"_id": object_id}, {"$set": fields}) for object_id, fields in batch], ordered=False
+            )
+        matched += result.matched_count
+        modified += result.modified_count
+
+        if previous:
+            deltas = {}
+            for object_id, fields in batch:
+                old_doc = previous.get(object_id)
+                if old_doc is not None:
+                    _add_rollup_delta(deltas, old_doc, -1)
+                    _add_rollup_delta(deltas, {**old_doc, **fields}, 1)
+            _apply_rollup_deltas(deltas)
+    if mark_modified and modified:
+        _bump_transactions_version()
+    return {"matched": matched, "modified": modified, "skipped": skipped}
+
+# Latest document of each report collection (None when it is empty), kept
+# up to date by _insert_report. Like the event stream, it only sees the
+# writes of this process.
+_latest_reports = {}
+_latest_reports_versions = {}
+_latest_reports_lock = threading.Lock()
+
+def _insert_report(collection_name: str, report_data: dict):
+    # Insert a copy so the caller's dict does not gain '_id'/'created_at' and stays JSON-serializable
+    report_data = {**report_data, "created_at": datetime.utcnow()}
+    with stage("report_write"):
+        result = get_collection(collection_name).insert_one(report_data)
+    with _latest_reports_lock:
+        _latest_reports[collection_name] = report_data
+        _latest_reports_versions[collection_name] = _latest_reports_versions.get(collection_name, 0) + 1
+    return result.inserted_id
+
+def _find_latest_report(collection_name: str):
+    """
+    Returns a shallow copy of the most recent document of a report
+    collection, read from MongoDB only on the first call.
+    """
+    with _latest_reports_lock:
+        if collection_name in _latest_reports:
+            latest_report = _latest_reports[collection_name]
+            return dict(latest_report) if latest_report else None
+        version = _latest_reports_versions.get(collection_name, 0)
+    latest_report = get_collection(collection_name).find_one(sort=[("created_at", DESCENDING)])
+    with _latest_reports_lock:
+        # A report inserted during the query is newer than the one read
+        if _latest_reports_versions.get(collection_name, 0) == version:
+            _latest_reports[collection_name] = latest_report
+    return dict(latest_report) if latest_report else None
 
 def add_ai_forecast(forecast_data: dict):
     """
     Adds an AI forecast to the 'ai_forecasts' collection.
     """
-    collection = get_collection("ai_forecasts")
-    forecast_data["created_at"] = datetime.utcnow()
-    result = collection.insert_one(forecast_data)
-    return result.inserted_id
+    return _insert_report("ai_forecasts", forecast_data)
 
 def get_latest_ai_forecast():
     """
     Retrieves the most recent AI forecast from the 'ai_forecasts' collection.
     """
-    collection = get_collection("ai_forecasts")
-    # Find the most recent document by sorting by 'created_at' in descending order
-    latest_forecast = collection.find_one(sort=[("created_at", -1)])
-    return latest_forecast
+    return _find_latest_report("ai_forecasts")
+
+def ensure_llm_cache_index(ttl_seconds: int):
+    """
+    Creates the TTL index that lets MongoDB evict expired cached LLM responses.
+    """
+    collection = get_collection("llm_response_cache")
+    collection.create_index("created_at", expireAfterSeconds=ttl_seconds, name="llm_cache_ttl")
+
+def get_cached_llm_response(cache_key: str):
+    """
+    Retrieves a cached LLM response document by its cache key.
+    """
+    collection = get_collection("llm_response_cache")
+    return collection.find_one({"_id": cache_key})
+
+def put_cached_llm_response(cache_key: str, model_name: str, response_text: str):
+    """
+    Stores (or refreshes) a cached LLM response in the 'llm_response_cache' collection.
+    """
+    collection = get_collection("llm_response_cache")
+    collection.replace_one(
+        {"_id": cache_key},
+        {"model": model_name, "response_text": response_text, "created_at": datetime.utcnow()},
+        upsert=True
+    )
 
 # Example usage (optional - for testing)
 if __name__ == '__main__':
@@ -148,32 +864,22 @@ def add_credit_report(report_data: dict):
     """
     Adds a credit analysis report to the 'ai_credit_reports' collection.
     """
-    collection = get_collection("ai_credit_reports")
-    report_data["created_at"] = datetime.utcnow()
-    result = collection.insert_one(report_data)
-    return result.inserted_id
+    return _insert_report("ai_credit_reports", report_data)
 
 def get_latest_credit_report():
     """
     Retrieves the most recent credit analysis report from the 'ai_credit_reports' collection.
     """
-    collection = get_collection("ai_credit_reports")
-    latest_report = collection.find_one(sort=[("created_at", -1)])
-    return latest_report
+    return _find_latest_report("ai_credit_reports")
 
 def add_risk_report(report_data: dict):
     """
     Adds a risk analysis report to the 'ai_risk_reports' collection.
     """
-    collection = get_collection("ai_risk_reports")
-    report_data["created_at"] = datetime.utcnow() # Ensure timestamp is part of the main report document
-    result = collection.insert_one(report_data)
-    return result.inserted_id
+    return _insert_report("ai_risk_reports", report_data)
 
 def get_latest_risk_report():
     """
     Retrieves the most recent risk analysis report from the 'ai_risk_reports' collection.
     """
-    collection = get_collection("ai_risk_reports")
-    latest_report = collection.find_one(sort=[("created_at", -1)])
-    return latest_report
+    return _find_latest_report("ai_risk_reports")
@@ -0,0 +1,77 @@
+import os
+import json
+import threading
+from collections import deque
+
+# Number of recent events kept for clients reconnecting with Last-Event-ID
+EVENTS_BUFFER_SIZE = int(os.getenv("EVENTS_BUFFER_SIZE", "1000"))
+# A comment line is sent this often so proxies keep idle streams open
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+
+
+def format_sse(event_id: int, event_type: str, data: str):
+    return f"id: {event_id}\nevent: {event_type}\ndata: {data}\n\n"
+
+
+class EventBroker:
+    """
+    In-process publish/subscribe hub behind the /api/events Server-Sent
+    Events stream. Events are serialized once when published and kept in a
+    bounded buffer, so every subscriber just replays the buffer from its
+    last seen id. Events only reach clients of the same process.
+    """
+
+    def __init__(self, buffer_size: int = EVENTS_BUFFER_SIZE, dumps=json.dumps):
+        self._events = deque(maxlen=buffer_size) # (event_id, message)
+        self._condition = threading.Condition()
+        self._last_id = 0
+        self._dumps = dumps
+
+    @property
+    def last_id(self):
+        with self._condition:
+            return self._last_id
+
+    def publish(self, event_type: str, data):
+        data_text = self._dumps(data)
+        with self._condition:
+            self._last_id += 1
+            self._events.append((self._last_id, format_sse(self._last_id, event_type, data_text)))
+            self._condition.notify_all()
+
+    def _events_after(self, last_seen_id: int):
+        # Caller must hold self._condition
+        if not self._events or self._events[-1][0] <= last_seen_id:
+            return [], False
+        missed = self._events[0][0] > last_seen_id + 1
+        return [message for event_id, message in self._events if event_id > last_seen_id], missed
+
+    def subscribe(self, last_seen_id: int = None, heartbeat_seconds: float = EVENTS_HEARTBEAT_SECONDS):
+        """
+        Yields SSE messages published after last_seen_id (after now when None).
+        If events the client asked for have already left the buffer, a
+        'resync' event tells it to reload its data instead.
+        """
+        with self._condition:
+            # An id from before a server restart cannot be replayed
+            restarted = last_seen_id is not None and last_seen_id > self._last_id
+            if last_seen_id is None or restarted:
+                last_seen_id = self._last_id
+        yield "retry: 3000\n\n"
+        if restarted:
+            yield format_sse(last_seen_id, "resync", "{}")
+        while True:
+            with self._condition:
+                messages, missed = self._events_after(last_seen_id)
+                if not messages:
+                    self._condition.wait(timeout=heartbeat_seconds)
+                    messages, missed = self._events_after(last_seen_id)
+                if messages:
+                    last_seen_id = self._last_id
+            if missed:
+                # The reload covers the buffered events too
+                yield format_sse(last_seen_id, "resync", "{}")
+            elif messages:
+                yield "".join(messages)
+            else:
+                yield ": keep-alive\n\n"
@@ -0,0 +1,237 @@
+import numpy as np
+from datetime import datetime
+
+SEASON_LENGTH = 12
+# Number of one-step-ahead forecasts used to compare the models
+BACKTEST_POINTS = 6
+MOVING_AVERAGE_WINDOW = 3
+# Smoothing parameters tried by the exponential smoothing models
+SMOOTHING_GRID = (0.2, 0.4, 0.6, 0.8)
+
+MONTH_NAMES_PT = ["Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho",
+                  "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"]
+
+
+def _add_months(month: str, count: int):
+    year, month_number = int(month[:4]), int(month[5:7])
+    index = year * 12 + (month_number - 1) + count
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def _month_label(month: str):
+    return f"{MONTH_NAMES_PT[int(month[5:7]) - 1]} {month[:4]}"
+
+
+def monthly_series(monthly_totals: list, current_month: str):
+    """
+    Returns (months, income, expenses) for the complete months before
+    current_month, from the first month with data, with months without
+    transactions filled with zeros.
+    """
+    by_month = {entry["month"]: entry for entry in monthly_totals if entry["month"] < current_month}
+    months = []
+    month = min(by_month) if by_month else current_month
+    while month < current_month:
+        months.append(month)
+        month = _add_months(month, 1)
+    income = np.array([by_month.get(m, {}).get("income_AOA", 0.0) for m in months], dtype="float64")
+    expenses = np.array([by_month.get(m, {}).get("expenses_AOA", 0.0) for m in months], dtype="float64")
+    return months, income, expenses
+
+
+def moving_average(y: np.ndarray, horizon: int, window: int = MOVING_AVERAGE_WINDOW):
+    return np.full(horizon, y[-window:].mean())
+
+
+def seasonal_naive(y: np.ndarray, horizon: int, season: int = SEASON_LENGTH):
+    if len(y) < season:
+        return np.full(horizon, y[-1])
+    steps = np.arange(horizon) % season
+    return y[len(y) - season + steps]
+
+
+def _holt_sse_and_state(y: np.ndarray, alpha: float, beta: float):
+    level, trend = y[0], (y[1] - y[0]) if len(y) > 1 else 0.0
+    sse = 0.0
+    for value in y[1:]:
+        prediction = level + trend
+        sse += (value - prediction) ** 2
+        new_level = alpha * value + (1 - alpha) * prediction
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        level = new_level
+    return sse, level, trend
+
+
+def holt(y: np.ndarray, horizon: int):
+    """
+    Holt's linear exponential smoothing, with (alpha, beta) chosen from
+    SMOOTHING_GRID by in-sample squared error.
+    """
+    if len(y) < 2:
+        return np.full(horizon, y[-1])
+    best = min(
+        (_holt_sse_and_state(y, alpha, beta) for alpha in SMOOTHING_GRID for beta in SMOOTHING_GRID),
+        key=lambda state: state[0]
+    )
+    _, level, trend = best
+    return level + trend * np.arange(1, horizon + 1)
+
+
+def _holt_winters_state(y: np.ndarray, alpha: float, beta: float, gamma: float, season: int):
+    level = y[:season].mean()
+    trend = (y[season:2 * season].mean() - y[:season].mean()) / season
+    seasonal = list(y[:season] - level)
+    sse = 0.0
+    for t in range(season, len(y)):
+        prediction = level + trend + seasonal[t - season]
+        sse += (y[t] - prediction) ** 2
+        new_level = alpha * (y[t] - seasonal[t - season]) + (1 - alpha) * (level + trend)
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        seasonal.append(gamma * (y[t] - new_level) + (1 - gamma) * seasonal[t - season])
+        level = new_level
+    return sse, level, trend, np.array(seasonal[-season:])
+
+
+def holt_winters(y: np.ndarray, horizon: int, season: int = SEASON_LENGTH):
+    """
+    Additive Holt-Winters smoothing. Needs two full seasons of history;
+    falls back to Holt's method otherwise.
+    """
+    if len(y) < 2 * season:
+        return holt(y, horizon)
+    best = min(
+        (_holt_winters_state(y, alpha, beta, gamma, season)
+         for alpha in SMOOTHING_GRID for beta in SMOOTHING_GRID[:2] for gamma in SMOOTHING_GRID[:2]),
+        key=lambda state: state[0]
+    )
+    _, level, trend, seasonal = best
+    steps = np.arange(1, horizon + 1)
+    return level + trend * steps + seasonal[(steps - 1) % season]
+
+
+MODELS = {
+    "moving_average": moving_average,
+    "holt": holt,
+    "holt_winters": holt_winters,
+    "seasonal_naive": seasonal_naive,
+}
+
+
+def backtest(y: np.ndarray, model, points: int = BACKTEST_POINTS):
+    """
+    Mean absolute error of one-step-ahead forecasts over the last points
+    months (rolling origin). Returns None when the series is too short.
+    """
+    origins = range(max(3, len(y) - points), len(y))
+    errors = [abs(y[t] - model(y[:t], 1)[0]) for t in origins]
+    return float(np.mean(errors)) if errors else None
+
+
+def forecast_series(y: np.ndarray, horizon: int):
+    """
+    Chooses the model with the lowest backtest error and forecasts horizon
+    months. Returns (forecast, model_name, backtest_mae).
+    """
+    if len(y) == 0:
+        return np.zeros(horizon), "none", None
+    if len(y) < 4:
+        return moving_average(y, horizon), "moving_average", None
+    scores = {name: backtest(y, model) for name, model in MODELS.items()}
+    best_name = min(scores, key=scores.get)
+    forecast = np.clip(MODELS[best_name](y, horizon), 0, None)
+    return forecast, best_name, scores[best_name]
+
+
+def _confidence(mae_values, levels):
+    # 1 - relative backtest error, kept within [0.1, 0.95]
+    known = [(mae, level) for mae, level in zip(mae_values, levels) if mae is not None and level > 0]
+    if not known:
+        return 0.3
+    relative_error = np.mean([mae / level for mae, level in known])
+    return round(float(np.clip(1 - relative_error, 0.1, 0.95)), 2)
+
+
+def forecast_cashflow(monthly_totals: list, today: datetime = None):
+    """
+    Builds the numeric part of the cash-flow analysis from monthly totals
+    (entries with month 'YYYY-MM', income_AOA and expenses_AOA).
+
+    Models are fitted on complete months only; the current month is
+    forecast too and its actuals so far are shown in the chart. Returns a
+    dict with cash_flow_forecast, evaluation_percentages, chart_data and
+    forecast_details, in the shape of the /api/analyze_cashflow response.
+    """
+    today = today or datetime.utcnow()
+    current_month = today.strftime("%Y-%m")
+    by_month = {entry["month"]: entry for entry in monthly_totals if entry["month"] <= current_month}
+    months, income, expenses = monthly_series(monthly_totals, current_month)
+
+    current = by_month.get(current_month, {})
+    if len(months) == 0:
+        # Only the current month has data: use it as the level
+        income = np.array([current.get("income_AOA", 0.0)], dtype="float64")
+        expenses = np.array([current.get("expenses_AOA", 0.0)], dtype="float64")
+
+    # Horizon 1 is the current month, 2-4 are the next three months
+    income_forecast, income_model, income_mae = forecast_series(income, 4)
+    expense_forecast, expense_model, expense_mae = forecast_series(expenses, 4)
+    net_forecast = income_forecast - expense_forecast
+
+    next_month_net = float(net_forecast[1])
+    three_month_net = float(net_forecast[1:4].sum())
+    recent_net = float((income[-3:] - expenses[-3:]).mean())
+    if next_month_net > recent_net * 1.05 + 1:
+        trend = "Improving"
+    elif next_month_net < recent_net * 0.95 - 1:
+        trend = "Declining"
+    else:
+        trend = "Stable"
+    trend_description = (
+        f"{trend} cash flow: the next month's net flow is forecast at {next_month_net:,.2f} AOA "
+        f"against an average of {recent_net:,.2f} AOA over the last months."
+    )
+
+    forecast_income_total = float(income_forecast[1:4].sum())
+    forecast_expense_total = float(expense_forecast[1:4].sum())
+    ratio = f"{forecast_income_total / forecast_expense_total * 100:.0f}%" if forecast_expense_total > 0 else "N/A"
+    savings_rate = f"{three_month_net / forecast_income_total * 100:.0f}%" if forecast_income_total > 0 else "N/A"
+
+    previous_month = _add_months(current_month, -1)
+    next_month = _add_months(current_month, 1)
+    previous = by_month.get(previous_month, {})
+
+    return {
+        "cash_flow_forecast": {
+            "next_month_prediction_AOA": round(next_month_net, 2),
+            "three_month_total_AOA": round(three_month_net, 2),
+            "trend_description": trend_description,
+            "confidence_score": _confidence([income_mae, expense_mae], [income.mean(), expenses.mean()])
+        },
+        "evaluation_percentages": {
+            "income_vs_expense_ratio": ratio,
+            "savings_rate_forecast": savings_rate
+        },
+        "currency": "AOA",
+        "chart_data": {
+            "labels": [_month_label(previous_month), _month_label(current_month), f"{_month_label(next_month)} (Previsto)"],
+            "datasets": [
+                {
+                    "label": "Receitas (AOA)",
+                    "data": [previous.get("income_AOA", 0), current.get("income_AOA", 0), round(float(income_forecast[1]), 2)],
+                    "borderColor": "rgba(75, 192, 192, 1)",
+                    "backgroundColor": "rgba(75, 192, 192, 0.2)"
+                },
+                {
+                    "label": "Despesas (AOA)",
+                    "data": [previous.get("expenses_AOA", 0), current.get("expenses_AOA", 0), round(float(expense_forecast[1]), 2)],
+                    "borderColor": "rgba(255, 99, 132, 1)",
+                    "backgroundColor": "rgba(255, 99, 132, 0.2)"
+                }
+            ]
+        },
+        "forecast_details": {
+            "income": {"model": income_model, "backtest_mae_AOA": income_mae, "next_three_months_AOA": np.round(income_forecast[1:4], 2).tolist()},
+            "expenses": {"model": expense_model, "backtest_mae_AOA": expense_mae, "next_three_months_AOA": np.round(expense_forecast[1:4], 2).tolist()},
+            "months_of_history": len(months)
+        }
+    }
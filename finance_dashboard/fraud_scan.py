@@ -0,0 +1,117 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import copy_timing_context, stage
+from prompt_encoding import TRANSACTION_COLUMNS, row_tokens
+
+# Approximate prompt budget (in tokens) for the transaction data of one chunk
+FRAUD_SCAN_CHUNK_TOKENS = int(os.getenv("FRAUD_SCAN_CHUNK_TOKENS", "6000"))
+# Maximum number of chunks sent to the model at the same time
+FRAUD_SCAN_MAX_CONCURRENCY = int(os.getenv("FRAUD_SCAN_MAX_CONCURRENCY", "4"))
+
+def chunk_transactions(formatted_transactions: list, token_budget: int = FRAUD_SCAN_CHUNK_TOKENS):
+    """
+    Splits prompt-formatted transactions into consecutive chunks whose
+    encoded size (see prompt_encoding) stays within token_budget. A single transaction larger
+    than the budget gets a chunk of its own.
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+    for transaction in formatted_transactions:
+        transaction_tokens = row_tokens(transaction, TRANSACTION_COLUMNS)
+        if current and current_tokens + transaction_tokens > token_budget:
+            chunks.append(current)
+            current = []
+            current_tokens = 0
+        current.append(transaction)
+        current_tokens += transaction_tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def overall_risk_level(fraud_report: list):
+    """
+    Derives the Low/Medium/High level of a merged report from its items.
+    """
+    suspicious = [item for item in fraud_report if item.get("is_suspicious")]
+    if not suspicious:
+        return "Low"
+    highest_score = max(float(item.get("risk_score") or 0) for item in suspicious)
+    if highest_score >= 0.8 or len(suspicious) / len(fraud_report) >= 0.1:
+        return "High"
+    return "Medium"
+
+
+def build_fraud_summary(fraud_report: list, total_scanned: int):
+    """
+    Computes the 'summary' block of a fraud analysis from its report items.
+    """
+    return {
+        "total_transactions_scanned": total_scanned,
+        "suspicious_transactions_found": sum(1 for item in fraud_report if item.get("is_suspicious")),
+        "overall_risk_level": overall_risk_level(fraud_report)
+    }
+
+
+def scan_in_chunks(formatted_transactions: list, build_prompt, generate_json,
+                   token_budget: int = FRAUD_SCAN_CHUNK_TOKENS,
+                   max_concurrency: int = FRAUD_SCAN_MAX_CONCURRENCY,
+                   logger=None, on_item=None):
+    """
+    Map-reduce fraud scan. Each chunk of transactions is turned into a prompt
+    with build_prompt(chunk) and sent with generate_json(prompt, on_item), at
+    most max_concurrency at a time. The per-chunk 'fraud_report' arrays are
+    merged (dropping items whose transaction_id is not in the chunk) and the
+    'summary' totals are recomputed locally. If given, on_item(item) is
+    called from the worker threads for each item of a chunk as it streams in.
+
+    Raises the first chunk error if every chunk fails; otherwise failed
+    chunks are listed under 'chunk_errors'.
+    """
+    chunks = chunk_transactions(formatted_transactions, token_budget)
+
+    def scan_chunk(chunk):
+        chunk_ids = {t["id"] for t in chunk}
+
+        def chunk_item(item):
+            if on_item is not None and str(item.get("transaction_id")) in chunk_ids:
+                on_item(item)
+
+        with stage("prompt_build"):
+            prompt = build_prompt(chunk)
+        result = generate_json(prompt, chunk_item)
+        return [
+            item for item in (result.get("fraud_report") or [])
+            if isinstance(item, dict) and str(item.get("transaction_id")) in chunk_ids
+        ]
+
+    fraud_report = []
+    chunk_errors = []
+    first_error = None
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(chunks)))) as executor:
+        futures = [executor.submit(copy_timing_context().run, scan_chunk, chunk) for chunk in chunks]
+        for chunk_number, future in enumerate(futures):
+            try:
+                fraud_report.extend(future.result())
+            except Exception as e:
+                if logger:
+                    logger.error(f"Fraud scan chunk {chunk_number} failed: {e}")
+                first_error = first_error or e
+                chunk_errors.append({"chunk": chunk_number, "transactions": len(chunks[chunk_number]), "error": str(e)})
+
+    if chunks and len(chunk_errors) == len(chunks):
+        raise first_error
+
+    result = {
+        "fraud_report": fraud_report,
+        "summary": build_fraud_summary(
+            fraud_report, len(formatted_transactions) - sum(e["transactions"] for e in chunk_errors)
+        ),
+        "currency": "AOA"
+    }
+    result["summary"]["chunks_scanned"] = len(chunks) - len(chunk_errors)
+    if chunk_errors:
+        result["chunk_errors"] = chunk_errors
+    return result
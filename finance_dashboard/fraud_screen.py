@@ -0,0 +1,157 @@
+import numpy as np
+import pandas as pd
+
+# Verdicts below LOW_RISK_THRESHOLD are cleared locally, those at or above
+# HIGH_RISK_THRESHOLD are flagged locally; everything in between is ambiguous
+# and is sent to the model (or decided with OFFLINE_RISK_THRESHOLD offline).
+LOW_RISK_THRESHOLD = 0.2
+HIGH_RISK_THRESHOLD = 0.8
+OFFLINE_RISK_THRESHOLD = 0.5
+
+# Per-description statistics are only trusted for groups of at least this size
+MIN_GROUP_SIZE = 4
+# A day is a velocity spike if it has at least this many transactions and
+# VELOCITY_FACTOR times the median number of transactions per active day
+VELOCITY_MIN_DAILY_COUNT = 5
+VELOCITY_FACTOR = 3.0
+
+# Both rules are decisive on their own: they score at or above HIGH_RISK_THRESHOLD
+DUPLICATE_RISK = 0.9
+VELOCITY_RISK = 0.8
+
+
+def _transactions_frame(transactions):
+    if isinstance(transactions, pd.DataFrame):
+        # A snapshot frame (see snapshot.py): columns are already typed
+        return pd.DataFrame({
+            "id": transactions["id"],
+            "tipo": transactions["tipo"].astype(object).fillna(""),
+            "descricao": transactions["descricao"].str.strip().str.lower(),
+            "valor": transactions["valor"],
+            "day": transactions["data_pagamento"].dt.floor('D'),
+        }).reset_index(drop=True)
+    dates = pd.to_datetime(
+        [t.get("data_pagamento") for t in transactions], errors='coerce', utc=True, format='mixed'
+    )
+    return pd.DataFrame({
+        "id": [str(t["_id"]) for t in transactions],
+        "tipo": [t.get("tipo") or "" for t in transactions],
+        "descricao": [(t.get("descricao") or "").strip().lower() for t in transactions],
+        "valor": pd.to_numeric(pd.Series([t.get("valor") for t in transactions], dtype=object), errors='coerce'),
+        "day": dates.floor('D'),
+    })
+
+
+def score_transactions(transactions):
+    """
+    Scores transactions (a list of documents or a snapshot frame) with deterministic, vectorized rules:
+    per-description z-score of 'valor', robust (median/MAD) outliers,
+    exact duplicates (same type, description and amount on the same day)
+    and daily velocity spikes.
+    Returns a DataFrame with one row per transaction: id, risk_score (0-1)
+    and the z, robust_z, duplicate and velocity_spike columns.
+    """
+    df = _transactions_frame(transactions)
+    keys = [df["tipo"], df["descricao"]]
+    valor = df["valor"]
+    grouped = valor.groupby(keys)
+
+    count = grouped.transform('size').to_numpy()
+    mean = grouped.transform('mean').to_numpy()
+    std = grouped.transform('std', ddof=0).to_numpy()
+    median = grouped.transform('median').to_numpy()
+    values = valor.to_numpy(dtype='float64')
+    abs_deviation = pd.Series(np.abs(values - median), index=df.index)
+    mad = abs_deviation.groupby(keys).transform('median').to_numpy()
+
+    trusted = count >= MIN_GROUP_SIZE
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = np.where(trusted & (std > 0), (values - mean) / std, 0.0)
+        robust_z = np.where(trusted & (mad > 0), 0.6745 * (values - median) / mad, 0.0)
+    z = np.nan_to_num(z)
+    robust_z = np.nan_to_num(robust_z)
+
+    duplicate = (
+        df.groupby(["tipo", "descricao", "valor", "day"], dropna=False)["id"].transform('size').to_numpy() > 1
+    ) & ~np.isnan(values) & df["day"].notna().to_numpy()
+
+    daily_count = df.groupby("day")["id"].transform('size').to_numpy()
+    per_day = df["day"].value_counts()
+    baseline = float(np.median(per_day.to_numpy())) if len(per_day) else 0.0
+    velocity_spike = (daily_count >= VELOCITY_MIN_DAILY_COUNT) & (daily_count >= VELOCITY_FACTOR * baseline)
+    velocity_spike &= df["day"].notna().to_numpy()
+
+    # Each rule maps onto 0-1; the risk score is the strongest signal
+    z_risk = np.clip((np.abs(z) - 2.0) / 4.0, 0.0, 1.0)
+    robust_risk = np.clip((np.abs(robust_z) - 3.5) / 6.5, 0.0, 1.0)
+    risk_score = np.maximum.reduce([
+        z_risk,
+        robust_risk,
+        np.where(duplicate, DUPLICATE_RISK, 0.0),
+        np.where(velocity_spike, VELOCITY_RISK, 0.0),
+    ])
+
+    return pd.DataFrame({
+        "id": df["id"],
+        "risk_score": np.round(risk_score, 3),
+        "z": np.round(z, 2),
+        "robust_z": np.round(robust_z, 2),
+        "duplicate": duplicate,
+        "velocity_spike": velocity_spike,
+    })
+
+
+def _reason(row):
+    reasons = []
+    if abs(row.z) >= 2:
+        reasons.append(f"amount is {abs(row.z):.1f} standard deviations from the usual for this description")
+    if abs(row.robust_z) >= 3.5:
+        reasons.append(f"robust outlier (MAD score {abs(row.robust_z):.1f})")
+    if row.duplicate:
+        reasons.append("same type, description and amount already recorded on the same day")
+    if row.velocity_spike:
+        reasons.append("unusually many transactions on this day")
+    if not reasons:
+        return "No anomaly found by local rules."
+    text = "; ".join(reasons)
+    return text[0].upper() + text[1:] + "."
+
+
+def _verdict(row, is_suspicious: bool):
+    return {
+        "transaction_id": row.id,
+        "is_suspicious": bool(is_suspicious),
+        "reason": _reason(row),
+        "risk_score": float(row.risk_score),
+        "recommended_action": "Review manually" if is_suspicious else "No action needed",
+        "screened_by": "local_rules"
+    }
+
+
+def prescreen_transactions(history, target_ids=None, offline: bool = False):
+    """
+    Scores the whole history and decides the target transactions (all of
+    them when target_ids is None). Returns a tuple (verdicts, ambiguous_ids):
+    fraud_report items for the transactions decided locally, and the ids
+    that still need the model. With offline=True nothing is ambiguous.
+    """
+    if len(history) == 0:
+        return [], []
+    scores = score_transactions(history)
+    if target_ids is not None:
+        scores = scores[scores["id"].isin(set(target_ids))]
+
+    risk = scores["risk_score"].to_numpy()
+    if offline:
+        decided = np.ones(len(scores), dtype=bool)
+        suspicious = risk >= OFFLINE_RISK_THRESHOLD
+    else:
+        suspicious = risk >= HIGH_RISK_THRESHOLD
+        decided = suspicious | (risk < LOW_RISK_THRESHOLD)
+
+    verdicts = [
+        _verdict(row, flag)
+        for row, flag in zip(scores[decided].itertuples(index=False), suspicious[decided])
+    ]
+    ambiguous_ids = scores.loc[~decided, "id"].tolist()
+    return verdicts, ambiguous_ids
@@ -11,9 +11,65 @@ document.addEventListener('DOMContentLoaded', function() {
     const allTransactionsTableBodyFraudGuard = document.getElementById('all-transactions-table-body-fraudguard');
 
 
+    // --- Render one transaction row, with its fraud status ---
+    function renderFraudStatusCell(fraudStatusCell, fg) {
+        if (fg) {
+            let badgeClass = 'badge-unanalyzed'; // Default to unanalyzed or if status is unclear
+            let statusText = fg.is_suspicious ? 'Suspeita' : 'Limpa';
+
+            if (fg.is_suspicious === true) {
+                badgeClass = 'badge-suspicious';
+            } else if (fg.is_suspicious === false) {
+                badgeClass = 'badge-clear';
+            }
+            // Could add more conditions for error states if backend provides them
+
+            fraudStatusCell.innerHTML = `<span class="badge ${badgeClass}">${statusText}</span>`;
+            // Tooltip for more details
+            let tooltipText = `Razão: ${fg.reason || 'N/A'}\nRisco: ${fg.risk_score !== undefined ? (fg.risk_score * 100).toFixed(0) + '%' : 'N/A'}\nAção: ${fg.recommended_action || 'N/A'}\nScan: ${fg.last_scanned_at ? new Date(fg.last_scanned_at).toLocaleString() : 'N/A'}`;
+            fraudStatusCell.title = tooltipText;
+
+        } else {
+            fraudStatusCell.innerHTML = `<span class="badge badge-unanalyzed">Não Analisada</span>`;
+        }
+    }
+
+    function appendTransactionRow(transaction) {
+        // Deltas can repeat a transaction already shown (e.g. after a reconnect)
+        if (allTransactionsTableBodyFraudGuard.querySelector(`tr[data-transaction-id="${transaction._id}"]`)) {
+            return;
+        }
+        const emptyRow = allTransactionsTableBodyFraudGuard.querySelector('tr.empty-row');
+        if (emptyRow) {
+            emptyRow.remove();
+        }
+        const row = allTransactionsTableBodyFraudGuard.insertRow();
+        row.dataset.transactionId = transaction._id;
+        row.insertCell().textContent = new Date(transaction.data_pagamento).toLocaleDateString();
+        row.insertCell().textContent = transaction.tipo;
+        row.insertCell().textContent = transaction.descricao;
+
+        const valorCell = row.insertCell();
+        valorCell.textContent = transaction.valor.toLocaleString() + ' AOA';
+         // Apply valor-receita/despesa if defined in main.css (from Tab 1)
+        if (transaction.tipo === 'receita') {
+            valorCell.classList.add('valor-receita');
+        } else if (transaction.tipo === 'despesa') {
+            valorCell.classList.add('valor-despesa');
+        }
+
+        row.insertCell().textContent = transaction.status; // Original status
+
+        const fraudStatusCell = row.insertCell();
+        fraudStatusCell.classList.add('fraud-status-cell'); // For specific cell styling if needed
+        renderFraudStatusCell(fraudStatusCell, transaction.ai_analysis_results && transaction.ai_analysis_results.fraud_guard);
+
+        row.insertCell().textContent = transaction._id;
+    }
+
     // --- Function to fetch all transactions and display them with fraud info ---
     async function fetchAndDisplayAllTransactions() {
-        allTransactionsTableBodyFraudGuard.innerHTML = '<tr><td colspan="7" style="text-align:center;">Carregando todas as transações...</td></tr>';
+        allTransactionsTableBodyFraudGuard.innerHTML = '<tr class="empty-row"><td colspan="7" style="text-align:center;">Carregando todas as transações...</td></tr>';
         try {
             const response = await fetch('/api/transactions'); 
             if (!response.ok) {
@@ -25,6 +81,7 @@ document.addEventListener('DOMContentLoaded', function() {
 
             if (transactions.length === 0) {
                  const row = allTransactionsTableBodyFraudGuard.insertRow();
+                 row.classList.add('empty-row');
                  const cell = row.insertCell();
                  cell.colSpan = 7;
                  cell.textContent = 'Nenhuma transação encontrada.';
@@ -32,49 +89,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 return;
             }
 
-            transactions.forEach(transaction => {
-                const row = allTransactionsTableBodyFraudGuard.insertRow();
-                row.insertCell().textContent = new Date(transaction.data_pagamento).toLocaleDateString();
-                row.insertCell().textContent = transaction.tipo;
-                row.insertCell().textContent = transaction.descricao;
-                
-                const valorCell = row.insertCell();
-                valorCell.textContent = transaction.valor.toLocaleString() + ' AOA';
-                 // Apply valor-receita/despesa if defined in main.css (from Tab 1)
-                if (transaction.tipo === 'receita') {
-                    valorCell.classList.add('valor-receita'); 
-                } else if (transaction.tipo === 'despesa') {
-                    valorCell.classList.add('valor-despesa');
-                }
-
-                row.insertCell().textContent = transaction.status; // Original status
-
-                const fraudStatusCell = row.insertCell();
-                fraudStatusCell.classList.add('fraud-status-cell'); // For specific cell styling if needed
-
-                if (transaction.ai_analysis_results && transaction.ai_analysis_results.fraud_guard) {
-                    const fg = transaction.ai_analysis_results.fraud_guard;
-                    let badgeClass = 'badge-unanalyzed'; // Default to unanalyzed or if status is unclear
-                    let statusText = fg.is_suspicious ? 'Suspeita' : 'Limpa';
-
-                    if (fg.is_suspicious === true) {
-                        badgeClass = 'badge-suspicious';
-                    } else if (fg.is_suspicious === false) {
-                        badgeClass = 'badge-clear';
-                    }
-                    // Could add more conditions for error states if backend provides them
-                    
-                    fraudStatusCell.innerHTML = `<span class="badge ${badgeClass}">${statusText}</span>`;
-                    // Tooltip for more details
-                    let tooltipText = `Razão: ${fg.reason || 'N/A'}\nRisco: ${fg.risk_score !== undefined ? (fg.risk_score * 100).toFixed(0) + '%' : 'N/A'}\nAção: ${fg.recommended_action || 'N/A'}\nScan: ${fg.last_scanned_at ? new Date(fg.last_scanned_at).toLocaleString() : 'N/A'}`;
-                    fraudStatusCell.title = tooltipText;
-
-                } else {
-                    fraudStatusCell.innerHTML = `<span class="badge badge-unanalyzed">Não Analisada</span>`;
-                }
-                
-                row.insertCell().textContent = transaction._id;
-            });
+            transactions.forEach(appendTransactionRow);
 
         } catch (error) {
             console.error('Error fetching all transactions for FraudGuard tab:', error);
@@ -88,23 +103,57 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
+    // --- Live updates: apply pushed deltas instead of re-fetching everything ---
+    let verdictsReceived = 0;
+    let reloadAfterImport = false;
+    LiveUpdates.on('transaction_inserted', appendTransactionRow);
+    LiveUpdates.on('import_progress', data => {
+        (data.transactions || []).forEach(appendTransactionRow);
+        // Chunks too large to push as deltas are reloaded once the import ends
+        reloadAfterImport = reloadAfterImport || data.reload;
+    });
+    LiveUpdates.on('import_completed', () => {
+        if (reloadAfterImport) {
+            reloadAfterImport = false;
+            fetchAndDisplayAllTransactions();
+        }
+    });
+    LiveUpdates.on('fraud_verdicts', data => {
+        if (data.reload) {
+            fetchAndDisplayAllTransactions();
+            return;
+        }
+        data.verdicts.forEach(verdict => {
+            const row = allTransactionsTableBodyFraudGuard.querySelector(`tr[data-transaction-id="${verdict.transaction_id}"]`);
+            if (row) {
+                renderFraudStatusCell(row.querySelector('.fraud-status-cell'), verdict.fraud_guard);
+            }
+        });
+        if (analyzeFraudButton.disabled) { // A scan started from this tab is running
+            verdictsReceived += data.verdicts.length;
+            analysisStatus.textContent = `Analisando transações... ${verdictsReceived} resultados recebidos.`;
+        }
+    });
+    LiveUpdates.on('resync', fetchAndDisplayAllTransactions);
+
 
     // --- Handle Fraud Analysis Button Click ---
     if (analyzeFraudButton) {
         analyzeFraudButton.addEventListener('click', async function() {
             analysisStatus.textContent = 'Analisando transações... Por favor, aguarde.';
             analyzeFraudButton.disabled = true;
+            verdictsReceived = 0;
             fraudReportTableBody.innerHTML = '<tr><td colspan="9" style="text-align:center;">A processar...</td></tr>';
             totalScannedSpan.textContent = '-';
             suspiciousFoundSpan.textContent = '-';
             overallRiskSpan.textContent = '-';
 
             try {
-                const response = await fetch('/api/detect_fraud', { method: 'POST' });
-                const result = await response.json();
+                const jobOutcome = await runAnalysisJob('/api/detect_fraud');
+                const result = jobOutcome.result;
 
-                if (!response.ok) {
-                    throw new Error(result.error || result.details || `HTTP error ${response.status}`);
+                if (!jobOutcome.ok) {
+                    throw new Error(result.error || result.details || `HTTP error ${jobOutcome.status}`);
                 }
 
                 analysisStatus.textContent = 'Análise concluída.';
@@ -171,8 +220,11 @@ document.addEventListener('DOMContentLoaded', function() {
                     fraudReportTableBody.innerHTML = '<tr><td colspan="9" style="text-align:center;">Nenhum relatório de fraude detalhado retornado.</td></tr>';
                 }
                 
-                // Refresh the list of all transactions to show updated fraud statuses
-                fetchAndDisplayAllTransactions(); // This will now update the new table
+                // Refresh the list of all transactions to show updated fraud statuses;
+                // with live updates the verdicts were already applied as they were written
+                if (!LiveUpdates.isConnected()) {
+                    fetchAndDisplayAllTransactions();
+                }
 
             } catch (error) {
                 console.error('Error during fraud analysis:', error);
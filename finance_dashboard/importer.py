@@ -0,0 +1,222 @@
+import os
+import codecs
+import pandas as pd
+import numpy as np
+from openpyxl import load_workbook
+
+# Columns expected in an uploaded file after header normalization
+# (e.g. 'Data de Pagamento' -> 'data_de_pagamento')
+REQUIRED_COLUMNS = ['tipo', 'descricao', 'valor', 'data_de_pagamento', 'status']
+VALID_TIPOS = ['receita', 'despesa']
+VALID_STATUSES = ['pago', 'pendente', 'agendado']
+
+# Number of data rows read, validated and written per step of a streamed import
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "5000"))
+# Number of bytes inspected when detecting the encoding of a CSV upload
+ENCODING_SNIFF_BYTES = 64 * 1024
+
+
+def normalize_columns(df: pd.DataFrame):
+    """
+    Normalizes the column names of an uploaded DataFrame in place and
+    returns the list of required columns that are missing.
+    """
+    df.columns = df.columns.astype(str).str.lower().str.replace(' ', '_').str.replace('-', '_')
+    return [col for col in REQUIRED_COLUMNS if col not in df.columns]
+
+
+def _clean_text(series: pd.Series) -> pd.Series:
+    # NaN cells become empty strings so they are reported as missing
+    return series.where(series.notna(), '').astype(str).str.strip()
+
+
+def _is_blank(series: pd.Series) -> np.ndarray:
+    return (series.isna() | (series.astype(str).str.strip() == '')).to_numpy()
+
+
+def _parse_dates(series: pd.Series) -> pd.Series:
+    try:
+        return pd.to_datetime(series, errors='coerce', format='mixed')
+    except (TypeError, ValueError):
+        # Older pandas versions do not know format='mixed'
+        return pd.to_datetime(series, errors='coerce')
+
+
+def validate_transactions_frame(df: pd.DataFrame, first_row_number: int = 2):
+    """
+    Validates a DataFrame of uploaded transactions column-wise.
+
+    The DataFrame must already have normalized column names and an index
+    holding the zero-based position of each data row in the file. Returns a
+    tuple (documents, row_numbers, errors): the documents ready to be
+    inserted, the spreadsheet row number of each document and one error
+    message for every rejected row. first_row_number is the spreadsheet row
+    of the first data row (row 1 is the header).
+    """
+    if len(df) == 0:
+        return [], [], []
+
+    row_numbers = df.index.to_numpy() + first_row_number
+
+    tipo = _clean_text(df['tipo']).str.lower()
+    descricao = _clean_text(df['descricao'])
+    status = _clean_text(df['status']).str.lower()
+
+    valor_raw = df['valor']
+    valor = pd.to_numeric(valor_raw, errors='coerce')
+    valor_missing = _is_blank(valor_raw)
+    valor_invalid = ~valor_missing & valor.isna().to_numpy()
+
+    data_raw = df['data_de_pagamento']
+    data_pagamento = _parse_dates(data_raw)
+    data_missing = _is_blank(data_raw)
+    data_invalid = ~data_missing & data_pagamento.isna().to_numpy()
+
+    tipo_missing = (tipo == '').to_numpy()
+    descricao_missing = (descricao == '').to_numpy()
+    status_missing = (status == '').to_numpy()
+    tipo_invalid = ~tipo_missing & ~tipo.isin(VALID_TIPOS).to_numpy()
+    status_invalid = ~status_missing & ~status.isin(VALID_STATUSES).to_numpy()
+
+    # Checks are listed in reporting order; only the first failing check of a row is reported
+    checks = [
+        valor_missing, valor_invalid,
+        data_missing, data_invalid,
+        tipo_missing, descricao_missing, status_missing,
+        tipo_invalid, status_invalid,
+    ]
+    first_failure = np.select(checks, np.arange(1, len(checks) + 1), default=0)
+
+    errors = []
+    for position in np.flatnonzero(first_failure):
+        row = row_numbers[position]
+        check = first_failure[position]
+        if check == 1:
+            errors.append(f"Row {row}: 'valor' is missing.")
+        elif check == 2:
+            errors.append(f"Row {row}: 'valor' ({valor_raw.iat[position]}) is not a valid number.")
+        elif check == 3:
+            errors.append(f"Row {row}: 'data_de_pagamento' is missing.")
+        elif check == 4:
+            errors.append(f"Row {row}: 'data_de_pagamento' ({data_raw.iat[position]}) is not a valid date or format.")
+        elif check == 5:
+            errors.append(f"Row {row}: 'tipo' is missing.")
+        elif check == 6:
+            errors.append(f"Row {row}: 'descricao' is missing.")
+        elif check == 7:
+            errors.append(f"Row {row}: 'status' is missing.")
+        elif check == 8:
+            errors.append(f"Row {row}: Invalid 'tipo': {tipo.iat[position]}. Must be 'receita' or 'despesa'.")
+        else:
+            errors.append(f"Row {row}: Invalid 'status': {status.iat[position]}. Must be 'pago', 'pendente', or 'agendado'.")
+
+    valid = first_failure == 0
+    valid_dates = data_pagamento[valid]
+    if getattr(valid_dates.dt, 'tz', None) is not None:
+        valid_dates = valid_dates.dt.tz_convert(None)
+
+    documents = [
+        {
+            "tipo": t,
+            "descricao": d,
+            "valor": v,
+            "data_pagamento": dp,
+            "status": s
+            # created_at and ai_analysis_results are set by the database writer
+        }
+        for t, d, v, dp, s in zip(
+            tipo[valid].tolist(),
+            descricao[valid].tolist(),
+            valor[valid].astype('float64').tolist(),
+            list(valid_dates.dt.to_pydatetime()),
+            status[valid].tolist(),
+        )
+    ]
+    return documents, row_numbers[valid].tolist(), errors
+
+
+def detect_encoding(stream):
+    """
+    Detects the text encoding of a CSV upload from a prefix of the stream.
+    The stream is rewound to the start before returning.
+    """
+    prefix = stream.read(ENCODING_SNIFF_BYTES)
+    stream.seek(0)
+    if prefix.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    try:
+        # final=False tolerates a multi-byte character cut at the end of the prefix
+        codecs.getincrementaldecoder('utf-8')().decode(prefix, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'latin1'
+
+
+def iter_csv_frames(stream, chunk_size: int = IMPORT_CHUNK_SIZE):
+    """
+    Yields the rows of a CSV upload as DataFrames of at most chunk_size rows.
+    """
+    encoding = detect_encoding(stream)
+    rows_read = 0
+    try:
+        with pd.read_csv(stream, encoding=encoding, chunksize=chunk_size) as reader:
+            for chunk in reader:
+                rows_read += len(chunk)
+                yield chunk
+        return
+    except UnicodeDecodeError:
+        if encoding == 'latin1':
+            raise
+    # Only a prefix was sniffed: a file that stops being UTF-8 further down is parsed
+    # again as latin1 and the records already yielded (and possibly imported) are
+    # dropped by position; skiprows would count lines, not records with quoted newlines
+    stream.seek(0)
+    with pd.read_csv(stream, encoding='latin1', chunksize=chunk_size) as reader:
+        for chunk in reader:
+            chunk = chunk[chunk.index >= rows_read]
+            if len(chunk):
+                yield chunk
+
+
+def iter_xlsx_frames(stream, chunk_size: int = IMPORT_CHUNK_SIZE):
+    """
+    Yields the rows of the first sheet of an XLSX upload as DataFrames of at
+    most chunk_size rows, using openpyxl's read-only row iteration.
+    """
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            raise pd.errors.EmptyDataError("No columns to parse from file")
+        columns = ['' if name is None else str(name) for name in header]
+
+        width = len(columns)
+        batch = []
+        positions = []
+        yielded = False
+        for position, values in enumerate(rows):
+            if all(value is None for value in values):
+                continue # Skip blank rows, as pd.read_excel does
+            batch.append(tuple(values[:width]) + (None,) * (width - len(values)))
+            positions.append(position)
+            if len(batch) >= chunk_size:
+                yield pd.DataFrame.from_records(batch, columns=columns, index=positions)
+                yielded = True
+                batch, positions = [], []
+        if batch or not yielded:
+            # A header-only sheet still yields one empty frame so its columns can be checked
+            yield pd.DataFrame.from_records(batch, columns=columns, index=positions)
+    finally:
+        workbook.close()
+
+
+def iter_upload_frames(stream, filename: str, chunk_size: int = IMPORT_CHUNK_SIZE):
+    """
+    Yields the rows of an uploaded CSV or XLSX file as bounded DataFrames.
+    """
+    if filename.lower().endswith('.csv'):
+        return iter_csv_frames(stream, chunk_size)
+    if filename.lower().endswith('.xlsx'):
+        return iter_xlsx_frames(stream, chunk_size)
+    raise ValueError(f"Unsupported file type: {filename}")
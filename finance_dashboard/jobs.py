@@ -0,0 +1,138 @@
+import os
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from metrics import timed_job
+
+ANALYSIS_JOB_WORKERS = int(os.getenv("ANALYSIS_JOB_WORKERS", "4"))
+# Finished jobs are kept this long so clients can still poll their result
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+_current = threading.local()
+
+
+def current_job():
+    """
+    Returns the Job running in the calling thread, or None outside a job.
+    """
+    return getattr(_current, "job", None)
+
+
+class Job:
+    """
+    A unit of background work. The job function returns a tuple
+    (result_dict, http_status), mirroring what the endpoint would have
+    returned synchronously.
+    """
+
+    def __init__(self, kind: str, key: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.status = JOB_QUEUED
+        self.result = None
+        self.http_status = None
+        self.error = None
+        self.progress = None # optional partial results reported by the job function
+        self.created_at = datetime.utcnow()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in (JOB_COMPLETED, JOB_FAILED)
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "http_status": self.http_status,
+            "result": self.result,
+            "progress": self.progress,
+            "error": self.error
+        }
+
+
+class JobManager:
+    """
+    Runs jobs on a thread pool and keeps an in-memory job table.
+    Submitting a job whose key matches a job that is still queued or running
+    returns the existing job instead of starting a new one. If given,
+    on_finished(job) is called after each job completes or fails.
+    """
+
+    def __init__(self, max_workers: int = ANALYSIS_JOB_WORKERS, logger=None, on_finished=None):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analysis-job")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._active_by_key = {}
+        self._logger = logger
+        self._on_finished = on_finished
+
+    def submit(self, kind: str, key: str, fn, *args, **kwargs):
+        """
+        Queues fn(*args, **kwargs) as a job. Returns a tuple (job, created).
+        """
+        with self._lock:
+            self._prune_finished()
+            active_id = self._active_by_key.get(key)
+            if active_id is not None:
+                return self._jobs[active_id], False
+            job = Job(kind, key)
+            self._jobs[job.id] = job
+            self._active_by_key[key] = job.id
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job, True
+
+    def get(self, job_id: str):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: Job, fn, args, kwargs):
+        job.status = JOB_RUNNING
+        job.started_at = datetime.utcnow()
+        _current.job = job
+        try:
+            with timed_job(job.kind) as outcome:
+                job.result, job.http_status = fn(*args, **kwargs)
+                outcome["status"] = JOB_COMPLETED
+            job.status = JOB_COMPLETED
+        except Exception as e:
+            if self._logger:
+                self._logger.error(f"Job {job.id} ({job.kind}) failed: {e}")
+            job.error = str(e)
+            job.http_status = 500
+            job.status = JOB_FAILED
+        finally:
+            _current.job = None
+            job.finished_at = datetime.utcnow()
+            with self._lock:
+                if self._active_by_key.get(job.key) == job.id:
+                    del self._active_by_key[job.key]
+        if self._on_finished is not None:
+            try:
+                self._on_finished(job)
+            except Exception as e:
+                if self._logger:
+                    self._logger.error(f"Job {job.id} finish callback failed: {e}")
+
+    def _prune_finished(self):
+        # Caller must hold self._lock
+        now = datetime.utcnow()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished and (now - job.finished_at).total_seconds() > JOB_RETENTION_SECONDS
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
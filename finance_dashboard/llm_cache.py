@@ -0,0 +1,112 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from database import ensure_llm_cache_index, get_cached_llm_response, put_cached_llm_response
+
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "256"))
+
+
+def make_cache_key(model_name: str, prompt: str):
+    """
+    Returns the content address of a model response: sha256 of model name and prompt.
+    """
+    return hashlib.sha256(f"{model_name}\x00{prompt}".encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier cache of LLM response texts keyed by make_cache_key().
+
+    The first tier is an in-process LRU; the second is the 'llm_response_cache'
+    MongoDB collection, whose TTL index evicts old entries. Failures of the
+    persistent tier are logged and treated as misses so they never break an
+    analysis.
+    """
+
+    def __init__(self, ttl_seconds: int = LLM_CACHE_TTL_SECONDS, max_entries: int = LLM_CACHE_MAX_ENTRIES, logger=None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._logger = logger
+        self._lock = threading.Lock()
+        self._entries = OrderedDict() # cache_key -> (expires_at_monotonic, response_text)
+        self._index_ready = False
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    def get(self, model_name: str, prompt: str):
+        """
+        Returns the cached response text, or None on a miss.
+        """
+        cache_key = make_cache_key(model_name, prompt)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                expires_at, response_text = entry
+                if time.monotonic() < expires_at:
+                    self._entries.move_to_end(cache_key)
+                    self.memory_hits += 1
+                    return response_text
+                del self._entries[cache_key]
+
+        try:
+            document = get_cached_llm_response(cache_key)
+        except Exception as e:
+            self._log_error(f"LLM cache lookup failed: {e}")
+            document = None
+        # The TTL monitor only runs periodically, so expired documents may still be found
+        remaining = timedelta(seconds=self.ttl_seconds) - (datetime.utcnow() - document["created_at"]) if document else None
+        if remaining is not None and remaining.total_seconds() > 0:
+            # The memory copy expires with the document, not a full TTL from now
+            self._remember(cache_key, document["response_text"], remaining.total_seconds())
+            with self._lock:
+                self.persistent_hits += 1
+            return document["response_text"]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, model_name: str, prompt: str, response_text: str):
+        """
+        Stores a response text in both tiers.
+        """
+        cache_key = make_cache_key(model_name, prompt)
+        self._remember(cache_key, response_text)
+        try:
+            if not self._index_ready:
+                ensure_llm_cache_index(self.ttl_seconds)
+                self._index_ready = True
+            put_cached_llm_response(cache_key, model_name, response_text)
+        except Exception as e:
+            self._log_error(f"LLM cache write failed: {e}")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.persistent_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "persistent_hits": self.persistent_hits,
+                "misses": self.misses,
+                "hit_ratio": round((self.memory_hits + self.persistent_hits) / lookups, 4) if lookups else None,
+                "memory_entries": len(self._entries),
+                "max_memory_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds
+            }
+
+    def _remember(self, cache_key: str, response_text: str, ttl_seconds: float = None):
+        expires_at = time.monotonic() + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        with self._lock:
+            self._entries[cache_key] = (expires_at, response_text)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _log_error(self, message: str):
+        if self._logger:
+            self._logger.error(message)
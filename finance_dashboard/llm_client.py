@@ -0,0 +1,367 @@
+import os
+import re
+import json
+import time
+import random
+import threading
+
+try:
+    from google.api_core import exceptions as google_exceptions
+except ImportError: # google-generativeai not installed; only the fake provider can be used
+    google_exceptions = None
+
+from metrics import LLM_ERRORS, LLM_PROMPT_BYTES, LLM_PROMPT_TOKENS, LLM_REQUESTS, LLM_RESPONSE_BYTES, stage
+from prompt_encoding import estimate_tokens
+from response_parsing import SchemaError, StreamingJSONParser, extract_json, validate
+
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini") # 'gemini' or 'fake'
+LLM_MODEL_NAME = os.getenv("LLM_MODEL_NAME", "gemini-pro")
+# Deadline of a single model call, and of a call including its retries
+LLM_CALL_TIMEOUT_SECONDS = float(os.getenv("LLM_CALL_TIMEOUT_SECONDS", "60"))
+LLM_TOTAL_DEADLINE_SECONDS = float(os.getenv("LLM_TOTAL_DEADLINE_SECONDS", "150"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BASE_DELAY_SECONDS = float(os.getenv("LLM_RETRY_BASE_DELAY_SECONDS", "0.5"))
+LLM_RETRY_MAX_DELAY_SECONDS = float(os.getenv("LLM_RETRY_MAX_DELAY_SECONDS", "8"))
+# The circuit opens after this many consecutive failed calls and lets a probe through after the reset time
+LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+# Simulated response time of the fake provider
+FAKE_LLM_LATENCY_SECONDS = float(os.getenv("FAKE_LLM_LATENCY_SECONDS", "0"))
+FAKE_LLM_STREAM_CHUNK_CHARS = 64
+
+
+class LLMError(Exception):
+    pass
+
+
+class LLMUnavailableError(LLMError):
+    """
+    Raised without calling the provider while the circuit breaker is open.
+    """
+    pass
+
+
+def is_transient_error(error: Exception):
+    """
+    Errors worth retrying: timeouts, rate limiting and server-side failures.
+    """
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    if google_exceptions is not None:
+        return isinstance(error, (
+            google_exceptions.DeadlineExceeded,
+            google_exceptions.ServiceUnavailable,
+            google_exceptions.InternalServerError,
+            google_exceptions.TooManyRequests,
+            google_exceptions.ResourceExhausted,
+            google_exceptions.BadGateway,
+            google_exceptions.GatewayTimeout,
+            google_exceptions.Aborted,
+        ))
+    return False
+
+
+class GeminiProvider:
+    """
+    Calls Gemini through google-generativeai. GenerativeModel instances are
+    created once per model name and shared by all requests.
+    """
+
+    def __init__(self, api_key: str, model_name: str = LLM_MODEL_NAME):
+        import google.generativeai as genai
+        self._genai = genai
+        self.model_name = model_name
+        self.configured = bool(api_key) and api_key != "YOUR_API_KEY_HERE"
+        if self.configured:
+            genai.configure(api_key=api_key)
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def _model(self):
+        with self._lock:
+            model = self._models.get(self.model_name)
+            if model is None:
+                model = self._genai.GenerativeModel(self.model_name)
+                self._models[self.model_name] = model
+            return model
+
+    def generate(self, prompt: str, timeout: float):
+        response = self._model().generate_content(prompt, request_options={"timeout": timeout})
+        return response.text
+
+    def stream(self, prompt: str, timeout: float):
+        """
+        Yields the response text chunk by chunk as Gemini produces it.
+        """
+        response = self._model().generate_content(prompt, stream=True, request_options={"timeout": timeout})
+        for chunk in response:
+            yield chunk.text
+
+
+class FakeProvider:
+    """
+    Offline provider for load tests and CI. Answers the prompts of this app
+    with well-formed JSON after FAKE_LLM_LATENCY_SECONDS, without network access.
+    """
+
+    model_name = "fake"
+    configured = True
+
+    def __init__(self, latency_seconds: float = FAKE_LLM_LATENCY_SECONDS):
+        self.latency_seconds = latency_seconds
+
+    def generate(self, prompt: str, timeout: float):
+        if self.latency_seconds:
+            time.sleep(min(self.latency_seconds, timeout))
+        return json.dumps(self.respond(prompt))
+
+    def stream(self, prompt: str, timeout: float):
+        text = self.generate(prompt, timeout)
+        for start in range(0, len(text), FAKE_LLM_STREAM_CHUNK_CHARS):
+            yield text[start:start + FAKE_LLM_STREAM_CHUNK_CHARS]
+
+    @staticmethod
+    def respond(prompt: str):
+        if "fraudulent" in prompt:
+            # Transaction ids are the first column of the prompt's CSV table
+            ids = re.findall(r"(?m)^([0-9a-f]{24}),", prompt)
+            return {
+                "fraud_report": [
+                    {"transaction_id": transaction_id, "is_suspicious": False, "reason": "", "risk_score": 0.0,
+                     "recommended_action": "No action needed"}
+                    for transaction_id in ids
+                ],
+                "currency": "AOA"
+            }
+        if "credit analysis" in prompt:
+            return {
+                "credit_analysis_report": {
+                    "credit_score": "Fair (5/10)",
+                    "recommended_credit_limit_AOA": 0,
+                    "key_positive_factors": ["Generated by the fake LLM provider."],
+                    "key_negative_factors": [],
+                    "assessment_summary": "Offline assessment generated by the fake LLM provider.",
+                    "confidence_level": "Low"
+                },
+                "currency": "AOA"
+            }
+        if "improvement_tips" in prompt:
+            return {"improvement_tips": ["Generated by the fake LLM provider."]}
+        return {}
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker. While open, calls are rejected until
+    reset_seconds have passed; then a single probe call is let through and
+    its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = LLM_BREAKER_FAILURE_THRESHOLD,
+                 reset_seconds: float = LLM_BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._probing or time.monotonic() - self._opened_at >= self.reset_seconds:
+                return "half_open"
+            return "open"
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if not self._probing and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+
+class LLMClient:
+    """
+    Shared entry point for model calls: response cache, circuit breaker,
+    per-call timeout and jittered exponential retry of transient errors
+    within an overall deadline.
+    """
+
+    def __init__(self, provider, cache=None, breaker: CircuitBreaker = None,
+                 call_timeout: float = LLM_CALL_TIMEOUT_SECONDS,
+                 total_deadline: float = LLM_TOTAL_DEADLINE_SECONDS,
+                 max_retries: int = LLM_MAX_RETRIES, logger=None):
+        self.provider = provider
+        self.cache = cache
+        self.breaker = breaker or CircuitBreaker()
+        self.call_timeout = call_timeout
+        self.total_deadline = total_deadline
+        self.max_retries = max_retries
+        self._logger = logger
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.rejected = 0
+
+    @property
+    def configured(self):
+        return self.provider.configured
+
+    @property
+    def available(self):
+        """
+        False while the circuit breaker is open, so callers can skip the model.
+        """
+        return self.configured and self.breaker.state != "open"
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _retry_delay(self, attempt: int):
+        # Full jitter: uniform in [0, min(max_delay, base * 2^attempt)]
+        return random.uniform(0, min(LLM_RETRY_MAX_DELAY_SECONDS, LLM_RETRY_BASE_DELAY_SECONDS * 2 ** attempt))
+
+    def _call_with_retries(self, call):
+        """
+        Runs call(timeout) under the circuit breaker, retrying transient
+        errors with backoff until max_retries or the overall deadline.
+        """
+        if not self.breaker.allow():
+            self._count("rejected")
+            raise LLMUnavailableError("LLM provider unavailable (circuit breaker open)")
+
+        deadline = time.monotonic() + self.total_deadline
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            self._count("calls")
+            try:
+                result = call(max(1.0, min(self.call_timeout, remaining)))
+            except Exception as e:
+                delay = self._retry_delay(attempt)
+                if not is_transient_error(e) or attempt >= self.max_retries or time.monotonic() + delay >= deadline:
+                    self._count("failures")
+                    if is_transient_error(e):
+                        self.breaker.record_failure()
+                    else:
+                        # The provider answered (e.g. invalid request): not a sign of degradation
+                        self.breaker.record_success()
+                    raise
+                if self._logger:
+                    self._logger.warning(f"Transient LLM error ({e}); retrying in {delay:.2f}s")
+                self._count("retries")
+                attempt += 1
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+    def generate_text(self, prompt: str):
+        """
+        Returns the model's response text. Raises LLMUnavailableError while the
+        circuit is open, or the provider's last error once retries or the
+        deadline are exhausted.
+        """
+        return self._call_with_retries(lambda timeout: self.provider.generate(prompt, timeout=timeout))
+
+    def generate_json(self, prompt: str, schema=None, item_key: str = None, item_schema=None, on_item=None):
+        """
+        Returns the JSON answer to a prompt, validated against schema (see
+        response_parsing.validate). Repeated prompts are served from the
+        response cache; only responses that parse and validate are cached.
+
+        With on_item, the response is streamed and on_item(item) is called
+        for every object of the item_key array as soon as it is complete
+        (items failing item_schema are skipped). A retried stream may deliver
+        an item again, so on_item must be idempotent.
+        """
+        def deliver(items):
+            for item in items:
+                try:
+                    if item_schema is not None:
+                        validate(item, item_schema)
+                except SchemaError as e:
+                    if self._logger:
+                        self._logger.warning(f"Skipping streamed '{item_key}' item: {e}")
+                    continue
+                on_item(item)
+
+        def stream(timeout):
+            parser = StreamingJSONParser(item_key)
+            for chunk in self.provider.stream(prompt, timeout=timeout):
+                deliver(parser.feed(chunk))
+            return parser.text
+
+        model_name = self.provider.model_name
+        response_text = self.cache.get(model_name, prompt) if self.cache is not None else None
+        from_cache = response_text is not None
+        try:
+            if from_cache:
+                if on_item is not None:
+                    deliver(StreamingJSONParser(item_key).feed(response_text))
+            else:
+                LLM_PROMPT_BYTES.inc(len(prompt.encode("utf-8")))
+                LLM_PROMPT_TOKENS.inc(estimate_tokens(prompt))
+                # Streamed items are delivered (and written back) during this stage
+                with stage("llm_generate"):
+                    if on_item is not None and hasattr(self.provider, "stream"):
+                        response_text = self._call_with_retries(stream)
+                    else:
+                        response_text = self.generate_text(prompt)
+                        if on_item is not None:
+                            deliver(StreamingJSONParser(item_key).feed(response_text))
+                LLM_RESPONSE_BYTES.inc(len(response_text.encode("utf-8")))
+
+            with stage("llm_parse"):
+                result = extract_json(response_text)
+                if schema is not None:
+                    validate(result, schema)
+        except Exception as e:
+            LLM_REQUESTS.inc(outcome="error")
+            LLM_ERRORS.inc(error=type(e).__name__)
+            raise
+        LLM_REQUESTS.inc(outcome="cache_hit" if from_cache else "success")
+        if self.cache is not None and not from_cache:
+            self.cache.put(model_name, prompt, response_text)
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                "provider": type(self.provider).__name__,
+                "model": self.provider.model_name,
+                "configured": self.configured,
+                "breaker_state": self.breaker.state,
+                "calls": self.calls,
+                "retries": self.retries,
+                "failures": self.failures,
+                "rejected_by_breaker": self.rejected
+            }
+
+
+def create_provider(api_key: str = None, provider_name: str = LLM_PROVIDER):
+    if provider_name == "fake":
+        return FakeProvider()
+    if provider_name == "gemini":
+        return GeminiProvider(api_key)
+    raise ValueError(f"Unknown LLM_PROVIDER '{provider_name}', expected 'gemini' or 'fake'")
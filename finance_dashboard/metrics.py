@@ -0,0 +1,269 @@
+import os
+import json
+import time
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager, nullcontext
+
+# With METRICS_ENABLED=false every counter and timer below is a no-op and /metrics is not served
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+# One JSON log line per request and per background job with its stage timings
+TIMING_LOGS_ENABLED = os.getenv("TIMING_LOGS_ENABLED", "false").lower() in ("1", "true", "yes")
+# Histogram buckets (seconds)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra: str = ""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """
+    Monotonic counter with optional labels, e.g.
+    counter.inc(command="find") for labels=("command",).
+    """
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labels=()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        return [(self.name + _format_labels(self.labels, key), value) for key, value in sorted(values.items())]
+
+
+class Histogram:
+    """
+    Cumulative histogram (Prometheus semantics) with optional labels.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labels=(), buckets=DURATION_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {} # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [0] * (len(self.buckets) + 2)
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[position] += 1
+                    break
+            entry[-2] += value
+            entry[-1] += 1
+
+    def samples(self):
+        with self._lock:
+            values = {key: list(entry) for key, entry in self._values.items()}
+        samples = []
+        for key, entry in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry):
+                cumulative += count
+                samples.append((f"{self.name}_bucket" + _format_labels(self.labels, key, f'le="{bound}"'), cumulative))
+            samples.append((f"{self.name}_bucket" + _format_labels(self.labels, key, 'le="+Inf"'), entry[-1]))
+            samples.append((f"{self.name}_sum" + _format_labels(self.labels, key), round(entry[-2], 6)))
+            samples.append((f"{self.name}_count" + _format_labels(self.labels, key), entry[-1]))
+        return samples
+
+
+class Gauge:
+    """
+    Gauge read from callback() at scrape time: a number, or a dict of
+    {label values tuple: number} for labelled gauges.
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str, callback, labels=()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self.callback = callback
+
+    def samples(self):
+        values = self.callback()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [(self.name + _format_labels(self.labels, key), value) for key, value in sorted(values.items())]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, description: str, labels=()):
+        return self.register(Counter(name, description, labels))
+
+    def histogram(self, name: str, description: str, labels=(), buckets=DURATION_BUCKETS):
+        return self.register(Histogram(name, description, labels, buckets))
+
+    def gauge(self, name: str, description: str, callback, labels=()):
+        return self.register(Gauge(name, description, callback, labels))
+
+    def render(self):
+        """
+        All metrics in the Prometheus text exposition format.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                samples = metric.samples()
+            except Exception: # a failing gauge callback must not break the scrape
+                continue
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name} {float(value)!r}" for name, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUESTS = registry.counter("http_requests_total", "HTTP requests by endpoint and status.", ("method", "endpoint", "status"))
+HTTP_REQUEST_SECONDS = registry.histogram("http_request_duration_seconds", "HTTP request latency until the response is returned.", ("method", "endpoint"))
+STAGE_SECONDS = registry.histogram("stage_duration_seconds", "Duration of instrumented processing stages.", ("stage",))
+JOB_SECONDS = registry.histogram("analysis_job_duration_seconds", "Duration of background analysis jobs.", ("kind", "status"))
+MONGO_COMMANDS = registry.counter("mongo_commands_total", "MongoDB commands sent by the driver.", ("command", "outcome"))
+MONGO_COMMAND_SECONDS = registry.histogram("mongo_command_duration_seconds", "MongoDB command round-trip time.", ("command",))
+TRANSACTIONS_INSERTED = registry.counter("transactions_inserted_total", "Transactions written to MongoDB.", ("source",))
+UPLOAD_ROWS = registry.counter("upload_rows_total", "Rows of uploaded transaction files.", ("outcome",))
+LLM_REQUESTS = registry.counter("llm_requests_total", "LLM requests by outcome (cache_hit, success, error).", ("outcome",))
+LLM_ERRORS = registry.counter("llm_errors_total", "Failed LLM requests by error type.", ("error",))
+LLM_PROMPT_BYTES = registry.counter("llm_prompt_bytes_total", "UTF-8 bytes of prompts sent to the model.")
+LLM_PROMPT_TOKENS = registry.counter("llm_prompt_tokens_total", "Estimated tokens of prompts sent to the model.")
+LLM_RESPONSE_BYTES = registry.counter("llm_response_bytes_total", "UTF-8 bytes of model responses.")
+
+# Stage durations of the current request or job, when timing logs are on
+_stage_timings = contextvars.ContextVar("stage_timings", default=None)
+_stage_timings_lock = threading.Lock()
+_disabled_stage = nullcontext()
+
+_timing_logger = logging.getLogger("finance_dashboard.timing")
+if TIMING_LOGS_ENABLED and not _timing_logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    _timing_logger.addHandler(_handler)
+    _timing_logger.setLevel(logging.INFO)
+    _timing_logger.propagate = False
+
+
+class _Stage:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.started
+        STAGE_SECONDS.observe(elapsed, stage=self.name)
+        timings = _stage_timings.get()
+        if timings is not None:
+            # Stages of worker threads (see copy_timing_context) add up into the same dict
+            with _stage_timings_lock:
+                timings[self.name] = timings.get(self.name, 0.0) + elapsed
+
+
+def stage(name: str):
+    """
+    Context manager timing one processing stage into stage_duration_seconds
+    and into the timing log of the current request or job. Returns a shared
+    no-op context when metrics and timing logs are off.
+    """
+    if not METRICS_ENABLED and not TIMING_LOGS_ENABLED:
+        return _disabled_stage
+    return _Stage(name)
+
+
+def start_timing():
+    """
+    Starts collecting stage timings in the current context. Returns a token
+    for finish_timing(), or None when timing logs are off.
+    """
+    if not TIMING_LOGS_ENABLED:
+        return None
+    return _stage_timings.set({})
+
+
+def finish_timing(token, **fields):
+    """
+    Stops collecting and writes one JSON log line with the given fields and
+    the stage timings in milliseconds.
+    """
+    if token is None:
+        return
+    timings = _stage_timings.get() or {}
+    _stage_timings.reset(token)
+    fields["stages_ms"] = {name: round(seconds * 1000, 2) for name, seconds in timings.items()}
+    _timing_logger.info(json.dumps(fields, separators=(",", ":"), default=str))
+
+
+@contextmanager
+def timed_job(kind: str):
+    """
+    Times a background job into analysis_job_duration_seconds and, with
+    timing logs on, logs its stages. Yields a dict whose 'status' the caller
+    sets (defaults to 'failed' when the body raises).
+    """
+    outcome = {"status": "failed"}
+    token = start_timing()
+    started = time.perf_counter()
+    try:
+        yield outcome
+    finally:
+        elapsed = time.perf_counter() - started
+        JOB_SECONDS.observe(elapsed, kind=kind, status=outcome["status"])
+        finish_timing(token, job=kind, status=outcome["status"], duration_ms=round(elapsed * 1000, 2))
+
+
+def copy_timing_context():
+    """
+    Context to run work submitted to another thread in, so its stages are
+    added to the current request or job (contextvars do not follow threads).
+    Take one copy per submitted task.
+    """
+    return contextvars.copy_context()
+
+
+def render():
+    return registry.render()
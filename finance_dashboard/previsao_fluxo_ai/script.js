@@ -119,6 +119,36 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     // --- Fetch and Display Transactions ---
+    function appendTransactionRow(transaction) {
+        // Deltas can repeat a transaction already shown (e.g. after a reconnect)
+        if (transactionsTableBody.querySelector(`tr[data-transaction-id="${transaction._id}"]`)) {
+            return;
+        }
+        const emptyRow = transactionsTableBody.querySelector('tr.empty-row');
+        if (emptyRow) {
+            emptyRow.remove();
+        }
+        const row = transactionsTableBody.insertRow();
+        row.dataset.transactionId = transaction._id;
+        row.insertCell().textContent = new Date(transaction.data_pagamento).toLocaleDateString();
+        row.insertCell().textContent = transaction.tipo;
+        row.insertCell().textContent = transaction.descricao;
+        const valorCell = row.insertCell();
+        valorCell.textContent = transaction.valor.toLocaleString() + ' AOA';
+        if (transaction.tipo === 'receita') {
+            valorCell.classList.add('valor-receita');
+        } else if (transaction.tipo === 'despesa') {
+            valorCell.classList.add('valor-despesa');
+        }
+        row.insertCell().textContent = transaction.status;
+        row.insertCell().textContent = transaction._id;
+        row.insertCell().textContent = new Date(transaction.created_at).toLocaleString();
+    }
+
+    function showTableMessage(message) {
+        transactionsTableBody.innerHTML = `<tr class="empty-row"><td colspan="7" style="text-align:center;">${message}</td></tr>`;
+    }
+
     async function fetchTransactions() {
         try {
             const response = await fetch('/api/transactions');
@@ -126,31 +156,40 @@ document.addEventListener('DOMContentLoaded', function() {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
             const transactions = await response.json();
-            transactionsList.innerHTML = ''; 
+            transactionsTableBody.innerHTML = '';
 
             if (transactions.length === 0) {
-                transactionsList.innerHTML = '<li>Nenhuma transação encontrada.</li>';
+                showTableMessage('Nenhuma transação encontrada.');
                 return;
             }
 
-            transactions.forEach(transaction => {
-                const listItem = document.createElement('li');
-                listItem.innerHTML = `
-                    <strong>${transaction.descricao}</strong> (${transaction.tipo}) - ${transaction.valor.toLocaleString()} AOA
-                    <br>
-                    Data: ${new Date(transaction.data_pagamento).toLocaleDateString()} | Status: ${transaction.status}
-                    <br>
-                    <small>ID: ${transaction._id} | Criado em: ${new Date(transaction.created_at).toLocaleString()}</small>
-                `;
-                transactionsList.appendChild(listItem);
-            });
+            transactions.forEach(appendTransactionRow);
 
         } catch (error) {
             console.error('Error fetching transactions:', error);
-            transactionsList.innerHTML = '<li>Erro ao carregar transações.</li>';
+            showTableMessage('Erro ao carregar transações.');
         }
     }
 
+    // --- Live updates: apply pushed deltas instead of re-fetching everything ---
+    let reloadAfterImport = false;
+    LiveUpdates.on('transaction_inserted', appendTransactionRow);
+    LiveUpdates.on('import_progress', data => {
+        if (uploadFileButton.disabled) { // This tab's upload is in progress
+            uploadMessage.textContent = `A importar ${data.filename}: ${data.rows_processed.toLocaleString()} linhas processadas, ${data.rows_imported.toLocaleString()} importadas...`;
+        }
+        (data.transactions || []).forEach(appendTransactionRow);
+        // Chunks too large to push as deltas are reloaded once the import ends
+        reloadAfterImport = reloadAfterImport || data.reload;
+    });
+    LiveUpdates.on('import_completed', () => {
+        if (reloadAfterImport) {
+            reloadAfterImport = false;
+            fetchTransactions();
+        }
+    });
+    LiveUpdates.on('resync', fetchTransactions);
+
     // --- Handle Manual Form Submission ---
     if (transactionForm) {
         transactionForm.addEventListener('submit', async function(event) {
@@ -179,7 +218,9 @@ document.addEventListener('DOMContentLoaded', function() {
                 if (response.ok) {
                     formMessage.textContent = result.message || 'Transação adicionada com sucesso!';
                     transactionForm.reset();
-                    fetchTransactions(); 
+                    if (!LiveUpdates.isConnected()) {
+                        fetchTransactions();
+                    }
                 } else {
                     formError.textContent = result.error || `Erro: ${response.statusText}`;
                 }
@@ -222,12 +263,21 @@ document.addEventListener('DOMContentLoaded', function() {
                     if (result.errors && result.errors.length > 0) {
                         uploadError.innerHTML = "Algumas linhas tiveram erros:<br>" + result.errors.join("<br>");
                     }
-                    fetchTransactions(); // Refresh the list
+                    if (!LiveUpdates.isConnected()) {
+                        fetchTransactions(); // Refresh the list; with live updates the rows were pushed already
+                    }
                 } else {
                     uploadError.textContent = result.error || `Erro no upload: ${response.statusText}`;
                     if (result.errors && result.errors.length > 0) {
                          uploadError.innerHTML += "<br>Detalhes:<br>" + result.errors.join("<br>");
                     }
+                    // The import stopped part-way: the rows written before the failure are kept
+                    if (result.stats && result.stats.rows_imported > 0) {
+                        uploadMessage.textContent = `${result.stats.rows_imported.toLocaleString()} transações importadas antes do erro.`;
+                        if (!LiveUpdates.isConnected()) {
+                            fetchTransactions();
+                        }
+                    }
                 }
             } catch (error) {
                 console.error('Error uploading file:', error);
@@ -251,11 +301,11 @@ document.addEventListener('DOMContentLoaded', function() {
             if (cashFlowChartInstance) cashFlowChartInstance.destroy();
 
             try {
-                const response = await fetch('/api/analyze_cashflow', { method: 'POST' });
-                const analysisResult = await response.json();
+                const jobOutcome = await runAnalysisJob('/api/analyze_cashflow');
+                const analysisResult = jobOutcome.result;
 
-                if (!response.ok) {
-                    throw new Error(analysisResult.error || `HTTP error ${response.status}`);
+                if (!jobOutcome.ok) {
+                    throw new Error(analysisResult.error || `HTTP error ${jobOutcome.status}`);
                 }
                 
                 displayAiAnalysis(analysisResult);
@@ -280,9 +330,27 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    // Shows the last stored forecast until a new analysis is run
+    async function loadLatestForecast() {
+        try {
+            const response = await fetch('/api/latest_forecast');
+            if (!response.ok) {
+                return; // 404 when no forecast was stored yet
+            }
+            const latestForecast = await response.json();
+            displayAiAnalysis(latestForecast);
+            if (latestForecast.chart_data) {
+                renderCashFlowChart(latestForecast.chart_data);
+            }
+        } catch (error) {
+            console.error('Error loading latest forecast:', error);
+        }
+    }
+
     // Initial load
     fetchTransactions();
     renderCashFlowChart(null); 
+    loadLatestForecast();
 
     // Active Nav Link
     const currentPath = window.location.pathname;
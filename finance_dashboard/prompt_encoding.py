@@ -0,0 +1,103 @@
+import io
+import os
+import csv
+import json
+
+# Rough average for prompt text with Gemini's tokenizer
+CHARS_PER_TOKEN = 4
+# Upper bound for the data tables of a single prompt
+PROMPT_TABLE_MAX_TOKENS = int(os.getenv("PROMPT_TABLE_MAX_TOKENS", "12000"))
+
+
+def estimate_tokens(text: str):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def format_amount(value):
+    """
+    Rounds an amount to 2 decimals and drops trailing zeros (1500.0 -> '1500').
+    """
+    if value is None or value == "":
+        return ""
+    try:
+        text = f"{float(value):.2f}"
+    except (TypeError, ValueError):
+        return str(value)
+    return text.rstrip("0").rstrip(".") if "." in text else text
+
+
+def compact_json(data):
+    """
+    JSON without indentation or spaces after separators.
+    """
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def _csv_line(values):
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerow(values)
+    return buffer.getvalue()
+
+
+def encode_table(rows: list, columns: list, amount_columns=(), dictionary_column: str = None,
+                 token_budget: int = None):
+    """
+    Encodes a list of dicts as a CSV table with a header row, which costs far
+    fewer tokens than indented JSON with repeated keys.
+
+    Values of amount_columns are rounded with format_amount(). Values of
+    dictionary_column are replaced by short keys (D1, D2, ...) defined once in
+    a dictionary block above the table. With token_budget, trailing rows that
+    do not fit are dropped and an 'omitted' line says how many.
+    """
+    header = _csv_line(columns)
+    dictionary = {}
+    dictionary_lines = []
+    lines = []
+    used = estimate_tokens(header) + (5 if dictionary_column else 0)
+    for number, row in enumerate(rows):
+        values = []
+        new_entries = []
+        for column in columns:
+            value = row.get(column)
+            if column in amount_columns:
+                value = format_amount(value)
+            elif column == dictionary_column:
+                if value not in dictionary:
+                    dictionary[value] = f"D{len(dictionary) + 1}"
+                    new_entries.append(_csv_line([dictionary[value], value]))
+                value = dictionary[value]
+            values.append("" if value is None else value)
+        line = _csv_line(values)
+        used += estimate_tokens(line) + sum(estimate_tokens(entry) for entry in new_entries)
+        if token_budget is not None and used > token_budget:
+            lines.append(f"({len(rows) - number} more rows omitted)\n")
+            break
+        dictionary_lines.extend(new_entries)
+        lines.append(line)
+
+    dictionary_block = ""
+    if dictionary_column:
+        dictionary_block = f"{dictionary_column} dictionary:\n" + "".join(dictionary_lines)
+    return dictionary_block + header + "".join(lines)
+
+
+def row_tokens(row: dict, columns: list):
+    """
+    Estimated cost of one row in encode_table(), used to split data into chunks.
+    """
+    return estimate_tokens(_csv_line([row.get(column, "") for column in columns]))
+
+
+TRANSACTION_COLUMNS = ["id", "date", "type", "description", "amount"]
+
+
+def encode_transactions(formatted_transactions: list, token_budget: int = None):
+    """
+    Encodes prompt-formatted transactions (id, date, type, description,
+    amount) with a description dictionary.
+    """
+    return encode_table(
+        formatted_transactions, TRANSACTION_COLUMNS,
+        amount_columns=("amount",), dictionary_column="description", token_budget=token_budget
+    )
@@ -0,0 +1,128 @@
+"""
+Builds the prompts of the LLM-backed analyses. The data tables are encoded
+with prompt_encoding. The builders take their data as arguments, so they can
+be benchmarked without a database (see benchmark_prompts.py).
+"""
+from datetime import datetime
+
+from prompt_encoding import PROMPT_TABLE_MAX_TOKENS, compact_json, encode_table, encode_transactions
+
+MONTHLY_TOTALS_COLUMNS = ["month", "income_AOA", "expenses_AOA", "transactions"]
+CREDIT_HIGHLIGHTS_COLUMNS = ["date", "type", "description", "amount"]
+FRAUD_PROFILE_COLUMNS = ["type", "description", "count", "mean_amount", "std_amount", "min_amount", "max_amount", "previously_flagged"]
+FRAUD_PROFILE_AMOUNT_COLUMNS = ("mean_amount", "std_amount", "min_amount", "max_amount")
+
+
+def build_cashflow_prompt(monthly_totals: list, analysis: dict):
+    """
+    Builds the prompt asking for improvement tips on a locally computed
+    forecast (see forecasting.forecast_cashflow).
+    """
+    return f"""
+You are a financial advisor in Angola. The current date is {datetime.now().strftime('%Y-%m-%d')}.
+Monthly totals (AOA, CSV):
+{encode_table(monthly_totals[-12:], MONTHLY_TOTALS_COLUMNS, amount_columns=("income_AOA", "expenses_AOA"))}
+Statistical forecast (already computed, do not change these numbers):
+{compact_json({"cash_flow_forecast": analysis["cash_flow_forecast"], "evaluation_percentages": analysis["evaluation_percentages"]})}
+
+Based on this data, give 3 to 5 short, actionable tips to improve this cash flow.
+Return JSON only, with the following structure:
+{{
+    "improvement_tips": [
+        "<actionable tip 1>",
+        "<actionable tip 2>"
+    ]
+}}
+"""
+
+
+def format_fraud_history_profile(profile_groups: list):
+    """
+    Turns get_fraud_history_profile() groups into compact prompt rows.
+    """
+    return [
+        {
+            "type": group["_id"].get("tipo"),
+            "description": group["_id"].get("descricao"),
+            "count": group["count"],
+            "mean_amount": round(group["mean"] or 0, 2),
+            "std_amount": round(group["std"] or 0, 2),
+            "min_amount": group["min"],
+            "max_amount": group["max"],
+            "previously_flagged": group["suspicious"]
+        }
+        for group in profile_groups
+    ]
+
+
+def build_fraud_prompt(formatted_transactions: list, history_profile: list = None):
+    """
+    Builds the fraud detection prompt for one chunk of transactions,
+    optionally with a statistical profile of previously scanned history.
+    """
+    history_section = ""
+    if history_profile:
+        history_section = f"""
+For context, this is a statistical profile of previously analyzed transactions (grouped by type and description, amounts in AOA, CSV).
+Use it as the baseline of normal behaviour; do not report on it:
+{encode_table(history_profile, FRAUD_PROFILE_COLUMNS, amount_columns=FRAUD_PROFILE_AMOUNT_COLUMNS, token_budget=PROMPT_TABLE_MAX_TOKENS // 4)}"""
+    return f"""
+Analyze the following financial transactions from Angola for potential fraudulent activity. 
+For each transaction identified as suspicious, provide a reason, a risk score (0-1), and a recommended action.
+{history_section}
+Data (CSV with a header row; amounts in AOA; the description column holds keys of the description dictionary):
+{encode_transactions(formatted_transactions, token_budget=PROMPT_TABLE_MAX_TOKENS)}
+Please return the analysis in JSON format:
+{{
+    "fraud_report": [
+        {{
+            "transaction_id": "<original_transaction_id>",
+            "is_suspicious": <true_or_false>,
+            "reason": "<explanation_if_suspicious>",
+            "risk_score": <0.0_to_1.0_if_suspicious_else_0.0>,
+            "recommended_action": "<e.g., Review manually, Block account, No action needed>"
+        }}
+        // Include entries for ALL transactions scanned, marking non-suspicious ones appropriately.
+    ],
+    "summary": {{
+        "total_transactions_scanned": <count>,
+        "suspicious_transactions_found": <count>,
+        "overall_risk_level": "<Low/Medium/High based on findings>"
+    }},
+    "currency": "AOA"
+}}
+Ensure all monetary values are in AOA.
+The transaction_id in the report must match the id column of the input.
+"""
+
+
+def build_credit_prompt(financial_summary: dict, transaction_highlights: list):
+    """
+    Builds the credit analysis prompt from the 6-month financial summary and
+    the most recent transactions.
+    """
+    return f"""
+Perform an automatic credit analysis based on the following financial data for an entity in Angola.
+Provide a credit score (e.g., a category like Poor, Fair, Good, Excellent, and a 1-10 rating), a recommended credit limit in AOA, and key factors influencing the decision.
+
+Financial Summary (last 6 months):
+{compact_json(financial_summary)}
+
+Transaction History Highlights (last 6 months, up to 5 transactions, amounts in AOA, CSV):
+{encode_table(transaction_highlights, CREDIT_HIGHLIGHTS_COLUMNS, amount_columns=("amount",))}
+Please return the analysis in JSON format:
+{{
+    "credit_analysis_report": {{
+        "credit_score": "<e.g., Good (7/10)>",
+        "recommended_credit_limit_AOA": <value_float_or_int>,
+        "key_positive_factors": ["<factor 1>", "<factor 2>"],
+        "key_negative_factors": ["<factor 1>"],
+        "assessment_summary": "<textual summary of the creditworthiness and financial stability>",
+        "confidence_level": "<High/Medium/Low>"
+    }},
+    "currency": "AOA"
+}}
+Ensure all monetary values are in AOA. Base your assessment on typical Angolan business context if possible.
+Focus on financial stability, income consistency, expense management, and cash flow patterns.
+The recommended_credit_limit_AOA should be a numerical value.
+"""
@@ -0,0 +1,171 @@
+import re
+import json
+
+_decoder = json.JSONDecoder()
+# What may follow an array key before its '[' has arrived
+_PENDING_KEY_SUFFIX = re.compile(r"\s*(?::\s*)?")
+
+# Marker for JSON numbers (int or float, but not bool) in schemas
+NUMBER = "number"
+
+
+class SchemaError(ValueError):
+    pass
+
+
+def extract_json(text: str):
+    """
+    Parses the first JSON object or array in a model response, ignoring any
+    preamble, trailing text or ```json fences around it.
+    """
+    starts = [position for position in (text.find("{"), text.find("[")) if position != -1]
+    if not starts:
+        raise ValueError("No JSON object found in the model response")
+    start = min(starts)
+    while True:
+        try:
+            value, _ = _decoder.raw_decode(text, start)
+            return value
+        except json.JSONDecodeError:
+            # A stray brace in the preamble: try the next candidate
+            next_starts = [p for p in (text.find("{", start + 1), text.find("[", start + 1)) if p != -1]
+            if not next_starts:
+                raise
+            start = min(next_starts)
+
+
+def validate(data, schema, path: str = "$"):
+    """
+    Checks data against a minimal schema and returns it. A schema is a type
+    (str, bool, NUMBER, list, dict), a dict of required keys to schemas, or
+    a one-element list with the schema of every item. Extra keys are allowed.
+    Raises SchemaError naming the first offending path.
+    """
+    if isinstance(schema, dict):
+        if not isinstance(data, dict):
+            raise SchemaError(f"{path}: expected an object")
+        for key, value_schema in schema.items():
+            if key not in data:
+                raise SchemaError(f"{path}.{key}: missing")
+            validate(data[key], value_schema, f"{path}.{key}")
+    elif isinstance(schema, list):
+        if not isinstance(data, list):
+            raise SchemaError(f"{path}: expected an array")
+        for index, item in enumerate(data):
+            validate(item, schema[0], f"{path}[{index}]")
+    elif schema == NUMBER:
+        if isinstance(data, bool) or not isinstance(data, (int, float)):
+            raise SchemaError(f"{path}: expected a number")
+    elif not isinstance(data, schema) or (schema is int and isinstance(data, bool)):
+        raise SchemaError(f"{path}: expected {schema.__name__}")
+    return data
+
+
+def is_valid(data, schema):
+    try:
+        validate(data, schema)
+        return True
+    except SchemaError:
+        return False
+
+
+class StreamingJSONParser:
+    """
+    Incremental parser for a streamed JSON response.
+
+    feed() accepts text chunks as they arrive and returns the objects in the
+    array under item_key (e.g. 'fraud_report') that were completed by the
+    chunk, so callers can act on them before the response ends. Items that
+    are not valid JSON are skipped; the complete response in text is still
+    parsed with extract_json. Each character is scanned once.
+    """
+
+    def __init__(self, item_key: str = None):
+        self.item_key = item_key
+        self._key_pattern = re.compile(r'"%s"\s*:\s*\[' % re.escape(item_key)) if item_key is not None else None
+        self._buffer = ""
+        self._position = 0
+        self._search_from = 0 # where the next search for item_key's array starts
+        self._array_start = None # index after the '[' of item_key's array
+        self._array_done = False
+        self._depth = 0 # nesting depth inside the array
+        self._in_string = False
+        self._escaped = False
+        self._item_start = None
+
+    def feed(self, chunk: str):
+        self._buffer += chunk
+        if self.item_key is None or self._array_done:
+            return []
+        if self._array_start is None and not self._find_array():
+            return []
+
+        items = []
+        buffer = self._buffer
+        for position in range(self._position, len(buffer)):
+            char = buffer[position]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                if self._depth == 0:
+                    self._item_start = position
+                self._depth += 1
+            elif char in "}]":
+                if self._depth == 0: # end of the array
+                    self._array_done = True
+                    self._position = position + 1
+                    return items
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        items.append(json.loads(buffer[self._item_start:position + 1]))
+                    except json.JSONDecodeError:
+                        pass # left to the parse of the whole response
+                    self._item_start = None
+        self._position = len(buffer)
+        return items
+
+    def _find_array(self):
+        # Only an object key followed by an array counts, not the name quoted in a preamble
+        match = self._key_pattern.search(self._buffer, self._search_from)
+        if match is None:
+            # A match still to be completed can only start at the last occurrence of the key,
+            # and only if nothing but whitespace and the colon follows it so far
+            quoted_key = f'"{self.item_key}"'
+            last_key = self._buffer.rfind(quoted_key, self._search_from)
+            if last_key != -1 and _PENDING_KEY_SUFFIX.fullmatch(self._buffer, last_key + len(quoted_key)):
+                self._search_from = last_key
+            else:
+                self._search_from = max(self._search_from, len(self._buffer) - len(quoted_key) + 1)
+            return False
+        self._array_start = self._position = match.end()
+        return True
+
+    @property
+    def text(self):
+        return self._buffer
+
+
+# Per-endpoint response schemas
+FRAUD_ITEM_SCHEMA = {"transaction_id": str, "is_suspicious": bool, "risk_score": NUMBER}
+# Fraud items are validated one by one so a single malformed item does not discard the whole chunk
+FRAUD_RESPONSE_SCHEMA = {"fraud_report": list}
+CREDIT_RESPONSE_SCHEMA = {
+    "credit_analysis_report": {
+        "credit_score": str,
+        "recommended_credit_limit_AOA": NUMBER,
+        "key_positive_factors": [str],
+        "key_negative_factors": [str],
+        "assessment_summary": str,
+        "confidence_level": str
+    }
+}
+CASHFLOW_TIPS_SCHEMA = {"improvement_tips": [str]}
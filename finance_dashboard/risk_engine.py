@@ -0,0 +1,221 @@
+import json
+import hashlib
+import numpy as np
+from datetime import datetime
+
+from forecasting import monthly_series
+
+# Bump when the rules change so cached reports are recomputed
+RISK_ENGINE_VERSION = 1
+# Months used for the recent averages and for the volatility measures
+RECENT_MONTHS = 3
+VOLATILITY_MONTHS = 6
+UPCOMING_HORIZON_DAYS = 30
+
+IMPACT_WEIGHTS = {"Low": 1, "Medium": 2, "High": 3}
+
+
+def risk_data_hash(monthly_totals: list, aggregates: dict, today: datetime):
+    """
+    Content hash of everything a risk report is computed from. Reports are
+    recomputed when it changes (new data, edits, or a new day for the
+    overdue/upcoming windows).
+    """
+    payload = json.dumps(
+        {"version": RISK_ENGINE_VERSION, "date": today.strftime("%Y-%m-%d"),
+         "monthly_totals": monthly_totals, "aggregates": aggregates},
+        sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _open_total(open_items: list, tipo: str, bucket: str):
+    return float(sum(item["total"] for item in open_items if item["tipo"] == tipo and item["bucket"] == bucket))
+
+
+def _level(value, medium_threshold, high_threshold, higher_is_worse: bool = True):
+    if value is None:
+        return None
+    if not higher_is_worse:
+        value, medium_threshold, high_threshold = -value, -medium_threshold, -high_threshold
+    if value >= high_threshold:
+        return "High"
+    if value >= medium_threshold:
+        return "Medium"
+    return "Low"
+
+
+def compute_indicators(monthly_totals: list, aggregates: dict, today: datetime):
+    """
+    Computes the key risk indicators from monthly totals and the
+    database.get_risk_aggregates() result, with vectorized math over the months.
+    """
+    current_month = today.strftime("%Y-%m")
+    months, income, expenses = monthly_series(monthly_totals, current_month)
+    current = next((entry for entry in monthly_totals if entry["month"] == current_month), {})
+    net = income - expenses
+    open_items = aggregates["open_items"]
+
+    overdue_receivables = _open_total(open_items, "receita", "overdue")
+    overdue_payables = _open_total(open_items, "despesa", "overdue")
+    upcoming_payments = _open_total(open_items, "despesa", "upcoming")
+    upcoming_receipts = _open_total(open_items, "receita", "upcoming")
+
+    # Monthly totals include 'pendente'/'agendado' transactions, which have not moved cash yet
+    recorded_net = sum(entry["income_AOA"] - entry["expenses_AOA"] for entry in monthly_totals)
+    open_income = sum(item["total"] for item in open_items if item["tipo"] == "receita")
+    open_expenses = sum(item["total"] for item in open_items if item["tipo"] == "despesa")
+    cash_balance = float(recorded_net - open_income + open_expenses)
+
+    recent_expenses = expenses[-RECENT_MONTHS:]
+    average_monthly_expenses = float(recent_expenses.mean()) if len(recent_expenses) else float(current.get("expenses_AOA", 0))
+    average_monthly_income = float(income[-RECENT_MONTHS:].mean()) if len(income) else float(current.get("income_AOA", 0))
+    days_of_cash = None
+    if average_monthly_expenses > 0:
+        days_of_cash = round(max(cash_balance, 0.0) / (average_monthly_expenses / 30), 1)
+
+    recent_net = net[-RECENT_MONTHS:]
+    net_volatility = float(recent_net.std()) if len(recent_net) > 1 else 0.0
+    volatility_window = expenses[-VOLATILITY_MONTHS:]
+    expense_cv = None
+    if len(volatility_window) > 1 and volatility_window.mean() > 0:
+        expense_cv = float(volatility_window.std() / volatility_window.mean())
+
+    income_sources = [source for source in aggregates["sources"] if source["tipo"] == "receita" and source["total"] > 0]
+    source_totals = np.array([source["total"] for source in income_sources], dtype="float64")
+    top_share = None
+    concentration_description = "No income in the last 6 months."
+    if source_totals.size:
+        shares = source_totals / source_totals.sum()
+        top = int(np.argmax(shares))
+        top_share = round(float(shares[top]) * 100, 1)
+        hhi = round(float((shares ** 2).sum()) * 10000)
+        concentration_description = (
+            f"Largest source: {income_sources[top]['descricao']} ({top_share}% of income over "
+            f"{source_totals.size} sources, HHI {hhi})."
+        )
+
+    return {
+        "cash_flow_volatility_last_3m_std_dev_AOA": round(net_volatility, 2),
+        "average_monthly_expenses_AOA": round(average_monthly_expenses, 2),
+        "average_monthly_income_AOA": round(average_monthly_income, 2),
+        "average_monthly_net_flow_last_3m_AOA": round(float(recent_net.mean()), 2) if len(recent_net) else 0.0,
+        "expense_volatility_coefficient": round(expense_cv, 3) if expense_cv is not None else None,
+        "days_of_cash_on_hand": days_of_cash,
+        "income_source_concentration_percentage": top_share if top_share is not None else 0,
+        "income_source_concentration_description": concentration_description,
+        "upcoming_large_payments_next_30d_AOA": round(upcoming_payments, 2),
+        "upcoming_receipts_next_30d_AOA": round(upcoming_receipts, 2),
+        "overdue_receivables_AOA": round(overdue_receivables, 2),
+        "overdue_payables_AOA": round(overdue_payables, 2),
+        "estimated_current_cash_balance_AOA": round(cash_balance, 2),
+        "months_of_history": len(months)
+    }
+
+
+def _risk(name, description, impact, likelihood, mitigation):
+    return {"risk_name": name, "description": description, "potential_impact": impact,
+            "likelihood": likelihood, "suggested_mitigation": mitigation}
+
+
+def identify_risks(kris: dict):
+    """
+    Turns the indicators into risk cards (risk_name, description,
+    potential_impact, likelihood, suggested_mitigation). Indicators within
+    normal ranges produce no card.
+    """
+    risks = []
+
+    runway = _level(kris["days_of_cash_on_hand"], 90, 30, higher_is_worse=False)
+    if runway in ("Medium", "High"):
+        risks.append(_risk(
+            "Liquidity runway",
+            f"Estimated cash covers about {kris['days_of_cash_on_hand']:.0f} days of average expenses "
+            f"({kris['average_monthly_expenses_AOA']:,.2f} AOA per month).",
+            runway, "High" if runway == "High" else "Medium",
+            "Build a cash reserve of at least three months of expenses and defer non-essential spending."
+        ))
+
+    if kris["estimated_current_cash_balance_AOA"] < kris["upcoming_large_payments_next_30d_AOA"]:
+        risks.append(_risk(
+            "Upcoming payments exceed cash",
+            f"Pending and scheduled payments of {kris['upcoming_large_payments_next_30d_AOA']:,.2f} AOA in the next "
+            f"{UPCOMING_HORIZON_DAYS} days exceed the estimated balance of {kris['estimated_current_cash_balance_AOA']:,.2f} AOA.",
+            "High", "High",
+            "Renegotiate due dates, collect receivables early or arrange a short-term credit line."
+        ))
+
+    concentration = _level(kris["income_source_concentration_percentage"], 50, 70)
+    if concentration in ("Medium", "High"):
+        risks.append(_risk(
+            "Income concentration",
+            kris["income_source_concentration_description"],
+            concentration, "Medium",
+            "Diversify income sources so that no single source exceeds half of the income."
+        ))
+
+    volatility = _level(kris["expense_volatility_coefficient"], 0.3, 0.6)
+    if volatility in ("Medium", "High"):
+        risks.append(_risk(
+            "Expense volatility",
+            f"Monthly expenses vary by {kris['expense_volatility_coefficient'] * 100:.0f}% (coefficient of variation, last 6 months).",
+            volatility, "Medium",
+            "Budget irregular expenses ahead and spread large purchases over several months."
+        ))
+
+    for key, name, reference_key, mitigation in (
+        ("overdue_receivables_AOA", "Overdue receivables", "average_monthly_income_AOA",
+         "Follow up on pending receipts and review the payment terms offered to customers."),
+        ("overdue_payables_AOA", "Overdue payables", "average_monthly_expenses_AOA",
+         "Settle overdue payments to avoid penalties and protect supplier relationships."),
+    ):
+        if kris[key] <= 0:
+            continue
+        reference = kris[reference_key]
+        share = kris[key] / reference if reference > 0 else 1.0
+        risks.append(_risk(
+            name,
+            f"{kris[key]:,.2f} AOA of pending/scheduled transactions are past their payment date "
+            f"({share * 100:.0f}% of an average month).",
+            _level(share, 0.2, 0.5), "High",
+            mitigation
+        ))
+
+    if kris["average_monthly_net_flow_last_3m_AOA"] < 0:
+        risks.append(_risk(
+            "Negative cash flow",
+            f"Expenses exceeded income by {-kris['average_monthly_net_flow_last_3m_AOA']:,.2f} AOA per month over the last 3 months.",
+            "High" if kris["days_of_cash_on_hand"] is not None and kris["days_of_cash_on_hand"] < 90 else "Medium", "High",
+            "Review the largest expense categories and align spending with recurring income."
+        ))
+
+    risks.sort(key=lambda risk: IMPACT_WEIGHTS[risk["potential_impact"]], reverse=True)
+    return risks
+
+
+def overall_assessment(risks: list):
+    high = sum(1 for risk in risks if risk["potential_impact"] == "High")
+    if high >= 2:
+        return "High"
+    if high == 1:
+        return "Elevated"
+    if any(risk["potential_impact"] == "Medium" for risk in risks):
+        return "Moderate"
+    return "Low"
+
+
+def build_risk_report(monthly_totals: list, aggregates: dict, today: datetime = None):
+    """
+    Builds the 'risk_analysis_report' of the RiskSense tab.
+    """
+    today = today or datetime.utcnow()
+    kris = compute_indicators(monthly_totals, aggregates, today)
+    risks = identify_risks(kris)
+    return {
+        "overall_risk_assessment": overall_assessment(risks),
+        "key_risk_indicators_summary": kris,
+        "identified_risks": risks,
+        "analysis_timestamp": today.isoformat(),
+        "data_hash": risk_data_hash(monthly_totals, aggregates, today),
+        "engine": f"local_rules_v{RISK_ENGINE_VERSION}"
+    }
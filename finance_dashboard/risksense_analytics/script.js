@@ -55,7 +55,7 @@ document.addEventListener('DOMContentLoaded', function() {
 
             for (const [key, value] of Object.entries(kriMap)) {
                 if (value === undefined && key === "Descrição Concentração de Renda" && kriMap["Concentração de Fontes de Renda (%)"] === 0) continue; // Skip desc if perc is 0
-                if (value === undefined) continue; // Skip if KRI data point is missing
+                if (value === undefined || value === null) continue; // Skip if KRI data point is missing
 
                 const kriItemDiv = document.createElement('div');
                 kriItemDiv.className = 'kri-item';
@@ -180,14 +180,18 @@ document.addEventListener('DOMContentLoaded', function() {
             loadPreviousRiskReportButton.disabled = true;
 
             try {
-                 previousRiskReportDisplayArea.innerHTML = `
-                    <p><strong>Funcionalidade Pendente:</strong></p>
-                    <p>Para carregar o relatório anterior, um novo endpoint GET <code>/api/latest_risk_report</code>
-                    precisa ser implementado no backend (<code>app.py</code>). Esse endpoint chamaria a função 
-                    <code>get_latest_risk_report()</code> de <code>database.py</code> e retornaria o resultado.</p>
-                    <p>O JavaScript seria então atualizado para fazer a chamada e formatar os dados para a função <code>displayRiskReport</code>.</p>
-                `;
-
+                // Served with an ETag, so repeated loads are revalidated by the browser cache (304)
+                const response = await fetch('/api/latest_risk_report');
+                if (response.status === 404) {
+                    previousRiskReportDisplayArea.textContent = "Nenhum relatório de risco anterior encontrado.";
+                    return;
+                }
+                if (!response.ok) {
+                    const errorData = await response.json();
+                    throw new Error(errorData.error || `HTTP Error: ${response.status}`);
+                }
+                displayRiskReport(await response.json());
+                previousRiskReportDisplayArea.textContent = "Relatório de risco anterior carregado na secção principal.";
             } catch (error) {
                 console.error("Error loading previous risk report:", error);
                 previousRiskReportDisplayArea.textContent = `Erro ao carregar relatório: ${error.message}`;
@@ -0,0 +1,79 @@
+import os
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from bson import Decimal128, ObjectId
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError: # the standard json module is used instead
+    orjson = None
+
+# 'auto' uses orjson when it is installed; 'json' forces the standard library
+JSON_BACKEND = os.getenv("JSON_BACKEND", "auto")
+USE_ORJSON = orjson is not None and JSON_BACKEND != "json"
+
+if USE_ORJSON:
+    # Non-string keys are converted like the json module does; naive datetimes stay without offset, as isoformat()
+    ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+    ORJSON_SORTED_OPTIONS = ORJSON_OPTIONS | orjson.OPT_SORT_KEYS
+
+
+def json_default(value):
+    """
+    Encodes the MongoDB/BSON values json cannot: ObjectId as its hex
+    string, datetimes as ISO 8601 and Decimal128/Decimal as numbers.
+    """
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal128):
+        return float(value.to_decimal())
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps_bytes(data, sort_keys: bool = False):
+    """
+    Serializes data (MongoDB documents included, see json_default) to UTF-8
+    JSON bytes, with orjson when available.
+    """
+    if USE_ORJSON:
+        try:
+            return orjson.dumps(data, default=json_default, option=ORJSON_SORTED_OPTIONS if sort_keys else ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            pass # e.g. integers beyond 64 bits, which the json module still encodes
+    return json.dumps(data, default=json_default, sort_keys=sort_keys, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps(data, sort_keys: bool = False):
+    return dumps_bytes(data, sort_keys).decode("utf-8")
+
+
+class MongoJSONProvider(JSONProvider):
+    """
+    Flask JSON provider (app.json) encoding ObjectId, datetime and
+    Decimal128 natively, so documents read from MongoDB can be passed to
+    jsonify as they are. Backed by orjson when it is installed.
+    """
+    sort_keys = True # as Flask's default provider
+    mimetype = "application/json"
+
+    def dumps(self, obj, **kwargs):
+        if kwargs.keys() - {"sort_keys"}:
+            # Options only the json module knows (indent, cls, ...)
+            kwargs.setdefault("default", json_default)
+            return json.dumps(obj, **kwargs)
+        return dumps(obj, kwargs.get("sort_keys", self.sort_keys))
+
+    def loads(self, s, **kwargs):
+        if USE_ORJSON and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj, self.sort_keys), mimetype=self.mimetype)
@@ -75,11 +75,11 @@ document.addEventListener('DOMContentLoaded', function() {
             reportStatusSpan.textContent = "Processando...";
 
             try {
-                const response = await fetch('/api/analyze_credit', { method: 'POST' });
-                const result = await response.json();
+                const jobOutcome = await runAnalysisJob('/api/analyze_credit');
+                const result = jobOutcome.result;
 
-                if (!response.ok) {
-                    const errorMsg = result.error || result.details || `HTTP error ${response.status}`;
+                if (!jobOutcome.ok) {
+                    const errorMsg = result.error || result.details || `HTTP error ${jobOutcome.status}`;
                     throw new Error(errorMsg);
                 }
                 
@@ -99,39 +99,24 @@ document.addEventListener('DOMContentLoaded', function() {
 
     if (loadPreviousReportButton) {
         loadPreviousReportButton.addEventListener('click', async function() {
-            // This part is a bit tricky as the current backend doesn't have a direct endpoint
-            // to GET the latest report for the frontend. The `get_latest_credit_report` is in database.py.
-            // For now, I'll simulate by just displaying a message, or we can add an endpoint.
-            // Let's assume we add a GET /api/latest_credit_report endpoint.
-            
             previousReportDisplayArea.textContent = "A carregar relatório anterior...";
             loadPreviousReportButton.disabled = true;
 
-            // Placeholder: Add a new endpoint GET /api/latest_credit_report in app.py
-            // that calls get_latest_credit_report() from database.py
             try {
-                // const response = await fetch('/api/latest_credit_report'); // Assumed new endpoint
-                // if (!response.ok) {
-                //     const errorData = await response.json();
-                //     throw new Error(errorData.error || `HTTP Error: ${response.status}`);
-                // }
-                // const report = await response.json();
-                // if (report && Object.keys(report).length > 0) {
-                //     // We need to ensure the structure matches what displayCreditReport expects
-                //     // The get_latest_credit_report() returns just the report part.
-                //     displayCreditReport({ credit_analysis_report: report });
-                //     previousReportDisplayArea.textContent = "Relatório anterior carregado na secção principal.";
-                // } else {
-                //     previousReportDisplayArea.textContent = "Nenhum relatório anterior encontrado.";
-                // }
-                previousReportDisplayArea.innerHTML = `
-                    <p><strong>Funcionalidade Pendente:</strong></p>
-                    <p>Para carregar o relatório anterior, um novo endpoint GET <code>/api/latest_credit_report</code>
-                    precisa ser implementado no backend (<code>app.py</code>). Esse endpoint chamaria a função 
-                    <code>get_latest_credit_report()</code> de <code>database.py</code> e retornaria o resultado.</p>
-                    <p>Após a implementação do endpoint, o JavaScript seria atualizado para fazer a chamada e exibir os dados.</p>
-                `;
-
+                // Served with an ETag, so repeated loads are revalidated by the browser cache (304)
+                const response = await fetch('/api/latest_credit_report');
+                if (response.status === 404) {
+                    previousReportDisplayArea.textContent = "Nenhum relatório anterior encontrado.";
+                    return;
+                }
+                if (!response.ok) {
+                    const errorData = await response.json();
+                    throw new Error(errorData.error || `HTTP Error: ${response.status}`);
+                }
+                // get_latest_credit_report() returns just the report part
+                const report = await response.json();
+                displayCreditReport({ credit_analysis_report: report });
+                previousReportDisplayArea.textContent = "Relatório anterior carregado na secção principal.";
             } catch (error) {
                 console.error("Error loading previous report:", error);
                 previousReportDisplayArea.textContent = `Erro ao carregar relatório anterior: ${error.message}`;
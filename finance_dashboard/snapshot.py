@@ -0,0 +1,89 @@
+import threading
+import pandas as pd
+from datetime import datetime
+
+from database import get_transactions_version, iter_transactions
+from metrics import stage
+
+# Fields loaded into the snapshot; _id is always included
+SNAPSHOT_FIELDS = ["tipo", "descricao", "valor", "data_pagamento"]
+SNAPSHOT_BATCH_SIZE = 5000
+
+
+class TransactionSnapshot:
+    """
+    Read-only columnar copy of the 'transactions' collection at one change
+    version (see database.get_transactions_version), for the row-level work
+    of the fraud scan: the local pre-screen scores every transaction and the
+    ambiguous ones become prompt rows. Totals and summaries come from the
+    monthly rollups and MongoDB aggregations instead. Columns: id (str),
+    tipo (categorical), descricao (str), valor (float64) and data_pagamento
+    (datetime64, NaT when missing or invalid).
+    """
+
+    def __init__(self, frame: pd.DataFrame, version: int):
+        self.frame = frame
+        self.version = version
+        self.loaded_at = datetime.utcnow()
+
+    @classmethod
+    def from_documents(cls, documents, version: int):
+        ids, tipos, descricoes, valores, dates = [], [], [], [], []
+        for document in documents:
+            ids.append(str(document["_id"]))
+            tipos.append(document.get("tipo"))
+            descricoes.append(document.get("descricao"))
+            valores.append(document.get("valor"))
+            dates.append(document.get("data_pagamento"))
+        frame = pd.DataFrame({
+            "id": pd.Series(ids, dtype=object),
+            "tipo": pd.Categorical(tipos),
+            "descricao": pd.Series(descricoes, dtype=object).fillna(""),
+            "valor": pd.to_numeric(pd.Series(valores, dtype=object), errors='coerce').astype("float64"),
+            # Legacy documents may hold ISO strings instead of dates
+            "data_pagamento": pd.to_datetime(pd.Series(dates, dtype=object), errors='coerce', utc=True, format='mixed').dt.tz_localize(None),
+        })
+        return cls(frame, version)
+
+    def __len__(self):
+        return len(self.frame)
+
+    def prompt_rows(self, ids: list = None):
+        """
+        Transactions as prompt_encoding.TRANSACTION_COLUMNS rows (all of them
+        when ids is None), in _id order.
+        """
+        frame = self.frame if ids is None else self.frame[self.frame["id"].isin(set(ids))]
+        dates = frame["data_pagamento"].dt.strftime('%Y-%m-%d').fillna("")
+        return [
+            {"id": transaction_id, "date": date, "type": tipo, "description": descricao, "amount": valor}
+            for transaction_id, date, tipo, descricao, valor in zip(
+                frame["id"], dates, frame["tipo"].astype(object), frame["descricao"], frame["valor"].tolist()
+            )
+        ]
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot():
+    """
+    Returns the snapshot of the current transactions, reloading it from
+    MongoDB only when the change counter has moved. Costs one counter lookup
+    when the cached snapshot is current.
+    """
+    global _snapshot
+    # Read the version before the documents: a concurrent write then only makes the snapshot look older
+    version = get_transactions_version()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+    with _snapshot_lock:
+        if _snapshot is not None and _snapshot.version == version:
+            return _snapshot
+        with stage("snapshot_load"):
+            _snapshot = TransactionSnapshot.from_documents(
+                iter_transactions(projection=SNAPSHOT_FIELDS, batch_size=SNAPSHOT_BATCH_SIZE), version
+            )
+        return _snapshot
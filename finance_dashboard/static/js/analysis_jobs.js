@@ -0,0 +1,31 @@
+// Runs a background analysis job (POST url -> 202 with a job id) and waits
+// until it finishes. Completion is announced over /api/events (see
+// live_updates.js), polling is the fallback; the result itself is always
+// read from /api/jobs/<id>.
+// Resolves with { ok, status, result }, like a synchronous endpoint.
+window.runAnalysisJob = (function() {
+    const JOB_POLL_INTERVAL_MS = 1000;
+    const JOB_POLL_INTERVAL_LIVE_MS = 5000;
+
+    return async function runAnalysisJob(url) {
+        LiveUpdates.connect();
+        const submitResponse = await fetch(url, { method: 'POST' });
+        let job = await submitResponse.json();
+        if (submitResponse.status !== 202) {
+            return { ok: submitResponse.ok, status: submitResponse.status, result: job };
+        }
+        while (job.status === 'queued' || job.status === 'running') {
+            const pollInterval = LiveUpdates.isConnected() ? JOB_POLL_INTERVAL_LIVE_MS : JOB_POLL_INTERVAL_MS;
+            // Returns early when the 'analysis_completed' event arrives
+            await LiveUpdates.waitForJob(job.job_id, pollInterval);
+            const pollResponse = await fetch(job.status_url || `/api/jobs/${job.job_id}`);
+            const polledJob = await pollResponse.json();
+            if (!pollResponse.ok) {
+                return { ok: false, status: pollResponse.status, result: polledJob };
+            }
+            job = { ...polledJob, status_url: job.status_url };
+        }
+        const status = job.http_status || 500;
+        return { ok: status >= 200 && status < 300, status: status, result: job.result || { error: job.error } };
+    };
+})();
@@ -0,0 +1,64 @@
+// Shared client for the /api/events Server-Sent Events stream.
+// Tabs register handlers with LiveUpdates.on(eventType, handler) and apply the
+// pushed deltas instead of re-downloading all transactions.
+window.LiveUpdates = (function() {
+    const EVENT_TYPES = [
+        'transaction_inserted', 'import_progress', 'import_completed',
+        'fraud_verdicts', 'analysis_completed', 'resync'
+    ];
+    const handlers = {};
+    const jobWaiters = {};
+    let source = null;
+
+    function dispatch(type, data) {
+        if (type === 'analysis_completed' && jobWaiters[data.job_id]) {
+            jobWaiters[data.job_id](data);
+        }
+        (handlers[type] || []).forEach(handler => {
+            try {
+                handler(data);
+            } catch (error) {
+                console.error(`Error handling '${type}' event:`, error);
+            }
+        });
+    }
+
+    function connect() {
+        if (source || !window.EventSource) {
+            return;
+        }
+        // EventSource reconnects by itself and resumes with Last-Event-ID
+        source = new EventSource('/api/events');
+        EVENT_TYPES.forEach(type => {
+            source.addEventListener(type, event => dispatch(type, JSON.parse(event.data)));
+        });
+    }
+
+    function on(type, handler) {
+        (handlers[type] = handlers[type] || []).push(handler);
+        connect();
+    }
+
+    function isConnected() {
+        return source !== null && source.readyState === EventSource.OPEN;
+    }
+
+    // Resolves with the 'analysis_completed' event of the job (id, kind, status and
+    // http_status, without the result) when it arrives, or with null after timeoutMs.
+    function waitForJob(jobId, timeoutMs) {
+        connect();
+        return new Promise(resolve => {
+            const timer = setTimeout(() => {
+                delete jobWaiters[jobId];
+                resolve(null);
+            }, timeoutMs);
+            jobWaiters[jobId] = job => {
+                clearTimeout(timer);
+                delete jobWaiters[jobId];
+                resolve(job);
+            };
+        });
+    }
+
+    return { on: on, connect: connect, isConnected: isConnected, waitForJob: waitForJob };
+})();
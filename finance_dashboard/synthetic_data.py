@@ -0,0 +1,163 @@
+"""
+Synthetic transactions in the style of a small Angolan business (amounts in
+AOA, Portuguese descriptions), for benchmarks and demos.
+
+    python synthetic_data.py --rows 20000 --months 12 --output transacoes.csv
+"""
+import io
+import argparse
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+# Recurring monthly items: (tipo, descricao, day of month, low, high)
+RECURRING = [
+    ("despesa", "Renda do escritório - Talatona", 5, 450000, 900000),
+    ("despesa", "Salários dos funcionários", 28, 2500000, 6000000),
+    ("despesa", "Segurança Social - INSS", 10, 200000, 500000),
+    ("despesa", "Energia eléctrica - ENDE", 15, 60000, 180000),
+    ("despesa", "Água - EPAL", 15, 20000, 60000),
+    ("despesa", "Internet e telefone - Unitel", 20, 35000, 90000),
+    ("despesa", "Imposto Industrial - AGT", 25, 150000, 650000),
+]
+# Variable items: (tipo, descricao, low, high)
+VARIABLE = {
+    "receita": [
+        ("receita", "Venda de mercadorias", 50000, 2500000),
+        ("receita", "Prestação de serviços", 100000, 1500000),
+        ("receita", "Pagamento de cliente - transferência", 250000, 4000000),
+        ("receita", "Recebimento Multicaixa", 5000, 250000),
+        ("receita", "Juros de depósito a prazo - BAI", 10000, 80000),
+    ],
+    "despesa": [
+        ("despesa", "Fornecedor de mercadorias", 100000, 3000000),
+        ("despesa", "Combustível", 15000, 120000),
+        ("despesa", "Manutenção do gerador", 40000, 350000),
+        ("despesa", "Material de escritório", 5000, 90000),
+        ("despesa", "Transporte e logística", 25000, 400000),
+        ("despesa", "Publicidade", 50000, 600000),
+    ],
+}
+ANOMALY_KINDS = ["spike", "duplicate", "burst"]
+BURST_SIZE = 8
+
+
+def _add_months(year: int, month: int, offset: int):
+    total = year * 12 + month - 1 + offset
+    return total // 12, total % 12 + 1
+
+
+def generate_transactions(rows: int = 5000, months: int = 12, income_share: float = 0.35,
+                          anomaly_rate: float = 0.01, seed: int = 42, end: datetime = None):
+    """
+    Generates about 'rows' transactions over the 'months' months ending with
+    the month of 'end' (today by default): recurring monthly expenses plus
+    variable income/expenses, income_share of the variable rows being
+    'receita'. Returns a tuple (frame, anomalies): a DataFrame with the
+    tipo, descricao, valor, data_pagamento and status columns, and a
+    DataFrame of the injected anomalies (row, kind).
+    """
+    rng = np.random.default_rng(seed)
+    end = end or datetime.utcnow()
+    today = pd.Timestamp(end).normalize()
+    first_year, first_month = _add_months(end.year, end.month, -(months - 1))
+
+    recurring_rows = []
+    for offset in range(months):
+        year, month = _add_months(first_year, first_month, offset)
+        for tipo, descricao, day, low, high in RECURRING:
+            recurring_rows.append((tipo, descricao, pd.Timestamp(year, month, min(day, 28)), rng.uniform(low, high)))
+    recurring = pd.DataFrame(recurring_rows, columns=["tipo", "descricao", "data_pagamento", "valor"])
+
+    variable_count = max(rows - len(recurring), 0)
+    expense_items, income_items = VARIABLE["despesa"], VARIABLE["receita"]
+    items = expense_items + income_items
+    is_income = rng.random(variable_count) < income_share
+    picked = np.where(
+        is_income,
+        len(expense_items) + rng.integers(0, len(income_items), variable_count),
+        rng.integers(0, len(expense_items), variable_count)
+    )
+    low = np.array([item[2] for item in items], dtype="float64")[picked]
+    high = np.array([item[3] for item in items], dtype="float64")[picked]
+    start = pd.Timestamp(first_year, first_month, 1)
+    span_days = max((today - start).days, 1)
+    variable = pd.DataFrame({
+        "tipo": np.array([item[0] for item in items], dtype=object)[picked],
+        "descricao": np.array([item[1] for item in items], dtype=object)[picked],
+        "data_pagamento": start + pd.to_timedelta(rng.integers(0, span_days + 1, variable_count), unit="D"),
+        # Log-uniform amounts: many small payments, few large ones
+        "valor": np.exp(rng.uniform(np.log(low), np.log(high))),
+    })
+
+    frame = pd.concat([recurring, variable], ignore_index=True)
+    frame["valor"] = frame["valor"].round(2)
+
+    anomaly_rows, anomaly_kinds = [], []
+    anomaly_count = int(round(len(frame) * anomaly_rate))
+    variable_rows = np.arange(len(recurring), len(frame))
+    if anomaly_count and len(variable):
+        targets = rng.choice(variable_rows, size=min(anomaly_count, len(variable)), replace=False)
+        duplicates = []
+        for row, kind in zip(targets.tolist(), rng.choice(ANOMALY_KINDS, size=len(targets)).tolist()):
+            if kind == "spike":
+                frame.loc[row, "valor"] = round(frame.loc[row, "valor"] * rng.uniform(15, 40), 2)
+            elif kind == "duplicate":
+                duplicates.append(row)
+            else:
+                # A burst: other payments moved onto the same day as this one
+                burst_rows = rng.choice(variable_rows, size=BURST_SIZE, replace=False)
+                frame.loc[burst_rows, "data_pagamento"] = frame.loc[row, "data_pagamento"]
+                anomaly_rows.extend(burst_rows.tolist())
+                anomaly_kinds.extend([kind] * BURST_SIZE)
+            anomaly_rows.append(row)
+            anomaly_kinds.append(kind)
+        if duplicates:
+            # Same payment recorded twice
+            anomaly_rows.extend(range(len(frame), len(frame) + len(duplicates)))
+            anomaly_kinds.extend(["duplicate"] * len(duplicates))
+            frame = pd.concat([frame, frame.loc[duplicates]], ignore_index=True)
+
+    # Past payments are mostly settled; future ones are scheduled
+    frame["status"] = np.where(rng.random(len(frame)) < 0.92, "pago", "pendente")
+    frame.loc[frame["data_pagamento"] > today, "status"] = "agendado"
+    frame = frame.sort_values("data_pagamento", kind="stable")
+    anomalies = pd.DataFrame({"row": anomaly_rows, "kind": anomaly_kinds}).drop_duplicates("row")
+    anomalies["row"] = frame.index.get_indexer(anomalies["row"])
+    frame = frame.reset_index(drop=True)[["tipo", "descricao", "valor", "data_pagamento", "status"]]
+    return frame, anomalies.sort_values("row", ignore_index=True)
+
+
+def to_upload_file(frame: pd.DataFrame, file_format: str = "csv"):
+    """
+    Encodes transactions as an upload for /api/upload_transactions.
+    Returns (bytes, filename).
+    """
+    upload = frame.rename(columns={"data_pagamento": "Data de Pagamento"})
+    upload["Data de Pagamento"] = upload["Data de Pagamento"].dt.strftime("%Y-%m-%d")
+    if file_format == "xlsx":
+        buffer = io.BytesIO()
+        upload.to_excel(buffer, index=False)
+        return buffer.getvalue(), "transacoes.xlsx"
+    return upload.to_csv(index=False).encode("utf-8"), "transacoes.csv"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--income-share", type=float, default=0.35)
+    parser.add_argument("--anomaly-rate", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="transacoes.csv", help="Output .csv or .xlsx file")
+    args = parser.parse_args()
+
+    frame, anomalies = generate_transactions(args.rows, args.months, args.income_share, args.anomaly_rate, args.seed)
+    data, _ = to_upload_file(frame, "xlsx" if args.output.endswith(".xlsx") else "csv")
+    with open(args.output, "wb") as output:
+        output.write(data)
+    print(f"Wrote {len(frame)} transactions ({len(anomalies)} anomalous rows) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
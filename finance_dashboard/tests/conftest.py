@@ -0,0 +1,103 @@
+import os
+import sys
+import time
+import uuid
+
+import pytest
+
+# The app modules are imported flat (e.g. 'import database'), as app.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Tests never call Gemini, even when a .env file provides GEMINI_API_KEY
+os.environ["LLM_PROVIDER"] = "fake"
+
+import database
+import snapshot
+
+# Query plan tests need a real server (mongomock has no explain), e.g. mongodb://localhost:27017
+MONGO_TEST_URI = os.getenv("MONGO_TEST_URI")
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    Replaces time.monotonic with a clock the test moves by hand (clock.now += seconds).
+    """
+    clock = _Clock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def mock_db(monkeypatch):
+    """
+    Points database.py at an empty in-memory mongomock database.
+    """
+    mongomock = pytest.importorskip("mongomock")
+    # pymongo >= 4.9 passes 'sort' to bulk update operations, which mongomock 4.x does not accept
+    add_update = mongomock.collection.BulkOperationBuilder.add_update
+
+    def add_update_without_sort(self, *args, sort=None, **kwargs):
+        return add_update(self, *args, **kwargs)
+    monkeypatch.setattr(mongomock.collection.BulkOperationBuilder, "add_update", add_update_without_sort)
+
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(database, "client", client)
+    monkeypatch.setattr(database, "db", client["finance_dashboard_test"])
+    # The latest reports and the snapshot are cached per process; start from an empty database
+    monkeypatch.setattr(database, "_latest_reports", {})
+    monkeypatch.setattr(database, "_latest_reports_versions", {})
+    monkeypatch.setattr(snapshot, "_snapshot", None)
+    return database.db
+
+
+@pytest.fixture(scope="session")
+def mongo_test_client():
+    if not MONGO_TEST_URI:
+        pytest.skip("MONGO_TEST_URI is not set")
+    from pymongo import MongoClient
+    from pymongo.errors import PyMongoError
+
+    client = MongoClient(MONGO_TEST_URI, serverSelectionTimeoutMS=2000)
+    try:
+        client.admin.command("ping")
+    except PyMongoError as e:
+        client.close()
+        pytest.skip(f"MongoDB at MONGO_TEST_URI is not reachable: {e}")
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def server_db(monkeypatch, mongo_test_client):
+    """
+    Points database.py at a throwaway database on MONGO_TEST_URI, with the
+    API indexes created. Skipped when no server is configured.
+    """
+    db_name = f"finance_dashboard_test_{uuid.uuid4().hex[:8]}"
+    monkeypatch.setattr(database, "client", mongo_test_client)
+    monkeypatch.setattr(database, "db", mongo_test_client[db_name])
+    database.ensure_indexes()
+    yield database.db
+    mongo_test_client.drop_database(db_name)
+
+
+@pytest.fixture
+def app_module(mock_db):
+    """
+    The Flask app module, imported once with database.py on mongomock.
+    """
+    import app
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
@@ -0,0 +1,81 @@
+import ast
+from datetime import datetime
+
+import pytest
+
+from database import add_transactions_bulk, get_latest_credit_report
+
+
+@pytest.fixture
+def llm_offline(app_module, monkeypatch):
+    monkeypatch.setattr(type(app_module.llm_client), "available", property(lambda self: False))
+
+
+def _add_history():
+    add_transactions_bulk([
+        {"tipo": tipo, "descricao": descricao, "valor": valor, "data_pagamento": datetime.utcnow(), "status": "pago"}
+        for tipo, descricao, valor in [("receita", "Venda", 1000.0), ("despesa", "Renda", 400.0), ("despesa", "Luz", 100.0)]
+    ])
+
+
+def test_credit_analysis_without_the_model_is_an_error_and_stores_nothing(app_module, llm_offline):
+    _add_history()
+
+    result, status = app_module._run_credit_analysis()
+
+    assert status == 503
+    assert "error" in result and "credit_analysis_report" not in result
+    assert get_latest_credit_report() is None
+
+
+def test_credit_analysis_stores_the_model_report(app_module):
+    _add_history()
+
+    result, status = app_module._run_credit_analysis()
+
+    assert status == 200
+    assert get_latest_credit_report()["credit_score"] == result["credit_analysis_report"]["credit_score"]
+
+
+
+def test_main_block_comes_after_every_route(app_module):
+    # app.run() blocks, so routes defined below the __main__ block are missing when app.py runs as a script
+    with open(app_module.__file__, encoding="utf-8") as source:
+        last_statement = ast.parse(source.read()).body[-1]
+
+    assert isinstance(last_statement, ast.If)
+    assert ast.unparse(last_statement.test) == "__name__ == '__main__'"
+
+
+def _count_calls(monkeypatch, module, names):
+    calls = {name: 0 for name in names}
+    for name in names:
+        function = getattr(module, name)
+
+        def counted(*args, _name=name, _function=function, **kwargs):
+            calls[_name] += 1
+            return _function(*args, **kwargs)
+        monkeypatch.setattr(module, name, counted)
+    return calls
+
+
+def test_analyze_all_reads_the_shared_data_once(app_module, monkeypatch):
+    _add_history()
+    standalone_cashflow, _ = app_module._run_cashflow_analysis()
+    calls = _count_calls(monkeypatch, app_module, [
+        "_monthly_totals", "get_risk_aggregates", "get_period_summary", "get_expense_breakdown", "get_snapshot", "has_transactions",
+    ])
+
+    result, status = app_module._run_all_analyses()
+
+    assert status == 200
+    assert {name: analysis["http_status"] for name, analysis in result["analyses"].items()} == {
+        "cashflow": 200, "fraud": 200, "credit": 200, "risk": 200,
+    }
+    assert calls == {
+        "_monthly_totals": 1, "get_risk_aggregates": 1, "get_period_summary": 1,
+        "get_expense_breakdown": 0, "get_snapshot": 1, "has_transactions": 0,
+    }
+    # The expense breakdown derived from the shared aggregation matches the standalone one
+    assert (result["analyses"]["cashflow"]["result"]["evaluation_percentages"]["key_expense_categories"]
+            == standalone_cashflow["evaluation_percentages"]["key_expense_categories"])
@@ -0,0 +1,71 @@
+from datetime import datetime
+
+from database import (
+    add_transactions_bulk,
+    bulk_update_transactions,
+    get_transaction_by_id,
+    get_transactions_version,
+)
+
+
+def _add(count):
+    add_transactions_bulk([
+        {"tipo": "despesa", "descricao": f"item {n}", "valor": 10.0, "data_pagamento": datetime(2024, 1, 1), "status": "pago"}
+        for n in range(count)
+    ])
+
+
+def _ids(mock_db):
+    return [str(doc["_id"]) for doc in mock_db.transactions.find({}, {"_id": 1}).sort("_id", 1)]
+
+
+def test_counts_matched_modified_and_skipped(mock_db):
+    _add(5)
+    ids = _ids(mock_db)
+
+    result = bulk_update_transactions([
+        (ids[0], {"status": "pendente"}),
+        (ids[1], {"descricao": "item 1", "status": "pago"}), # the values it already has
+        ("not-an-id", {"status": "pendente"}),
+        ("0" * 24, {"status": "pendente"}), # a valid id of no transaction
+        (ids[2], {"descricao": "renamed"}),
+    ], mark_modified=False)
+
+    assert result == {"matched": 3, "modified": 2, "skipped": 1}
+    assert get_transaction_by_id(ids[0])["status"] == "pendente"
+    assert get_transaction_by_id(ids[2])["descricao"] == "renamed"
+
+
+def test_updates_are_applied_across_batches(mock_db):
+    _add(7)
+    ids = _ids(mock_db)
+
+    result = bulk_update_transactions([(i, {"status": "agendado"}) for i in ids], batch_size=3)
+
+    assert result == {"matched": 7, "modified": 7, "skipped": 0}
+    assert mock_db.transactions.count_documents({"status": "agendado"}) == 7
+
+
+def test_mark_modified_stamps_updated_at_and_bumps_the_version(mock_db):
+    _add(2)
+    ids = _ids(mock_db)
+    version = get_transactions_version()
+
+    bulk_update_transactions([(ids[0], {"status": "pendente"})])
+
+    assert isinstance(get_transaction_by_id(ids[0])["updated_at"], datetime)
+    assert "updated_at" not in get_transaction_by_id(ids[1])
+    assert get_transactions_version() != version
+
+
+def test_result_write_back_leaves_the_transaction_unmodified(mock_db):
+    _add(1)
+    [transaction_id] = _ids(mock_db)
+    version = get_transactions_version()
+
+    bulk_update_transactions([(transaction_id, {"ai_analysis_results.fraud_guard": {"is_suspicious": False}})], mark_modified=False)
+
+    transaction = get_transaction_by_id(transaction_id)
+    assert transaction["ai_analysis_results"]["fraud_guard"] == {"is_suspicious": False}
+    assert "updated_at" not in transaction
+    assert get_transactions_version() == version
@@ -0,0 +1,64 @@
+import gzip
+import json
+from datetime import datetime
+
+from database import add_credit_report, add_transactions_bulk
+
+
+def _add(count):
+    add_transactions_bulk([
+        {"tipo": "despesa", "descricao": f"Fornecedor {n}", "valor": float(n), "data_pagamento": datetime(2024, 1, 1), "status": "pago"}
+        for n in range(count)
+    ])
+
+
+def test_large_response_is_gzipped(client):
+    report_id = add_credit_report({"assessment_summary": "estável " * 500})
+
+    response = client.get("/api/latest_credit_report", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert json.loads(gzip.decompress(response.data))["assessment_summary"].startswith("estável")
+    # The compressed body is another representation of the same report
+    assert response.headers["ETag"] == f'W/"{report_id}"'
+
+
+def test_small_response_is_sent_as_is(client):
+    add_credit_report({"assessment_summary": "curto"})
+
+    response = client.get("/api/latest_credit_report", headers={"Accept-Encoding": "gzip"})
+
+    assert "Content-Encoding" not in response.headers
+    assert json.loads(response.data)["assessment_summary"] == "curto"
+
+
+def test_response_is_not_compressed_without_accept_encoding(client):
+    add_credit_report({"assessment_summary": "estável " * 500})
+
+    response = client.get("/api/latest_credit_report")
+
+    assert "Content-Encoding" not in response.headers
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+
+def test_streamed_transactions_are_compressed_as_they_stream(client):
+    _add(50)
+
+    response = client.get("/api/transactions?format=ndjson", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+    lines = gzip.decompress(response.data).decode("utf-8").splitlines()
+    assert len(lines) == 50
+    assert json.loads(lines[0])["descricao"] == "Fornecedor 0"
+
+
+def test_errors_and_event_streams_are_left_alone(client):
+    missing = client.get("/api/latest_credit_report", headers={"Accept-Encoding": "gzip"})
+    assert missing.status_code == 404
+    assert "Content-Encoding" not in missing.headers
+
+    events = client.get("/api/events", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in events.headers
+    events.close()
@@ -0,0 +1,78 @@
+from events import EventBroker, format_sse
+
+
+def _broker(events=0, buffer_size=10):
+    broker = EventBroker(buffer_size=buffer_size)
+    for n in range(1, events + 1):
+        broker.publish("transaction_inserted", {"n": n})
+    return broker
+
+
+def _subscribe(broker, last_seen_id=None):
+    stream = broker.subscribe(last_seen_id, heartbeat_seconds=0.01)
+    assert next(stream) == "retry: 3000\n\n"
+    return stream
+
+
+def test_events_are_serialized_once_as_sse():
+    assert format_sse(3, "resync", "{}") == "id: 3\nevent: resync\ndata: {}\n\n"
+
+
+def test_new_subscriber_only_gets_later_events():
+    broker = _broker(events=3)
+    stream = _subscribe(broker)
+
+    assert next(stream) == ": keep-alive\n\n"
+    broker.publish("import_completed", {"errors": 0})
+    assert next(stream) == format_sse(4, "import_completed", '{"errors": 0}')
+
+
+def test_reconnecting_client_gets_the_events_it_missed_in_one_write():
+    broker = _broker(events=5)
+
+    stream = _subscribe(broker, last_seen_id=3)
+
+    assert next(stream) == format_sse(4, "transaction_inserted", '{"n": 4}') + format_sse(5, "transaction_inserted", '{"n": 5}')
+    assert next(stream) == ": keep-alive\n\n"
+
+
+def test_client_behind_the_buffer_is_told_to_resync():
+    broker = _broker(events=15, buffer_size=10) # events 1-5 are gone
+
+    stream = _subscribe(broker, last_seen_id=2)
+
+    assert next(stream) == format_sse(15, "resync", "{}")
+    broker.publish("transaction_inserted", {"n": 16})
+    # Resumes after the resync position
+    assert next(stream) == format_sse(16, "transaction_inserted", '{"n": 16}')
+
+
+def test_client_that_saw_the_first_buffered_event_does_not_resync():
+    broker = _broker(events=15, buffer_size=10) # events 6-15 are kept
+
+    stream = _subscribe(broker, last_seen_id=5)
+
+    assert next(stream).startswith(format_sse(6, "transaction_inserted", '{"n": 6}'))
+
+
+def test_id_from_before_a_server_restart_resyncs():
+    broker = _broker(events=2)
+
+    stream = _subscribe(broker, last_seen_id=40)
+
+    assert next(stream) == format_sse(2, "resync", "{}")
+    assert next(stream) == ": keep-alive\n\n"
+    assert broker.last_id == 2
+
+
+def test_stream_resumes_from_the_last_event_id_header(client, app_module, monkeypatch):
+    broker = _broker(events=3)
+    monkeypatch.setattr(app_module, "event_broker", broker)
+
+    response = client.get("/api/events", headers={"Last-Event-ID": "2"})
+    chunks = iter(response.response)
+
+    assert response.mimetype == "text/event-stream"
+    assert next(chunks) == b"retry: 3000\n\n"
+    assert next(chunks) == format_sse(3, "transaction_inserted", '{"n": 3}').encode()
+    response.close()
@@ -0,0 +1,85 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from forecasting import (
+    MODELS,
+    backtest,
+    forecast_cashflow,
+    forecast_series,
+    holt,
+    monthly_series,
+    moving_average,
+    seasonal_naive,
+)
+
+LINEAR = np.arange(1, 25, dtype="float64") * 10 + 100
+PATTERN = [100, 120, 90, 80, 130, 150, 110, 100, 95, 105, 140, 200]
+SEASONAL = np.tile(PATTERN, 3).astype("float64") + np.arange(36) * 2
+
+
+def test_moving_average_repeats_the_recent_mean():
+    assert moving_average(np.array([1.0, 2.0, 6.0, 7.0]), 2).tolist() == [5.0, 5.0]
+
+
+def test_seasonal_naive_repeats_the_last_season():
+    assert seasonal_naive(SEASONAL, 3).tolist() == SEASONAL[-12:-9].tolist()
+    # Less than a season of history: the last value
+    assert seasonal_naive(np.array([1.0, 3.0]), 2).tolist() == [3.0, 3.0]
+
+
+def test_holt_extrapolates_a_linear_trend():
+    assert holt(LINEAR, 3) == pytest.approx([350.0, 360.0, 370.0])
+
+
+def test_backtest_scores_exact_models_as_zero_error():
+    assert backtest(LINEAR, MODELS["holt"]) == pytest.approx(0.0)
+    assert backtest(LINEAR, MODELS["moving_average"]) == pytest.approx(20.0)
+    assert backtest(np.array([1.0, 2.0, 3.0]), moving_average) is None
+
+
+def test_forecast_series_picks_the_model_with_the_lowest_backtest_error():
+    scores = {name: backtest(SEASONAL, model) for name, model in MODELS.items()}
+
+    forecast, model_name, mae = forecast_series(SEASONAL, 4)
+
+    assert model_name == "holt_winters" == min(scores, key=scores.get)
+    assert mae == scores["holt_winters"]
+    assert len(forecast) == 4
+    assert forecast_series(LINEAR, 4)[1] == "holt"
+
+
+def test_forecast_series_handles_short_and_negative_series():
+    assert forecast_series(np.array([]), 2)[1] == "none"
+    assert forecast_series(np.array([5.0, 5.0]), 2)[1:] == ("moving_average", None)
+    # Forecasts are clipped at zero
+    assert forecast_series(np.array([40.0, 30.0, 20.0, 10.0, 0.0]), 4)[0].min() >= 0
+
+
+def test_monthly_series_fills_missing_months_and_drops_the_current_one():
+    totals = [
+        {"month": "2024-10", "income_AOA": 100.0, "expenses_AOA": 50.0},
+        {"month": "2024-12", "income_AOA": 300.0, "expenses_AOA": 70.0},
+        {"month": "2025-01", "income_AOA": 999.0, "expenses_AOA": 999.0},
+    ]
+
+    months, income, expenses = monthly_series(totals, "2025-01")
+
+    assert months == ["2024-10", "2024-11", "2024-12"]
+    assert income.tolist() == [100.0, 0.0, 300.0]
+    assert expenses.tolist() == [50.0, 0.0, 70.0]
+
+
+def test_forecast_cashflow_of_a_steady_history_is_stable():
+    totals = [{"month": f"2024-{m:02d}", "income_AOA": 1000.0, "expenses_AOA": 800.0} for m in range(1, 12)]
+
+    result = forecast_cashflow(totals, today=datetime(2024, 12, 15))
+
+    forecast = result["cash_flow_forecast"]
+    assert forecast["next_month_prediction_AOA"] == pytest.approx(200.0)
+    assert forecast["three_month_total_AOA"] == pytest.approx(600.0)
+    assert forecast["trend_description"].startswith("Stable")
+    assert result["chart_data"]["labels"] == ["Novembro 2024", "Dezembro 2024", "Janeiro 2025 (Previsto)"]
+    assert result["forecast_details"]["months_of_history"] == 11
+    assert result["evaluation_percentages"]["income_vs_expense_ratio"] == "125%"
@@ -0,0 +1,134 @@
+import threading
+
+import pytest
+
+from fraud_scan import build_fraud_summary, chunk_transactions, scan_in_chunks
+from prompt_encoding import TRANSACTION_COLUMNS, row_tokens
+
+
+def _transactions(count, description="mercado"):
+    return [
+        {"id": f"{n:024x}", "date": "2024-01-01", "type": "despesa", "description": description, "amount": 10.0 + n}
+        for n in range(count)
+    ]
+
+
+def _item(transaction_id, suspicious=False, risk_score=0.1):
+    return {"transaction_id": transaction_id, "is_suspicious": suspicious, "risk_score": risk_score}
+
+
+def test_chunks_keep_the_order_and_stay_within_the_budget():
+    transactions = _transactions(50)
+    budget = row_tokens(transactions[0], TRANSACTION_COLUMNS) * 7
+
+    chunks = chunk_transactions(transactions, budget)
+
+    assert [t for chunk in chunks for t in chunk] == transactions
+    assert all(sum(row_tokens(t, TRANSACTION_COLUMNS) for t in chunk) <= budget for chunk in chunks)
+    assert len(chunks) == 8
+
+
+def test_a_transaction_larger_than_the_budget_gets_its_own_chunk():
+    transactions = _transactions(3)
+    transactions[1]["description"] = "x" * 400
+
+    chunks = chunk_transactions(transactions, token_budget=20)
+
+    assert [len(chunk) for chunk in chunks] == [1, 1, 1]
+
+
+def _scanner(answers=None, fail_chunks=()):
+    """
+    generate_json stand-in: answers every id of the chunk (as not suspicious
+    unless listed in answers) plus an id from outside the chunk.
+    """
+    lock = threading.Lock()
+    calls = []
+
+    def build_prompt(chunk):
+        return [t["id"] for t in chunk]
+
+    def generate_json(prompt, on_item):
+        with lock:
+            calls.append(prompt)
+        if any(transaction_id in fail_chunks for transaction_id in prompt):
+            raise TimeoutError("model timed out")
+        items = [(answers or {}).get(transaction_id, _item(transaction_id)) for transaction_id in prompt]
+        items.append(_item("f" * 24, suspicious=True, risk_score=1.0)) # not part of this chunk
+        for item in items:
+            on_item(item)
+        return {"fraud_report": items, "summary": {"total_transactions_scanned": 999}}
+    return build_prompt, generate_json, calls
+
+
+def test_chunk_reports_are_merged_and_the_summary_recomputed():
+    transactions = _transactions(30)
+    suspicious_id = transactions[12]["id"]
+    build_prompt, generate_json, calls = _scanner({suspicious_id: _item(suspicious_id, True, 0.9)})
+    streamed = []
+
+    result = scan_in_chunks(transactions, build_prompt, generate_json, token_budget=40, on_item=streamed.append)
+
+    assert len(calls) > 1
+    assert sorted(item["transaction_id"] for item in result["fraud_report"]) == sorted(t["id"] for t in transactions)
+    assert result["summary"] == {
+        "total_transactions_scanned": 30,
+        "suspicious_transactions_found": 1,
+        "overall_risk_level": "High",
+        "chunks_scanned": len(calls),
+    }
+    # Items of other chunks are neither merged nor streamed
+    assert len(streamed) == 30
+    assert "chunk_errors" not in result
+
+
+def test_failed_chunks_are_reported_and_left_out_of_the_totals():
+    transactions = _transactions(30)
+    build_prompt, generate_json, calls = _scanner(fail_chunks={transactions[0]["id"]})
+
+    result = scan_in_chunks(transactions, build_prompt, generate_json, token_budget=40)
+
+    failed = result["chunk_errors"][0]
+    assert failed["chunk"] == 0
+    assert failed["error"] == "model timed out"
+    assert result["summary"]["total_transactions_scanned"] == 30 - failed["transactions"]
+    assert result["summary"]["chunks_scanned"] == len(calls) - 1
+
+
+def test_the_error_is_raised_when_every_chunk_fails():
+    transactions = _transactions(5)
+    build_prompt, generate_json, _ = _scanner(fail_chunks={t["id"] for t in transactions})
+
+    with pytest.raises(TimeoutError):
+        scan_in_chunks(transactions, build_prompt, generate_json, token_budget=20)
+
+
+def test_chunks_run_concurrently_up_to_the_limit():
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+    release = threading.Barrier(2, timeout=5)
+
+    def generate_json(prompt, on_item):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        try:
+            release.wait()
+        except threading.BrokenBarrierError:
+            pass
+        with lock:
+            running -= 1
+        return {"fraud_report": []}
+
+    scan_in_chunks(_transactions(8), lambda chunk: chunk, generate_json, token_budget=20, max_concurrency=2)
+
+    assert peak == 2
+
+
+def test_summary_levels():
+    assert build_fraud_summary([], 0)["overall_risk_level"] == "Low"
+    medium = [_item("a", True, 0.5)] + [_item(str(n)) for n in range(20)]
+    assert build_fraud_summary(medium, 21)["overall_risk_level"] == "Medium"
+    assert build_fraud_summary([_item("a", True, 0.85), _item("b")], 2)["overall_risk_level"] == "High"
@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from fraud_screen import HIGH_RISK_THRESHOLD, prescreen_transactions, score_transactions
+
+
+def _transaction(descricao, valor, day, tipo="despesa"):
+    return {"_id": ObjectId(), "tipo": tipo, "descricao": descricao, "valor": valor, "data_pagamento": day}
+
+
+def _history():
+    start = datetime(2024, 1, 1)
+    # One ordinary transaction per day for a month
+    return [_transaction("mercado", 100.0 + (day % 5), start + timedelta(days=day)) for day in range(30)]
+
+
+def test_exact_duplicate_is_flagged_locally():
+    history = _history()
+    original = history[10]
+    duplicate = _transaction(original["descricao"], original["valor"], original["data_pagamento"])
+    history.append(duplicate)
+
+    verdicts, ambiguous_ids = prescreen_transactions(history, [str(duplicate["_id"])])
+
+    assert ambiguous_ids == []
+    assert len(verdicts) == 1
+    assert verdicts[0]["is_suspicious"] is True
+    assert verdicts[0]["risk_score"] >= HIGH_RISK_THRESHOLD
+    assert "same day" in verdicts[0]["reason"]
+
+
+def test_same_amount_with_another_description_is_not_a_duplicate():
+    history = _history()
+    original = history[10]
+    other = _transaction("farmacia", original["valor"], original["data_pagamento"])
+    history.append(other)
+
+    scores = score_transactions(history).set_index("id")
+
+    assert not scores.loc[str(other["_id"]), "duplicate"]
+    assert not scores.loc[str(original["_id"]), "duplicate"]
+
+
+def test_velocity_spike_is_flagged_locally():
+    history = _history()
+    burst_day = history[20]["data_pagamento"]
+    burst = [_transaction(f"loja {n}", 50.0 + n, burst_day) for n in range(6)]
+    history.extend(burst)
+
+    verdicts, ambiguous_ids = prescreen_transactions(history, [str(t["_id"]) for t in burst])
+
+    assert ambiguous_ids == []
+    assert all(verdict["is_suspicious"] for verdict in verdicts)
+
+
+def test_ordinary_transactions_are_cleared_locally():
+    history = _history()
+
+    verdicts, ambiguous_ids = prescreen_transactions(history)
+
+    assert ambiguous_ids == []
+    assert len(verdicts) == len(history)
+    assert not any(verdict["is_suspicious"] for verdict in verdicts)
+
+
+def test_undated_transactions_are_not_duplicates():
+    history = _history()
+    undated = [_transaction("mercado", 101.0, None), _transaction("mercado", 101.0, None)]
+    history.extend(undated)
+
+    scores = score_transactions(history).set_index("id")
+
+    assert not scores.loc[[str(t["_id"]) for t in undated], "duplicate"].any()
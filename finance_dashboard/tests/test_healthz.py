@@ -0,0 +1,62 @@
+import os
+
+from pymongo import MongoClient
+
+import database
+
+
+def test_healthy_database(client):
+    response = client.get("/healthz")
+    body = response.get_json()
+
+    assert response.status_code == 200
+    assert body["status"] == "ok"
+    assert body["database"]["ok"] is True
+    assert body["database"]["latency_ms"] >= 0
+    assert body["pool"]["pid"] == os.getpid()
+    assert body["pool"]["max_pool_size"] == database.MONGO_MAX_POOL_SIZE
+
+
+def test_unreachable_database_is_a_503_within_the_deadline(client, app_module, monkeypatch):
+    # Nothing listens on port 1; the probe gives up after the healthcheck timeout, not the server selection one
+    unreachable = MongoClient("mongodb://127.0.0.1:1", connect=False, serverSelectionTimeoutMS=30000)
+    monkeypatch.setattr(database, "client", unreachable)
+    monkeypatch.setattr(database, "db", unreachable["finance_dashboard_test"])
+    monkeypatch.setattr(app_module, "ping_database", lambda: database.ping(timeout_ms=200))
+
+    response = client.get("/healthz")
+    body = response.get_json()
+
+    assert response.status_code == 503
+    assert body["status"] == "unavailable"
+    assert body["database"]["ok"] is False
+    assert body["database"]["error"]
+    assert "connections_open" in body["pool"]
+    unreachable.close()
+
+
+def test_pool_stats_follow_connection_events():
+    listener = database.PoolStatsListener()
+
+    listener.connection_created(None)
+    listener.connection_checked_out(None)
+    listener.connection_checked_out(None)
+    listener.connection_checked_in(None)
+    listener.connection_check_out_failed(None)
+
+    assert listener.snapshot() == {
+        "connections_open": 1, "connections_in_use": 1, "connections_created": 1,
+        "checkouts": 2, "checkout_failures": 1, "pool_clears": 0
+    }
+
+
+def test_client_options_leave_out_unset_timeouts(monkeypatch):
+    monkeypatch.setattr(database, "MONGO_WAIT_QUEUE_TIMEOUT_MS", "")
+    monkeypatch.setattr(database, "MONGO_SOCKET_TIMEOUT_MS", "5000")
+    monkeypatch.setattr(database, "MONGO_WRITE_CONCERN", "majority")
+
+    options = database.client_options()
+
+    assert "waitQueueTimeoutMS" not in options
+    assert options["socketTimeoutMS"] == 5000
+    assert options["w"] == "majority"
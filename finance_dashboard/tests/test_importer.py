@@ -0,0 +1,114 @@
+import io
+from datetime import datetime
+
+import pandas as pd
+
+from importer import detect_encoding, iter_csv_frames, normalize_columns, validate_transactions_frame
+
+HEADER = "Tipo,Descricao,Valor,Data de Pagamento,Status\n"
+
+
+def _frame(csv_text):
+    df = pd.read_csv(io.StringIO(csv_text))
+    missing = normalize_columns(df)
+    assert missing == []
+    return df
+
+
+def test_normalize_columns_reports_missing_columns():
+    df = pd.DataFrame(columns=["Tipo", "Data-de Pagamento", "Valor"])
+
+    assert normalize_columns(df) == ["descricao", "status"]
+    assert list(df.columns) == ["tipo", "data_de_pagamento", "valor"]
+
+
+def test_valid_rows_become_typed_documents():
+    df = _frame(HEADER + "Receita, Salário ,1500.5,2024-03-01,PAGO\ndespesa,Renda,300,2024-03-05 10:30,pendente\n")
+
+    documents, row_numbers, errors = validate_transactions_frame(df)
+
+    assert errors == []
+    assert row_numbers == [2, 3]
+    assert documents[0] == {
+        "tipo": "receita", "descricao": "Salário", "valor": 1500.5,
+        "data_pagamento": datetime(2024, 3, 1), "status": "pago"
+    }
+    assert documents[1]["data_pagamento"] == datetime(2024, 3, 5, 10, 30)
+
+
+def test_each_rejected_row_reports_its_first_error():
+    df = _frame(
+        HEADER
+        + "receita,ok,10,2024-01-01,pago\n"
+        + "receita,sem valor,,2024-01-01,pago\n"
+        + "receita,valor errado,abc,2024-01-01,pago\n"
+        + "receita,data errada,10,ontem,pago\n"
+        + "transferencia,tipo errado,10,2024-01-01,pago\n"
+        + "despesa,status errado,10,2024-01-01,cancelado\n"
+        + "despesa,,10,2024-01-01,pago\n"
+        + ",,,,\n"
+    )
+
+    documents, row_numbers, errors = validate_transactions_frame(df)
+
+    assert row_numbers == [2]
+    assert len(documents) == 1
+    assert errors == [
+        "Row 3: 'valor' is missing.",
+        "Row 4: 'valor' (abc) is not a valid number.",
+        "Row 5: 'data_de_pagamento' (ontem) is not a valid date or format.",
+        "Row 6: Invalid 'tipo': transferencia. Must be 'receita' or 'despesa'.",
+        "Row 7: Invalid 'status': cancelado. Must be 'pago', 'pendente', or 'agendado'.",
+        "Row 8: 'descricao' is missing.",
+        "Row 9: 'valor' is missing.",
+    ]
+
+
+def test_row_numbers_follow_the_frame_index():
+    df = _frame(HEADER + "receita,a,1,2024-01-01,pago\nreceita,b,x,2024-01-01,pago\n")
+    df.index = df.index + 5000 # a later chunk of the file
+
+    _, row_numbers, errors = validate_transactions_frame(df)
+
+    assert row_numbers == [5002]
+    assert errors == ["Row 5003: 'valor' (x) is not a valid number."]
+
+
+def test_detect_encoding():
+    assert detect_encoding(io.BytesIO("a,b\nsalário,1\n".encode("utf-8"))) == "utf-8"
+    assert detect_encoding(io.BytesIO("a,b\nsalário,1\n".encode("utf-8-sig"))) == "utf-8-sig"
+    assert detect_encoding(io.BytesIO("a,b\nsalário,1\n".encode("latin1"))) == "latin1"
+
+
+def test_csv_that_stops_being_utf8_is_read_again_as_latin1():
+    # The UTF-8 part is longer than the sniffed prefix (so detect_encoding says utf-8)
+    # and than pandas' read buffer (so chunks are yielded before the latin1 bytes)
+    utf8_rows = "".join(f"receita,salário {n},10,2024-01-01,pago\n" for n in range(20000))
+    latin1_rows = "".join(f"despesa,café {n},5,2024-02-01,pago\n" for n in range(10))
+    data = (HEADER + utf8_rows).encode("utf-8") + latin1_rows.encode("latin1")
+
+    frames = list(iter_csv_frames(io.BytesIO(data), chunk_size=1000))
+    rows = pd.concat(frames)
+
+    assert len(rows) == 20010
+    assert list(rows.index) == list(range(20010))
+    assert rows["Descricao"].iloc[0] == "salário 0"
+    assert rows["Descricao"].iloc[-1] == "café 9"
+
+
+def test_latin1_fallback_resumes_after_records_with_quoted_newlines():
+    # Multi-line descriptions make records and physical lines diverge before the latin1 bytes
+    utf8_rows = "".join(f'receita,"salário\nlinha {n}",10,2024-01-01,pago\n' for n in range(20000))
+    latin1_rows = "".join(f"despesa,café {n},5,2024-02-01,pago\n" for n in range(10))
+    data = (HEADER + utf8_rows).encode("utf-8") + latin1_rows.encode("latin1")
+
+    frames = list(iter_csv_frames(io.BytesIO(data), chunk_size=1000))
+    rows = pd.concat(frames)
+
+    assert len(frames) > 1
+    assert len(rows) == 20010
+    assert list(rows.index) == list(range(20010))
+    assert rows["Descricao"].iloc[0] == "salário\nlinha 0"
+    # No record is read twice or skipped
+    assert rows["Descricao"].str.extract(r"(\d+)$")[0].astype(int).tolist() == list(range(20000)) + list(range(10))
+    assert rows["Descricao"].iloc[-1] == "café 9"
@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+
+from database import (
+    add_transactions_bulk,
+    bulk_update_transactions,
+    get_fraud_history_profile,
+    get_transactions_pending_fraud_scan,
+    update_transaction,
+)
+
+
+def _add(count):
+    add_transactions_bulk([
+        {"tipo": "despesa", "descricao": "mercado", "valor": 10.0 * (n + 1), "data_pagamento": datetime(2024, 1, n + 1), "status": "pago"}
+        for n in range(count)
+    ])
+
+
+def _pending_ids():
+    return {str(doc["_id"]) for doc in get_transactions_pending_fraud_scan()}
+
+
+def _write_back(ids, suspicious=False):
+    # As the fraud scan does: results are stored without marking the transactions modified.
+    # BSON dates keep milliseconds, so the scan is dated clearly before any later edit
+    scanned_at = datetime.utcnow() - timedelta(seconds=1)
+    bulk_update_transactions(
+        [(i, {"ai_analysis_results.fraud_guard": {"is_suspicious": suspicious, "scanned_at": scanned_at}}) for i in ids],
+        mark_modified=False
+    )
+
+
+def test_new_transactions_are_pending(mock_db):
+    _add(3)
+
+    assert len(_pending_ids()) == 3
+    assert all(set(doc) == {"_id"} for doc in get_transactions_pending_fraud_scan())
+
+
+def test_scanned_transactions_are_not_pending_until_modified(mock_db):
+    _add(3)
+    ids = sorted(_pending_ids())
+    _write_back(ids)
+    assert _pending_ids() == set()
+
+    update_transaction(ids[1], {"descricao": "mercado central"})
+
+    assert _pending_ids() == {ids[1]}
+
+
+def test_history_profile_summarizes_scanned_transactions(mock_db):
+    _add(4)
+    ids = sorted(_pending_ids())
+    _write_back(ids[:3])
+    _write_back(ids[3:], suspicious=True)
+
+    profile = get_fraud_history_profile(exclude_ids=[ids[0]])
+
+    assert len(profile) == 1
+    group = profile[0]
+    assert group["_id"] == {"tipo": "despesa", "descricao": "mercado"}
+    assert group["count"] == 3
+    assert group["suspicious"] == 1
+    assert group["min"] == 20.0 and group["max"] == 40.0
+    assert round(group["std"], 4) == round((200 / 3) ** 0.5, 4)
@@ -0,0 +1,112 @@
+import threading
+
+import pytest
+
+from jobs import JOB_COMPLETED, JOB_FAILED, JobManager, current_job
+
+
+class _Finished:
+    """
+    on_finished callback recording the finished jobs; it runs after the
+    job's key is released, so waiting on it avoids racing the manager.
+    """
+
+    def __init__(self):
+        self.jobs = []
+        self._condition = threading.Condition()
+
+    def __call__(self, job):
+        with self._condition:
+            self.jobs.append(job)
+            self._condition.notify_all()
+
+    def wait(self, job):
+        with self._condition:
+            assert self._condition.wait_for(lambda: job in self.jobs, timeout=5), "job did not finish"
+
+
+@pytest.fixture
+def finished():
+    return _Finished()
+
+
+def test_submitting_an_active_key_returns_the_running_job(finished):
+    release = threading.Event()
+    manager = JobManager(max_workers=2, on_finished=finished)
+
+    def work(value):
+        release.wait(5)
+        return {"value": value}, 200
+
+    first, first_created = manager.submit("cashflow", "cashflow:v1", work, 1)
+    second, second_created = manager.submit("cashflow", "cashflow:v1", work, 2)
+    other, other_created = manager.submit("cashflow", "cashflow:v2", work, 3)
+    release.set()
+    finished.wait(first)
+    finished.wait(other)
+
+    assert first_created and not second_created and other_created
+    assert second is first
+    assert other is not first
+    assert first.result == {"value": 1}
+    assert first.status == JOB_COMPLETED
+    assert first.http_status == 200
+    assert len(finished.jobs) == 2
+
+
+def test_a_finished_key_starts_a_new_job(finished):
+    manager = JobManager(max_workers=1, on_finished=finished)
+    first, _ = manager.submit("risk", "risk", lambda: ({}, 200))
+    finished.wait(first)
+
+    second, created = manager.submit("risk", "risk", lambda: ({}, 200))
+    finished.wait(second)
+
+    assert created
+    assert second.id != first.id
+    assert manager.get(first.id) is first
+
+
+def test_failed_jobs_report_the_error(finished):
+    manager = JobManager(max_workers=1, on_finished=finished)
+
+    def fail():
+        raise RuntimeError("model unavailable")
+
+    job, _ = manager.submit("credit", "credit", fail)
+    finished.wait(job)
+
+    assert job.status == JOB_FAILED
+    assert job.http_status == 500
+    assert job.error == "model unavailable"
+    # The key is free again
+    assert manager.submit("credit", "credit", lambda: ({}, 200))[1]
+
+
+def test_current_job_is_set_inside_the_job(finished):
+    manager = JobManager(max_workers=1, on_finished=finished)
+    job, _ = manager.submit("fraud", "fraud", lambda: ({"job_id": current_job().id}, 200))
+    finished.wait(job)
+
+    assert job.result == {"job_id": job.id}
+    assert current_job() is None
+
+
+def test_analysis_endpoints_answer_json_when_the_database_is_down(client, app_module, monkeypatch):
+    def unavailable():
+        raise ConnectionError("MongoDB unreachable")
+    monkeypatch.setattr(app_module, "get_transactions_version", unavailable)
+
+    response = client.post("/api/analyze_cashflow")
+
+    assert response.status_code == 500
+    assert response.get_json() == {"error": "Could not start the analysis"}
+
+
+def test_analysis_endpoints_return_a_job_to_poll(client):
+    response = client.post("/api/analyze_cashflow")
+    job = response.get_json()
+
+    assert response.status_code == 202
+    assert job["status_url"] == f"/api/jobs/{job['job_id']}"
+    assert client.get(job["status_url"]).status_code == 200
@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from database import add_ai_forecast, add_credit_report, add_risk_report
+
+
+@pytest.mark.parametrize("path", ["/api/latest_forecast", "/api/latest_credit_report", "/api/latest_risk_report"])
+def test_missing_report_is_a_404(client, path):
+    response = client.get(path)
+
+    assert response.status_code == 404
+    assert response.get_json() == {"error": "No report found"}
+
+
+@pytest.mark.parametrize("path, add_report", [
+    ("/api/latest_forecast", add_ai_forecast),
+    ("/api/latest_credit_report", add_credit_report),
+    ("/api/latest_risk_report", add_risk_report),
+])
+def test_report_is_revalidated_with_its_etag(client, path, add_report):
+    report_id = add_report({"summary": "first"})
+
+    response = client.get(path)
+    etag = response.headers["ETag"]
+
+    assert response.status_code == 200
+    assert etag == f'"{report_id}"'
+    assert response.headers["Cache-Control"] == "no-cache"
+    assert json.loads(response.data)["summary"] == "first"
+
+    not_modified = client.get(path, headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.data == b""
+    assert not_modified.headers["ETag"] == etag
+
+
+def test_a_newer_report_changes_the_etag(client):
+    add_credit_report({"summary": "first"})
+    etag = client.get("/api/latest_credit_report").headers["ETag"]
+    add_credit_report({"summary": "second"})
+
+    response = client.get("/api/latest_credit_report", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert json.loads(response.data)["summary"] == "second"
+
+
+def test_weak_etag_of_a_compressed_response_revalidates(client):
+    report_id = add_credit_report({"summary": "first"})
+
+    response = client.get("/api/latest_credit_report", headers={"If-None-Match": f'W/"{report_id}"'})
+
+    assert response.status_code == 304
@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+import llm_cache
+from llm_cache import ResponseCache, make_cache_key
+
+
+def test_cache_key_depends_on_model_and_prompt():
+    assert make_cache_key("gemini-pro", "prompt") == make_cache_key("gemini-pro", "prompt")
+    assert make_cache_key("gemini-pro", "prompt") != make_cache_key("gemini-1.5", "prompt")
+    assert make_cache_key("gemini-pro", "prompt") != make_cache_key("gemini-pro", "prompt ")
+
+
+def test_memory_tier_evicts_the_least_recently_used_entry(mock_db):
+    cache = ResponseCache(max_entries=2)
+    cache.put("m", "a", "A")
+    cache.put("m", "b", "B")
+    assert cache.get("m", "a") == "A" # 'b' is now the least recently used
+    cache.put("m", "c", "C")
+    mock_db.llm_response_cache.delete_many({}) # only the memory tier is left
+
+    assert cache.get("m", "a") == "A"
+    assert cache.get("m", "b") is None
+    assert cache.get("m", "c") == "C"
+    assert cache.stats()["memory_entries"] == 2
+
+
+def test_memory_entries_expire_after_the_ttl(mock_db, clock):
+    cache = ResponseCache(ttl_seconds=60)
+    cache.put("m", "prompt", "answer")
+    mock_db.llm_response_cache.delete_many({})
+
+    clock.now += 59
+    assert cache.get("m", "prompt") == "answer"
+    clock.now += 1
+    assert cache.get("m", "prompt") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_persistent_tier_serves_other_processes(mock_db):
+    ResponseCache().put("m", "prompt", "answer")
+    fresh = ResponseCache() # e.g. another worker with an empty memory tier
+
+    assert fresh.get("m", "prompt") == "answer"
+    assert fresh.get("m", "prompt") == "answer"
+    assert fresh.stats()["persistent_hits"] == 1
+    assert fresh.stats()["memory_hits"] == 1
+    assert "llm_cache_ttl" in mock_db.llm_response_cache.index_information()
+
+
+def test_expired_persistent_documents_are_misses(mock_db):
+    ResponseCache(ttl_seconds=60).put("m", "prompt", "answer")
+    mock_db.llm_response_cache.update_many({}, {"$set": {"created_at": datetime.utcnow() - timedelta(seconds=61)}})
+
+    assert ResponseCache(ttl_seconds=60).get("m", "prompt") is None
+
+
+def test_memory_copy_of_a_persistent_hit_expires_with_the_document(mock_db, clock):
+    ResponseCache(ttl_seconds=60).put("m", "prompt", "answer")
+    # Written 50 seconds ago by another process: 10 seconds left
+    mock_db.llm_response_cache.update_many({}, {"$set": {"created_at": datetime.utcnow() - timedelta(seconds=50)}})
+    cache = ResponseCache(ttl_seconds=60)
+    assert cache.get("m", "prompt") == "answer"
+    mock_db.llm_response_cache.delete_many({})
+
+    clock.now += 9
+    assert cache.get("m", "prompt") == "answer"
+    clock.now += 2
+    assert cache.get("m", "prompt") is None
+
+
+def test_persistent_tier_failures_are_misses(mock_db, monkeypatch):
+    def unavailable(*args, **kwargs):
+        raise ConnectionError("MongoDB unreachable")
+    monkeypatch.setattr(llm_cache, "get_cached_llm_response", unavailable)
+    monkeypatch.setattr(llm_cache, "put_cached_llm_response", unavailable)
+    errors = []
+    cache = ResponseCache(logger=type("Logger", (), {"error": staticmethod(errors.append)}))
+
+    cache.put("m", "prompt", "answer")
+    assert cache.get("m", "prompt") == "answer" # from memory
+    assert cache.get("m", "other") is None
+
+    assert len(errors) == 2
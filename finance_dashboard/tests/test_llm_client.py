@@ -0,0 +1,107 @@
+import pytest
+
+from llm_client import CircuitBreaker, LLMClient, LLMUnavailableError
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30)
+
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success() # resets the count
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_breaker_lets_one_probe_through_after_the_reset_time(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    breaker.record_failure()
+
+    clock.now += 29
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    # Only one probe at a time
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_failed_probe_opens_the_breaker_again(clock):
+    breaker = CircuitBreaker(failure_threshold=5, reset_seconds=30)
+    for _ in range(5):
+        breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+
+    breaker.record_failure()
+
+    assert breaker.state == "open"
+    clock.now += 29
+    assert not breaker.allow()
+
+
+class _FlakyProvider:
+    model_name = "flaky"
+    configured = True
+
+    def __init__(self, errors, text='{"ok": true}'):
+        self.errors = list(errors)
+        self.text = text
+        self.calls = 0
+
+    def generate(self, prompt, timeout):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return self.text
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(LLMClient, "_retry_delay", lambda self, attempt: 0.0)
+
+
+def test_transient_errors_are_retried(no_backoff):
+    provider = _FlakyProvider([TimeoutError(), ConnectionError()])
+    client = LLMClient(provider, max_retries=3)
+
+    assert client.generate_json("prompt") == {"ok": True}
+    assert provider.calls == 3
+    assert client.retries == 2
+    assert client.breaker.state == "closed"
+
+
+def test_exhausted_retries_count_towards_the_breaker(no_backoff):
+    provider = _FlakyProvider([TimeoutError()] * 10)
+    client = LLMClient(provider, breaker=CircuitBreaker(failure_threshold=2), max_retries=1)
+
+    for _ in range(2):
+        with pytest.raises(TimeoutError):
+            client.generate_text("prompt")
+
+    assert provider.calls == 4
+    with pytest.raises(LLMUnavailableError):
+        client.generate_text("prompt")
+    assert provider.calls == 4
+    assert client.rejected == 1
+
+
+def test_non_transient_errors_are_not_retried(no_backoff):
+    provider = _FlakyProvider([ValueError("invalid request")])
+    client = LLMClient(provider, breaker=CircuitBreaker(failure_threshold=1))
+
+    with pytest.raises(ValueError):
+        client.generate_text("prompt")
+
+    assert provider.calls == 1
+    assert client.breaker.state == "closed"
@@ -0,0 +1,129 @@
+import json
+import logging
+import threading
+
+import pytest
+
+import metrics
+from metrics import Counter, Gauge, Histogram, Registry
+
+
+def test_counter_samples_per_label_values():
+    counter = Counter("requests_total", "Requests.", ("method", "path"))
+
+    counter.inc(method="GET", path='/a"b')
+    counter.inc(2, method="GET", path='/a"b')
+    counter.inc(method="POST", path="/c")
+
+    assert counter.samples() == [
+        ('requests_total{method="GET",path="/a\\"b"}', 3),
+        ('requests_total{method="POST",path="/c"}', 1),
+    ]
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value)
+
+    assert histogram.samples() == [
+        ('latency_seconds_bucket{le="0.1"}', 1),
+        ('latency_seconds_bucket{le="1.0"}', 3),
+        ('latency_seconds_bucket{le="+Inf"}', 4),
+        ("latency_seconds_sum", 4.25),
+        ("latency_seconds_count", 4),
+    ]
+
+
+def test_disabled_metrics_record_nothing(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", False)
+    counter = Counter("requests_total", "Requests.")
+    histogram = Histogram("latency_seconds", "Latency.")
+
+    counter.inc()
+    histogram.observe(1.0)
+
+    assert counter.samples() == []
+    assert histogram.samples() == []
+
+
+def test_render_uses_the_prometheus_text_format_and_skips_failing_gauges():
+    registry = Registry()
+    counter = registry.counter("jobs_total", "Jobs.", ("kind",))
+    assert registry.counter("jobs_total", "Registered twice.") is counter
+    counter.inc(kind="fraud")
+    registry.gauge("pool_connections", "Connections.", lambda: {("open",): 2}, ("state",))
+    registry.gauge("broken", "Raises at scrape time.", lambda: 1 / 0)
+
+    assert registry.render() == (
+        "# HELP jobs_total Jobs.\n"
+        "# TYPE jobs_total counter\n"
+        'jobs_total{kind="fraud"} 1.0\n'
+        "# HELP pool_connections Connections.\n"
+        "# TYPE pool_connections gauge\n"
+        'pool_connections{state="open"} 2.0\n'
+    )
+
+
+def test_gauge_without_labels():
+    assert Gauge("up", "Up.", lambda: 1).samples() == [("up", 1)]
+
+
+@pytest.fixture
+def timing_logs(monkeypatch, caplog):
+    monkeypatch.setattr(metrics, "TIMING_LOGS_ENABLED", True)
+    # The handler of the timing logger is only installed at import with TIMING_LOGS_ENABLED
+    monkeypatch.setattr(metrics._timing_logger, "propagate", True)
+    caplog.set_level(logging.INFO, logger="finance_dashboard.timing")
+    return caplog
+
+
+def _run_stage():
+    with metrics.stage("llm_call"):
+        pass
+
+
+def test_timed_job_logs_the_stages_of_its_worker_threads(timing_logs):
+    with metrics.timed_job("fraud") as outcome:
+        with metrics.stage("fraud_prescreen"):
+            pass
+        workers = [threading.Thread(target=metrics.copy_timing_context().run, args=(_run_stage,)) for _ in range(3)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        outcome["status"] = "succeeded"
+
+    [record] = timing_logs.records
+    line = json.loads(record.getMessage())
+    assert line["job"] == "fraud"
+    assert line["status"] == "succeeded"
+    assert set(line["stages_ms"]) == {"fraud_prescreen", "llm_call"}
+
+
+def _job_count(kind, status):
+    samples = dict(metrics.JOB_SECONDS.samples())
+    return samples.get(f'analysis_job_duration_seconds_count{{kind="{kind}",status="{status}"}}', 0)
+
+
+def test_timed_job_that_raises_is_recorded_as_failed(timing_logs):
+    count_before = _job_count("risk", "failed")
+
+    with pytest.raises(ValueError):
+        with metrics.timed_job("risk"):
+            raise ValueError("boom")
+
+    assert json.loads(timing_logs.records[0].getMessage())["status"] == "failed"
+    assert _job_count("risk", "failed") == count_before + 1
+
+
+def test_metrics_endpoint(client, monkeypatch):
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.content_type == metrics.PROMETHEUS_CONTENT_TYPE
+    assert "# TYPE http_requests_total counter" in response.get_data(as_text=True)
+
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", False)
+    assert client.get("/metrics").status_code == 404
@@ -0,0 +1,63 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from database import add_transactions_bulk, decode_transactions_cursor, encode_transactions_cursor, iter_transactions
+
+
+def _add(count):
+    # Repeated dates make the _id tie-breaker matter
+    add_transactions_bulk([
+        {"tipo": "despesa", "descricao": f"item {n}", "valor": float(n), "data_pagamento": datetime(2024, 1, 1 + n % 4), "status": "pago"}
+        for n in range(count)
+    ])
+
+
+@pytest.mark.parametrize("sort_field", ["_id", "data_pagamento"])
+@pytest.mark.parametrize("descending", [False, True])
+def test_keyset_pages_cover_every_transaction_once_in_order(mock_db, sort_field, descending):
+    _add(11)
+
+    seen = []
+    after = None
+    while True:
+        page = list(iter_transactions(sort_field=sort_field, descending=descending, after=after, limit=3))
+        seen.extend(page)
+        if len(page) < 3:
+            break
+        after = encode_transactions_cursor(page[-1], sort_field)
+
+    keys = [(doc[sort_field], doc["_id"]) for doc in seen]
+    assert len({doc["_id"] for doc in seen}) == 11
+    assert keys == sorted(keys, reverse=descending)
+
+
+def test_cursor_round_trips_the_sort_value():
+    document = {"_id": "65a000000000000000000001", "data_pagamento": datetime(2024, 3, 1, 12, 30)}
+
+    cursor = encode_transactions_cursor(document, "data_pagamento")
+
+    value, object_id = decode_transactions_cursor(cursor, "data_pagamento")
+    assert value == datetime(2024, 3, 1, 12, 30)
+    assert str(object_id) == document["_id"]
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", "e30=", "eyJpZCI6ICJ4In0="]) # garbage, {}, {"id": "x"}
+def test_malformed_cursor_is_a_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_transactions_cursor(cursor)
+
+
+def test_pages_are_linked_by_the_next_cursor_header(client):
+    _add(5)
+
+    first = client.get("/api/transactions?limit=3&sort=data_pagamento")
+    second = client.get(f"/api/transactions?limit=3&sort=data_pagamento&after={first.headers['X-Next-Cursor']}")
+
+    assert first.status_code == second.status_code == 200
+    assert len(json.loads(first.data)) == 3
+    assert len(json.loads(second.data)) == 2
+    assert "X-Next-Cursor" not in second.headers
+    assert client.get("/api/transactions?limit=3&after=garbage").status_code == 400
+    assert client.get("/api/transactions?limit=0").status_code == 400
@@ -0,0 +1,35 @@
+from datetime import datetime
+
+from database import add_transactions_bulk, get_period_summary
+
+
+def _transaction(tipo, valor, day, descricao="item"):
+    return {"tipo": tipo, "descricao": descricao, "valor": valor, "data_pagamento": day, "status": "pago"}
+
+
+def test_totals_and_highlights_cover_the_period_only(mock_db):
+    add_transactions_bulk([
+        _transaction("receita", 1000.0, datetime(2023, 12, 31), "antigo"),
+        _transaction("receita", 1500.0, datetime(2024, 1, 5), "salario"),
+        _transaction("despesa", 200.0, datetime(2024, 1, 10), "mercado"),
+        _transaction("despesa", 50.5, datetime(2024, 2, 1), "farmacia"),
+        _transaction("despesa", 80.0, datetime(2024, 2, 3), "luz"),
+    ])
+
+    summary = get_period_summary(datetime(2024, 1, 1), highlights_limit=2)
+
+    assert summary["totals"] == {
+        "receita": {"total": 1500.0, "count": 1},
+        "despesa": {"total": 330.5, "count": 3},
+    }
+    # The most recent first, without _id so the result can be sent to the LLM as JSON
+    assert summary["highlights"] == [
+        {"tipo": "despesa", "descricao": "luz", "valor": 80.0, "data_pagamento": datetime(2024, 2, 3)},
+        {"tipo": "despesa", "descricao": "farmacia", "valor": 50.5, "data_pagamento": datetime(2024, 2, 1)},
+    ]
+
+
+def test_empty_period(mock_db):
+    add_transactions_bulk([_transaction("receita", 1000.0, datetime(2023, 12, 31))])
+
+    assert get_period_summary(datetime(2024, 1, 1)) == {"totals": {}, "highlights": []}
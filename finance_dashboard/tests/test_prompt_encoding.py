@@ -0,0 +1,75 @@
+import csv
+import io
+import json
+
+from prompt_encoding import compact_json, encode_table, encode_transactions, estimate_tokens, format_amount, row_tokens
+from prompts import build_fraud_prompt
+
+
+def _transaction(n, description="Combustível"):
+    return {"id": f"id{n}", "date": "2024-01-05", "type": "despesa", "description": description, "amount": 1500.0 + n}
+
+
+def test_format_amount_rounds_and_drops_trailing_zeros():
+    assert format_amount(1500.0) == "1500"
+    assert format_amount(1500.5) == "1500.5"
+    assert format_amount(12.345) == "12.35"
+    assert format_amount(None) == ""
+    assert format_amount("n/a") == "n/a"
+
+
+def test_compact_json_has_no_whitespace_and_keeps_accents():
+    assert compact_json({"descricao": "Água", "valores": [1, 2]}) == '{"descricao":"Água","valores":[1,2]}'
+
+
+def test_table_is_csv_with_a_header_row():
+    text = encode_table(
+        [{"month": "2024-01", "income": 1000.0, "note": "a, b"}, {"month": "2024-02", "income": None}],
+        ["month", "income", "note"], amount_columns=("income",)
+    )
+
+    assert list(csv.reader(io.StringIO(text))) == [["month", "income", "note"], ["2024-01", "1000", "a, b"], ["2024-02", "", ""]]
+
+
+def test_transactions_share_a_description_dictionary():
+    rows = [_transaction(0), _transaction(1, "Água, EPAL"), _transaction(2)]
+
+    text = encode_transactions(rows)
+
+    assert text.splitlines() == [
+        "description dictionary:",
+        "D1,Combustível",
+        'D2,"Água, EPAL"',
+        "id,date,type,description,amount",
+        "id0,2024-01-05,despesa,D1,1500",
+        "id1,2024-01-05,despesa,D2,1501",
+        "id2,2024-01-05,despesa,D1,1502",
+    ]
+    assert len(text) < len(json.dumps(rows, indent=2)) / 2
+
+
+def test_token_budget_drops_trailing_rows_and_says_how_many():
+    rows = [_transaction(n, f"loja {n}") for n in range(50)]
+
+    text = encode_transactions(rows, token_budget=100)
+
+    assert estimate_tokens(text) <= 110
+    kept = [line for line in text.splitlines() if line.startswith("id") and line != "id,date,type,description,amount"]
+    assert text.endswith(f"({50 - len(kept)} more rows omitted)\n")
+    # Dictionary entries of omitted rows are left out too
+    assert text.count("loja") == len(kept)
+
+
+def test_row_tokens_matches_the_encoded_row():
+    row = _transaction(7)
+
+    assert row_tokens(row, ["id", "amount"]) == estimate_tokens("id7,1507.0\n")
+
+
+def test_fraud_prompt_carries_every_transaction_id():
+    rows = [_transaction(n) for n in range(20)]
+
+    prompt = build_fraud_prompt(rows, [{"type": "despesa", "description": "Combustível", "count": 3}])
+
+    assert all(f"\nid{n}," in prompt for n in range(20))
+    assert "statistical profile" in prompt
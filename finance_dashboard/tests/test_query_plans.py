@@ -0,0 +1,177 @@
+"""
+Checks that the transaction filters and the keyset sort are served by the
+indexes of database.ensure_indexes. The explain() tests need a MongoDB
+server: set MONGO_TEST_URI (e.g. mongodb://localhost:27017), otherwise they
+skip and only the index-prefix checks run.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+
+import database
+from database import TRANSACTION_INDEXES, build_transaction_query, explain_transactions_query
+
+START = datetime(2024, 1, 1)
+
+
+def test_build_transaction_query_types_every_filter():
+    query = build_transaction_query(
+        tipos=["despesa"], statuses=["pago", "pendente"],
+        date_from=datetime(2024, 1, 1), date_to=datetime(2024, 2, 1),
+        min_valor=10.0, max_valor=None, suspicious_only=True
+    )
+
+    assert query == {
+        "tipo": {"$in": ["despesa"]},
+        "status": {"$in": ["pago", "pendente"]},
+        "data_pagamento": {"$gte": datetime(2024, 1, 1), "$lt": datetime(2024, 2, 1)},
+        "valor": {"$gte": 10.0},
+        "ai_analysis_results.fraud_guard.is_suspicious": True,
+    }
+    assert build_transaction_query() == {}
+
+
+def _index_keys(name):
+    return next(keys for keys, index_name in TRANSACTION_INDEXES if index_name == name)
+
+
+@pytest.mark.parametrize("filters, index_name", [
+    ({"tipos": ["receita"], "date_from": START}, "tipo_data_pagamento"),
+    ({"date_from": START, "date_to": START + timedelta(days=10)}, "data_pagamento_id"),
+    ({"statuses": ["pendente"]}, "status"),
+    ({"min_valor": 45.0, "max_valor": 50.0}, "valor"),
+    ({"suspicious_only": True}, "fraud_guard_is_suspicious"),
+])
+def test_each_filter_leads_an_index(filters, index_name):
+    # Without a server: the filtered fields must be a prefix of the index that should serve them
+    query = build_transaction_query(**filters)
+    prefix = [field for field, _ in _index_keys(index_name)][:len(query)]
+
+    assert sorted(query) == sorted(prefix)
+
+
+class _RecordingCollection:
+    def find(self, query, projection=None, **kwargs):
+        self.sort = kwargs["sort"]
+        return []
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_keyset_sort_is_an_index_or_its_reverse(monkeypatch, descending):
+    collection = _RecordingCollection()
+    monkeypatch.setattr(database, "get_collection", lambda name: collection)
+
+    database.iter_transactions(sort_field="data_pagamento", descending=descending)
+
+    # An index serves a sort in its own order or fully reversed
+    direction = DESCENDING if descending else ASCENDING
+    keys = [(field, order * direction) for field, order in _index_keys("data_pagamento_id")]
+    assert collection.sort == keys
+
+
+@pytest.fixture
+def transactions(server_db):
+    # 'receita' is rare so the {tipo, data_pagamento} index is the most selective one
+    server_db.transactions.insert_many([
+        {
+            "tipo": "receita" if n % 20 == 0 else "despesa",
+            "descricao": f"item {n % 7}",
+            "valor": float(n % 50),
+            "data_pagamento": START + timedelta(days=n % 90),
+            "status": ("pago", "pendente", "agendado")[n % 3],
+            "ai_analysis_results": {"fraud_guard": {"is_suspicious": n % 40 == 0}},
+        }
+        for n in range(400)
+    ])
+    return server_db.transactions
+
+
+def test_tipo_and_date_filters_use_the_tipo_date_index(transactions):
+    query = build_transaction_query(tipos=["receita"], date_from=START, date_to=START + timedelta(days=30))
+
+    assert "tipo_data_pagamento" in explain_transactions_query(query)["indexes_used"]
+
+
+def test_date_range_alone_uses_the_date_index(transactions):
+    query = build_transaction_query(date_from=START, date_to=START + timedelta(days=10))
+
+    assert "data_pagamento_id" in explain_transactions_query(query)["indexes_used"]
+
+
+@pytest.mark.parametrize("filters, index_name", [
+    ({"statuses": ["pendente"]}, "status"),
+    ({"min_valor": 45.0}, "valor"),
+    ({"suspicious_only": True}, "fraud_guard_is_suspicious"),
+])
+def test_other_filters_use_their_index(transactions, filters, index_name):
+    assert index_name in explain_transactions_query(build_transaction_query(**filters))["indexes_used"]
+
+
+@pytest.mark.parametrize("direction", [ASCENDING, DESCENDING])
+def test_keyset_sort_uses_the_date_id_index_without_sorting_in_memory(transactions, direction):
+    explained = explain_transactions_query({}, sort=[("data_pagamento", direction), ("_id", direction)])
+
+    assert explained["indexes_used"] == ["data_pagamento_id"]
+    assert "SORT" not in explained["stages"]
+
+
+def test_keyset_page_query_uses_the_date_id_index(transactions):
+    # The query iter_transactions sends for the page after a (data_pagamento, _id) position
+    last_date, last_id = START + timedelta(days=45), ObjectId()
+    query = {"$or": [
+        {"data_pagamento": {"$gt": last_date}},
+        {"data_pagamento": last_date, "_id": {"$gt": last_id}},
+    ]}
+
+    explained = explain_transactions_query(query, sort=[("data_pagamento", ASCENDING), ("_id", ASCENDING)])
+
+    assert "data_pagamento_id" in explained["indexes_used"]
+    assert "COLLSCAN" not in explained["stages"]
+
+
+class _ExplainedCursor:
+    def __init__(self, plan):
+        self.plan = plan
+        self.sorted_by = None
+
+    def sort(self, sort):
+        self.sorted_by = sort
+        return self
+
+    def explain(self):
+        return {"queryPlanner": {"winningPlan": self.plan}}
+
+
+class _ExplainedCollection:
+    def __init__(self, plan):
+        self.cursor = _ExplainedCursor(plan)
+
+    def find(self, query):
+        return self.cursor
+
+
+def test_explain_lists_indexes_of_nested_plans(monkeypatch):
+    # Shape of a slot-based engine plan with an index intersection below the fetch
+    plan = {"queryPlan": {"stage": "FETCH", "inputStage": {
+        "stage": "AND_SORTED",
+        "inputStages": [
+            {"stage": "IXSCAN", "indexName": "tipo_data_pagamento"},
+            {"stage": "IXSCAN", "indexName": "status"},
+        ]
+    }}}
+    collection = _ExplainedCollection(plan)
+    monkeypatch.setattr(database, "get_collection", lambda name: collection)
+
+    explained = explain_transactions_query({"tipo": "despesa"}, sort=[("data_pagamento", 1)])
+
+    assert sorted(explained["indexes_used"]) == ["status", "tipo_data_pagamento"]
+    assert sorted(explained["stages"]) == ["AND_SORTED", "FETCH", "IXSCAN", "IXSCAN"]
+    assert collection.cursor.sorted_by == [("data_pagamento", 1)]
+
+
+def test_explain_reports_a_collection_scan_as_no_index(monkeypatch):
+    monkeypatch.setattr(database, "get_collection", lambda name: _ExplainedCollection({"stage": "COLLSCAN"}))
+
+    assert explain_transactions_query({})["indexes_used"] == []
@@ -0,0 +1,76 @@
+import pytest
+
+from response_parsing import SchemaError, StreamingJSONParser, extract_json, validate, NUMBER
+
+RESPONSE = (
+    'Here is the "fraud_report" you asked for: [see below]\n'
+    '```json\n{"fraud_report" :\n [{"transaction_id": "a", "risk_score": 0.1},'
+    ' {"transaction_id": "b", "risk_score": 0.9}], "overall_risk_level": "Low"}\n```'
+)
+
+
+def _feed_in_chunks(parser, text, size):
+    items = []
+    for start in range(0, len(text), size):
+        items.extend(parser.feed(text[start:start + size]))
+    return items
+
+
+@pytest.mark.parametrize("size", [1, 2, 5, 64, len(RESPONSE)])
+def test_streamed_items_do_not_depend_on_chunk_size(size):
+    parser = StreamingJSONParser("fraud_report")
+
+    items = _feed_in_chunks(parser, RESPONSE, size)
+
+    assert [item["transaction_id"] for item in items] == ["a", "b"]
+    assert parser.text == RESPONSE
+
+
+def test_key_mentioned_in_the_preamble_is_ignored():
+    parser = StreamingJSONParser("fraud_report")
+
+    items = parser.feed('The "fraud_report" is [{"not": "this"}] below: {"fraud_report": [{"id": 1}]}')
+
+    assert items == [{"id": 1}]
+
+
+def test_key_as_a_string_value_is_ignored():
+    parser = StreamingJSONParser("fraud_report")
+
+    items = parser.feed('{"section": "fraud_report", "list": [{"no": 1}], "fraud_report": [{"yes": 1}]}')
+
+    assert items == [{"yes": 1}]
+
+
+def test_malformed_item_is_skipped():
+    parser = StreamingJSONParser("fraud_report")
+
+    items = _feed_in_chunks(parser, '{"fraud_report": [{"a": 1}, {"b": tru}, {"c": "]}"}]}', 3)
+
+    assert items == [{"a": 1}, {"c": "]}"}]
+
+
+def test_items_after_the_array_are_not_returned():
+    parser = StreamingJSONParser("fraud_report")
+
+    items = parser.feed('{"fraud_report": [{"a": 1}], "other": [{"b": 2}]}')
+
+    assert items == [{"a": 1}]
+    assert parser.feed(' {"c": 3}') == []
+
+
+def test_extract_json_skips_preamble_and_fences():
+    assert extract_json(RESPONSE)["overall_risk_level"] == "Low"
+    assert extract_json('Note {not json} then {"a": [1]}') == {"a": [1]}
+    with pytest.raises(ValueError):
+        extract_json("no json here")
+
+
+def test_validate_names_the_offending_path():
+    schema = {"report": {"score": NUMBER, "factors": [str]}}
+
+    assert validate({"report": {"score": 1, "factors": ["x"], "extra": None}}, schema)
+    with pytest.raises(SchemaError, match=r"\$\.report\.factors\[1\]"):
+        validate({"report": {"score": 1, "factors": ["x", 2]}}, schema)
+    with pytest.raises(SchemaError, match=r"\$\.report\.score"):
+        validate({"report": {"score": True, "factors": []}}, schema)
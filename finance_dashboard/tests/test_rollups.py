@@ -0,0 +1,120 @@
+from datetime import datetime
+
+import mongomock
+
+from database import (
+    _add_rollup_delta,
+    add_transaction,
+    add_transactions_bulk,
+    bulk_update_transactions,
+    get_monthly_rollups,
+    rebuild_monthly_rollups,
+    update_transaction,
+)
+
+
+def _transaction(tipo, valor, day, descricao="item", status="pago"):
+    return {"tipo": tipo, "descricao": descricao, "valor": valor, "data_pagamento": day, "status": status}
+
+
+def _rollups():
+    return {(r["month"], r["tipo"]): (round(r["total"], 2), r["count"]) for r in get_monthly_rollups()}
+
+
+def test_rollup_deltas_add_up_per_month_and_tipo():
+    deltas = {}
+    _add_rollup_delta(deltas, _transaction("receita", 100.0, datetime(2024, 1, 5)), 1)
+    _add_rollup_delta(deltas, _transaction("receita", 50.0, datetime(2024, 1, 20)), 1)
+    _add_rollup_delta(deltas, _transaction("despesa", 30.0, datetime(2024, 1, 20)), 1)
+    _add_rollup_delta(deltas, _transaction("receita", 100.0, datetime(2024, 1, 5)), -1)
+
+    assert deltas == {("2024-01", "receita"): (50.0, 1), ("2024-01", "despesa"): (30.0, 1)}
+
+
+def test_rollup_deltas_skip_incomplete_documents():
+    deltas = {}
+    _add_rollup_delta(deltas, _transaction("receita", "100", datetime(2024, 1, 5)), 1)
+    _add_rollup_delta(deltas, _transaction("", 100.0, datetime(2024, 1, 5)), 1)
+    _add_rollup_delta(deltas, _transaction("receita", 100.0, None), 1)
+
+    assert deltas == {}
+
+
+def test_inserts_increment_the_rollups(mock_db):
+    add_transactions_bulk([
+        _transaction("receita", 100.0, datetime(2024, 1, 5)),
+        _transaction("receita", 50.0, datetime(2024, 1, 20)),
+        _transaction("despesa", 30.0, datetime(2024, 2, 1)),
+    ])
+    add_transaction(_transaction("despesa", 20.0, datetime(2024, 2, 3)))
+
+    assert _rollups() == {
+        ("2024-01", "receita"): (150.0, 2),
+        ("2024-02", "despesa"): (50.0, 2),
+    }
+
+
+def test_update_moves_the_amount_between_rollups(mock_db):
+    transaction_id = add_transaction(_transaction("despesa", 30.0, datetime(2024, 1, 5)))
+    add_transaction(_transaction("despesa", 10.0, datetime(2024, 2, 5)))
+
+    assert update_transaction(str(transaction_id), {"valor": 45.0, "data_pagamento": datetime(2024, 2, 10)})
+
+    # The emptied January rollup is removed
+    assert _rollups() == {("2024-02", "despesa"): (55.0, 2)}
+
+
+def test_bulk_update_rollups_match_a_rebuild(mock_db):
+    add_transactions_bulk([_transaction("despesa", 10.0 * n, datetime(2024, 1 + n % 3, 1 + n)) for n in range(1, 10)])
+    ids = [str(doc["_id"]) for doc in mock_db.transactions.find({}, {"_id": 1})]
+
+    result = bulk_update_transactions([
+        (ids[0], {"tipo": "receita"}),
+        (ids[1], {"valor": 999.0}),
+        (ids[2], {"descricao": "not a rollup field"}),
+        ("not-an-id", {"valor": 1.0}),
+    ])
+    incremental = _rollups()
+    rebuild_monthly_rollups()
+
+    assert result["skipped"] == 1
+    assert result["modified"] == 3
+    assert incremental == _rollups()
+
+
+def test_rebuild_corrects_drifted_rollups_and_drops_stale_months(mock_db):
+    add_transactions_bulk([
+        _transaction("receita", 100.0, datetime(2024, 1, 5)),
+        _transaction("despesa", 30.0, datetime(2024, 2, 1)),
+    ])
+    mock_db.monthly_rollups.update_one({"_id": "2024-01:receita"}, {"$inc": {"total": 5.0}})
+    mock_db.monthly_rollups.insert_one({"_id": "2023-12:despesa", "month": "2023-12", "tipo": "despesa", "total": 1.0, "count": 1})
+
+    assert rebuild_monthly_rollups() == 2
+    assert _rollups() == {
+        ("2024-01", "receita"): (100.0, 1),
+        ("2024-02", "despesa"): (30.0, 1),
+    }
+
+
+def test_rebuild_keeps_rollups_readable_while_it_writes(mock_db, monkeypatch):
+    add_transactions_bulk([_transaction("receita", 100.0, datetime(2024, 1, 5))])
+    seen_while_writing = []
+    bulk_write = mongomock.collection.Collection.bulk_write
+
+    def recording_bulk_write(self, *args, **kwargs):
+        if self.name == "monthly_rollups":
+            seen_while_writing.append(_rollups())
+        return bulk_write(self, *args, **kwargs)
+    monkeypatch.setattr(mongomock.collection.Collection, "bulk_write", recording_bulk_write)
+
+    rebuild_monthly_rollups()
+
+    assert seen_while_writing == [{("2024-01", "receita"): (100.0, 1)}]
+
+
+def test_rebuild_of_no_transactions_clears_the_rollups(mock_db):
+    mock_db.monthly_rollups.insert_one({"_id": "2024-01:receita", "month": "2024-01", "tipo": "receita", "total": 1.0, "count": 1})
+
+    assert rebuild_monthly_rollups() == 0
+    assert get_monthly_rollups() == []
@@ -0,0 +1,67 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from bson import Decimal128, ObjectId
+
+import serialization
+from serialization import dumps, dumps_bytes, json_default
+
+OBJECT_ID = ObjectId("65a000000000000000000001")
+DOCUMENT = {
+    "_id": OBJECT_ID,
+    "descricao": "Água - EPAL",
+    "data_pagamento": datetime(2024, 1, 5, 10, 30),
+    "dia": date(2024, 1, 5),
+    "valor": Decimal128("1500.50"),
+    "taxa": Decimal("0.25"),
+    1: "chave numérica",
+}
+
+
+@pytest.fixture(params=["orjson", "json"])
+def backend(request, monkeypatch):
+    if request.param == "orjson" and not serialization.USE_ORJSON:
+        pytest.skip("orjson is not installed")
+    monkeypatch.setattr(serialization, "USE_ORJSON", request.param == "orjson")
+    return request.param
+
+
+def test_json_default_encodes_bson_values():
+    assert json_default(OBJECT_ID) == "65a000000000000000000001"
+    assert json_default(datetime(2024, 1, 5, 10, 30)) == "2024-01-05T10:30:00"
+    assert json_default(Decimal128("1500.50")) == 1500.5
+    with pytest.raises(TypeError):
+        json_default(object())
+
+
+def test_both_backends_encode_mongo_documents_alike(backend):
+    assert json.loads(dumps_bytes(DOCUMENT)) == {
+        "_id": "65a000000000000000000001",
+        "descricao": "Água - EPAL",
+        "data_pagamento": "2024-01-05T10:30:00",
+        "dia": "2024-01-05",
+        "valor": 1500.5,
+        "taxa": 0.25,
+        "1": "chave numérica",
+    }
+
+
+def test_output_is_compact_utf8_and_optionally_sorted(backend):
+    assert dumps({"b": 1, "a": "ç"}, sort_keys=True) == '{"a":"ç","b":1}'
+    assert dumps({"b": 1, "a": 2}) == '{"b":1,"a":2}'
+
+
+def test_integers_beyond_64_bits_fall_back_to_json():
+    assert dumps_bytes({"n": 2 ** 70}) == b'{"n":1180591620717411303424}'
+
+
+def test_jsonify_accepts_documents_read_from_mongodb(app_module):
+    with app_module.app.app_context():
+        response = app_module.jsonify(DOCUMENT)
+
+    assert response.mimetype == "application/json"
+    assert json.loads(response.data)["_id"] == "65a000000000000000000001"
+    # Options only the json module knows still work
+    assert app_module.app.json.dumps({"_id": OBJECT_ID}, indent=2) == '{\n  "_id": "65a000000000000000000001"\n}'
@@ -0,0 +1,63 @@
+from datetime import datetime
+
+import pandas as pd
+
+from database import add_transaction, add_transactions_bulk, bulk_update_transactions, update_transaction
+from snapshot import TransactionSnapshot, get_snapshot
+
+
+def _transaction(descricao, valor=10.0, day=datetime(2024, 1, 5)):
+    return {"tipo": "despesa", "descricao": descricao, "valor": valor, "data_pagamento": day, "status": "pago"}
+
+
+def test_snapshot_is_reused_until_the_transactions_change(mock_db):
+    add_transactions_bulk([_transaction("a"), _transaction("b")])
+
+    first = get_snapshot()
+    assert get_snapshot() is first
+    assert len(first) == 2
+
+    add_transaction(_transaction("c"))
+    second = get_snapshot()
+    assert second is not first
+    assert second.version > first.version
+    assert sorted(second.frame["descricao"]) == ["a", "b", "c"]
+
+
+def test_user_updates_reload_the_snapshot_but_result_write_backs_do_not(mock_db):
+    add_transactions_bulk([_transaction("a")])
+    transaction_id = str(mock_db.transactions.find_one()["_id"])
+    first = get_snapshot()
+
+    bulk_update_transactions([(transaction_id, {"ai_analysis_results.fraud_guard": {"is_suspicious": False}})], mark_modified=False)
+    assert get_snapshot() is first
+
+    update_transaction(transaction_id, {"valor": 99.0})
+    assert get_snapshot().frame["valor"].tolist() == [99.0]
+
+
+def test_documents_are_typed_into_columns():
+    snapshot = TransactionSnapshot.from_documents([
+        {"_id": 1, "tipo": "receita", "descricao": "Venda", "valor": 100, "data_pagamento": datetime(2024, 1, 5)},
+        {"_id": 2, "tipo": "despesa", "valor": "abc", "data_pagamento": "2024-02-01T10:00:00"}, # legacy document
+        {"_id": 3, "tipo": "despesa", "descricao": "Renda", "valor": 5.5, "data_pagamento": None},
+    ], version=7)
+
+    frame = snapshot.frame
+    assert snapshot.version == 7
+    assert frame["id"].tolist() == ["1", "2", "3"]
+    assert isinstance(frame["tipo"].dtype, pd.CategoricalDtype)
+    assert frame["descricao"].tolist() == ["Venda", "", "Renda"]
+    assert frame["valor"].tolist()[0] == 100.0 and pd.isna(frame["valor"][1])
+    assert frame["data_pagamento"].tolist()[:2] == [pd.Timestamp(2024, 1, 5), pd.Timestamp(2024, 2, 1, 10)]
+    assert pd.isna(frame["data_pagamento"][2])
+
+
+def test_prompt_rows_of_selected_transactions():
+    snapshot = TransactionSnapshot.from_documents([
+        {"_id": 1, "tipo": "receita", "descricao": "Venda", "valor": 100.0, "data_pagamento": datetime(2024, 1, 5)},
+        {"_id": 2, "tipo": "despesa", "descricao": "Renda", "valor": 5.5, "data_pagamento": None},
+    ], version=1)
+
+    assert snapshot.prompt_rows(["2"]) == [{"id": "2", "date": "", "type": "despesa", "description": "Renda", "amount": 5.5}]
+    assert len(snapshot.prompt_rows()) == 2
@@ -0,0 +1,53 @@
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import AutoReconnect
+
+from database import add_transactions_bulk, get_monthly_rollups, get_transactions_version
+
+
+def _transaction(valor, day, tipo="despesa"):
+    return {"tipo": tipo, "descricao": "item", "valor": valor, "data_pagamento": day, "status": "pago"}
+
+
+def _rollup_counts():
+    return {(r["month"], r["tipo"]): r["count"] for r in get_monthly_rollups()}
+
+
+def test_bulk_insert_reports_rejected_documents_and_keeps_the_rest(mock_db):
+    existing_id = ObjectId()
+    mock_db.transactions.insert_one({"_id": existing_id})
+    documents = [_transaction(10.0, datetime(2024, 1, n)) for n in range(1, 6)]
+    documents[2]["_id"] = existing_id # duplicate key
+
+    inserted, failures = add_transactions_bulk(documents, chunk_size=2)
+
+    assert inserted == 4
+    assert [index for index, _ in failures] == [2]
+    assert _rollup_counts() == {("2024-01", "despesa"): 4}
+    assert all(doc["created_at"] and doc["ai_analysis_results"] == {} for doc in documents)
+
+
+def test_chunks_written_before_a_failure_are_accounted_for(mock_db, monkeypatch):
+    collection_class = type(mock_db.transactions)
+    insert_many = collection_class.insert_many
+    calls = []
+
+    def insert_many_failing_midway(self, documents, *args, **kwargs):
+        calls.append(len(documents))
+        if len(calls) == 2:
+            # The connection drops after part of the chunk reached the server
+            insert_many(self, documents[:1], *args, **kwargs)
+            raise AutoReconnect("connection reset")
+        return insert_many(self, documents, *args, **kwargs)
+    monkeypatch.setattr(collection_class, "insert_many", insert_many_failing_midway)
+    version = get_transactions_version()
+
+    with pytest.raises(AutoReconnect):
+        add_transactions_bulk([_transaction(10.0, datetime(2024, 1, n)) for n in range(1, 8)], chunk_size=3)
+
+    # First chunk (3) and the one document of the second chunk that was written
+    assert mock_db.transactions.count_documents({}) == 4
+    assert _rollup_counts() == {("2024-01", "despesa"): 4}
+    assert get_transactions_version() > version